@@ -0,0 +1,260 @@
+"""
+Analysis Model - One parsed, typed result per photo
+
+The vision model answers with JSON constrained by ANALYSIS_SCHEMA. That answer
+is parsed once into an Analysis (location, issues with responsibility and
+priority, recommended actions) and everything downstream reads its fields:
+grouping, the action items page, the cover summary and the photo pages.
+
+Older cache rows hold the free-text format ("Location: ...", "- [OWNER]
+[FIX SOON] ..."). parse_analysis() recognizes them and converts them with the
+same rules the report used to apply, so they keep working until they are
+rewritten as JSON on their next read.
+"""
+
+import json
+import re
+from typing import Iterable, Optional, Tuple, Union
+
+ROOMS = (
+    "Kitchen", "Living Room", "Dining Room", "Main Bedroom", "Bedroom 2", "Bedroom 3",
+    "Bedrooms", "Main Bathroom", "Bathroom", "Half Bathroom", "Laundry Room", "Garage",
+    "Exterior", "Patio", "Porch", "Attic", "Basement", "Hallway", "Closet", "Office",
+)
+RESPONSIBILITIES = ("OWNER", "TENANT")
+PRIORITIES = ("FIX NOW", "FIX SOON")
+
+_ISSUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "description": {"type": "string"},
+        "responsibility": {"type": "string", "enum": list(RESPONSIBILITIES)},
+        "priority": {"type": "string", "enum": list(PRIORITIES)},
+    },
+    "required": ["description", "responsibility", "priority"],
+    "additionalProperties": False,
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "location": {"type": "string", "enum": list(ROOMS)},
+        "issues": {"type": "array", "items": _ISSUE_SCHEMA},
+        "actions": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["location", "issues", "actions"],
+    "additionalProperties": False,
+}
+
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {"photos": {"type": "array", "items": ANALYSIS_SCHEMA}},
+    "required": ["photos"],
+    "additionalProperties": False,
+}
+
+
+def response_format(schema: dict, name: str) -> dict:
+    """Chat completions response_format asking for strict JSON matching schema."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+class Issue:
+    """One problem found in a photo. priority is '' for untagged legacy bullets."""
+
+    __slots__ = ("description", "responsibility", "priority")
+
+    def __init__(self, description: str, responsibility: str = "OWNER", priority: str = ""):
+        self.description = description
+        self.responsibility = responsibility
+        self.priority = priority
+
+    def _fields(self) -> tuple:
+        return (self.description, self.responsibility, self.priority)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Issue) and self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return hash(self._fields())
+
+    def __repr__(self) -> str:
+        return f"Issue({self.description!r}, {self.responsibility!r}, {self.priority!r})"
+
+
+class Analysis:
+    """
+    Parsed result for one photo.
+
+    skipped holds the quality gate's reason for photos never sent to the model;
+    note holds text that is not part of the schema (an error message, or free
+    text in a legacy answer) and is shown on the photo page as-is.
+    """
+
+    __slots__ = ("location", "issues", "actions", "skipped", "note")
+
+    def __init__(self, location: str = "", issues: Iterable[Issue] = (), actions: Iterable[str] = (),
+                 skipped: Optional[str] = None, note: str = ""):
+        self.location = location
+        self.issues: Tuple[Issue, ...] = tuple(issues)
+        self.actions: Tuple[str, ...] = tuple(actions)
+        self.skipped = skipped
+        self.note = note
+
+    @property
+    def has_issues(self) -> bool:
+        return bool(self.issues)
+
+    @classmethod
+    def failed(cls, message: str) -> "Analysis":
+        return cls(note=f"Analysis failed: {message}")
+
+    # ----- JSON -----
+    @classmethod
+    def from_dict(cls, data: dict) -> "Analysis":
+        issues = []
+        for item in data.get("issues") or ():
+            if not isinstance(item, dict) or not str(item.get("description", "")).strip():
+                continue
+            responsibility = str(item.get("responsibility", "OWNER")).upper()
+            issues.append(Issue(
+                str(item["description"]).strip(),
+                responsibility if responsibility in RESPONSIBILITIES else "OWNER",
+                _normalize_priority(str(item.get("priority", ""))),
+            ))
+        return cls(
+            location=str(data.get("location") or "").strip(),
+            issues=issues,
+            actions=[str(a).strip() for a in data.get("actions") or () if str(a).strip()],
+            skipped=data.get("skipped"),
+            note=str(data.get("note") or ""),
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> "Analysis":
+        """Parse a JSON answer or cache row. Raises ValueError if it is not a JSON object."""
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("analysis JSON must be an object")
+        return cls.from_dict(data)
+
+    def to_dict(self) -> dict:
+        data = {
+            "location": self.location,
+            "issues": [{"description": i.description, "responsibility": i.responsibility,
+                        "priority": i.priority} for i in self.issues],
+            "actions": list(self.actions),
+        }
+        if self.skipped:
+            data["skipped"] = self.skipped
+        if self.note:
+            data["note"] = self.note
+        return data
+
+    def to_json(self) -> str:
+        """Compact JSON, the form stored in the vision cache."""
+        return json.dumps(self.to_dict(), separators=(",", ":"), ensure_ascii=False)
+
+    # ----- legacy free text -----
+    @classmethod
+    def from_text(cls, text: str) -> "Analysis":
+        """Convert the old free-text answer format."""
+        location = ""
+        issues = []
+        actions = []
+        notes = []
+        section = None
+        for raw in (text or "").splitlines():
+            line = raw.strip()
+            if not line or any(skip in line for skip in _SKIPPED_HEADERS):
+                continue
+            header = next((h for h in _SECTION_HEADERS if h.lower() in line.lower()), None)
+            if header:
+                section = _SECTION_HEADERS[header]
+                content = line[line.lower().index(header.lower()) + len(header):].strip()
+                if section == "location":
+                    location = location or content
+                elif content and section == "actions":
+                    actions.append(content)
+                elif content:
+                    notes.append(content)
+                continue
+            if line.startswith("-"):
+                issue = _legacy_issue(line[1:].strip())
+                if issue is not None and (issue.priority or section == "issues"):
+                    issues.append(issue)
+                    continue
+                if section == "actions":
+                    actions.append(line[1:].strip())
+                    continue
+            if any(phrase in line.lower() for phrase in NO_ISSUES_PHRASES):
+                continue
+            if section == "actions":
+                actions.append(line)
+            else:
+                notes.append(line)
+        return cls(location=location, issues=issues, actions=actions, note="\n".join(notes))
+
+    # ----- comparison -----
+    def _fields(self) -> tuple:
+        return (self.location, self.issues, self.actions, self.skipped, self.note)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Analysis) and self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return hash(self._fields())
+
+    def __repr__(self) -> str:
+        return (f"Analysis(location={self.location!r}, issues={len(self.issues)}, "
+                f"actions={len(self.actions)}, skipped={self.skipped!r})")
+
+
+# Phrases the old free-text answers used to say a photo was fine
+NO_ISSUES_PHRASES = ('no repairs needed', 'no issues', 'no damage', 'good condition',
+                     'no action needed', 'no repairs necessary', 'nothing to report',
+                     'no visible issues')
+
+_SECTION_HEADERS = {
+    "Location:": "location",
+    "Issues to Address:": "issues",
+    "Potential Issues:": "issues",
+    "Recommended Action:": "actions",
+    "Recommendations:": "actions",
+    "What To Do:": "actions",
+}
+_SKIPPED_HEADERS = ("What I See:", "Observations:")
+_TAG_RE = re.compile(r"\[(TENANT|OWNER|FIX NOW|FIX SOON|IMMEDIATE|SOON)\]", re.IGNORECASE)
+
+
+def _normalize_priority(priority: str) -> str:
+    priority = priority.strip().upper()
+    if priority in ("IMMEDIATE", "FIX NOW"):
+        return "FIX NOW"
+    if priority in ("SOON", "FIX SOON"):
+        return "FIX SOON"
+    return ""
+
+
+def _legacy_issue(text: str) -> Optional[Issue]:
+    """Parse '[OWNER] [FIX SOON] description' (tags in any order, legacy IMMEDIATE/SOON too)."""
+    tags = [t.upper() for t in _TAG_RE.findall(text)]
+    if not tags:
+        return Issue(text) if text else None
+    description = _TAG_RE.sub("", text).strip()
+    responsibility = next((t for t in tags if t in RESPONSIBILITIES), "OWNER")
+    priority = next((_normalize_priority(t) for t in tags if t not in RESPONSIBILITIES), "")
+    return Issue(description, responsibility, priority) if description else None
+
+
+def parse_analysis(value: Union["Analysis", str, None]) -> Optional[Analysis]:
+    """Return value as an Analysis: JSON and legacy text are parsed, Analysis passes through."""
+    if value is None or isinstance(value, Analysis):
+        return value
+    text = value.strip()
+    if text.startswith("{"):
+        try:
+            return Analysis.from_json(text)
+        except ValueError:
+            pass
+    return Analysis.from_text(text)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark the thread-pool and async analysis engines against the offline stand-in.
+
+Starts benchmarks/standin_server.py in-process (latency distribution, RPM limit,
+429/5xx injection), then runs analyze_images() over synthetic photos with each
+engine and reports throughput plus per-photo tail latency as seen by the server
+(first request to final answer, so retries and second passes are included).
+
+Usage:
+    python benchmarks/bench_engines.py --images 200 --latency lognormal:400:0.5 --rpm 600 \
+        --rate-429 0.02 --rate-5xx 0.01
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+
+import standin_server
+
+
+def _make_images(folder: Path, count: int) -> list:
+    from PIL import Image
+    paths = []
+    for i in range(count):
+        p = folder / f"photo_{i:05d}.jpg"
+        # Tinted noise: distinct per photo and textured enough to pass the quality gate
+        noise = Image.effect_noise((1600, 1200), 48).convert("RGB")
+        tint = Image.new("RGB", (1600, 1200), ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256))
+        Image.blend(noise, tint, 0.4).save(p, quality=85)
+        paths.append(p)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark thread-pool vs async vision engines")
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--engines", default="threads,async")
+    standin_server.add_arguments(parser)
+    parser.set_defaults(rpm=600)
+    args = parser.parse_args()
+
+    state = standin_server.state_from_args(args)
+    server = standin_server.start_server(state)
+
+    work = Path(tempfile.mkdtemp(prefix="bench_engines_"))
+    os.environ["VISION_BASE_URL"] = standin_server.base_url(server)
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["WORKSPACE_DIR"] = str(work / "workspace")
+    os.environ["ANALYSIS_CACHE_DIR"] = str(work / "cache")
+
+    import vision
+    import run_report
+    import pipeline
+    from vision_cache import VisionCache
+
+    images = _make_images(work, args.images)
+    report = {}
+    for engine in [e.strip() for e in args.engines.split(",") if e.strip()]:
+        # Fresh cache per engine so every image hits the endpoint
+        vision.cache = VisionCache(work / f"cache_{engine}.sqlite3")
+        state.reset()
+        pipeline.reset_stats()
+        started = time.perf_counter()
+        results = run_report.analyze_images(images, engine=engine)
+        elapsed = time.perf_counter() - started
+        report[engine] = {
+            "images": len(results),
+            "seconds": round(elapsed, 3),
+            "images_per_sec": round(len(results) / elapsed, 2),
+            **state.stats(),
+        }
+        if pipeline.pipeline_stats():
+            report[engine]["pipeline"] = pipeline.pipeline_stats()
+
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Compare the old two-decode preparation with image_prep's single draft-mode decode.
+
+"before" reproduces the previous code: a full decode + exif_transpose + LANCZOS
+to ANALYSIS_MAX_PX for the model, then a second full decode + LANCZOS to 720 px
+for the PDF. "after" is image_prep.prepare_image(), which produces both outputs
+from one DCT-scaled decode. Reports CPU ms per photo and the megapixels
+decoded per photo (a proxy for peak decode memory, which Pillow allocates
+outside Python's tracked heap).
+
+Usage:
+    python benchmarks/bench_image_prep.py --images 10 --size 4032x3024
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+
+from PIL import Image, ImageOps
+
+
+def _make_images(folder: Path, count: int, size: tuple) -> list:
+    import numpy as np
+    rng = np.random.default_rng(3)
+    w, h = size
+    paths = []
+    for i in range(count):
+        blocks = rng.integers(30, 230, size=(h // 48 + 1, w // 48 + 1, 3), dtype=np.uint8)
+        arr = np.kron(blocks, np.ones((48, 48, 1), dtype=np.uint8))[:h, :w]
+        p = folder / f"photo_{i:03d}.jpg"
+        Image.fromarray(arr).save(p, quality=90)
+        paths.append(p)
+    return paths
+
+
+def _before(path: Path, analysis_max_px: int) -> None:
+    with Image.open(path) as im:
+        im = ImageOps.exif_transpose(im)
+        if max(im.size) > analysis_max_px:
+            s = analysis_max_px / float(max(im.size))
+            im = im.resize((int(im.width * s), int(im.height * s)), Image.LANCZOS)
+        im.convert("RGB").save(io.BytesIO(), format="JPEG", quality=88, optimize=True)
+    with Image.open(path) as im:
+        im = ImageOps.exif_transpose(im)
+        if max(im.size) > 720:
+            s = 720 / max(im.size)
+            im = im.resize((int(im.width * s), int(im.height * s)), Image.Resampling.LANCZOS)
+        im.save(io.BytesIO(), "JPEG", quality=50, optimize=True)
+
+
+def _measure(fn, paths, decoded_px: int) -> dict:
+    started = time.process_time()
+    for p in paths:
+        fn(p)
+    cpu = time.process_time() - started
+    return {"cpu_ms_per_photo": round(cpu * 1000 / len(paths), 1),
+            "decoded_megapixels_per_photo": round(decoded_px / 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-decode image preparation")
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--size", default="4032x3024", help="Synthetic photo size WxH")
+    parser.add_argument("--analysis-px", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ["DERIVATIVE_CACHE_MB"] = "0"  # measure decoding, not the derivative store
+    import quality_gate
+    import image_prep
+    quality_gate.QUALITY_GATE_ENABLED = False  # measure decode/resize only
+
+    work = Path(tempfile.mkdtemp(prefix="bench_prep_"))
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    paths = _make_images(work, args.images, size)
+
+    with Image.open(paths[0]) as im:
+        full_px = im.width * im.height
+    draft_im = image_prep._decode(paths[0], max(args.analysis_px, image_prep.PDF_MAX_PX))
+
+    before = _measure(lambda p: _before(p, args.analysis_px), paths, 2 * full_px)
+    after = _measure(lambda p: image_prep.prepare_image(p, args.analysis_px), paths,
+                     draft_im.width * draft_im.height)
+    print(json.dumps({
+        "photos": len(paths),
+        "size": args.size,
+        "before_two_decodes": before,
+        "after_single_draft_decode": after,
+        "cpu_ratio": round(after["cpu_ms_per_photo"] / max(before["cpu_ms_per_photo"], 0.001), 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
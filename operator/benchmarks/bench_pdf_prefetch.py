@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Compare generate_pdf's photo loop with and without PDF JPEG prefetching.
+
+Renders the same synthetic photo set (bench_pipeline's generator, default 200
+photos) with PDF_PREFETCH=0 and with the look-ahead pool on. The derivative
+store is disabled and nothing is analyzed first, so every photo page has to
+decode, rotate, resize and encode its photo: the work the prefetcher moves
+into worker processes.
+
+Reports pages/sec for both runs as JSON and whether the two PDFs are
+byte-for-byte identical (ReportLab's invariant mode pins timestamps and ids).
+
+Usage:
+    python benchmarks/bench_pdf_prefetch.py --photos 200 --depth 8 --processes 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF JPEG prefetching in generate_pdf")
+    parser.add_argument("--photos", type=int, default=200)
+    parser.add_argument("--scale", type=float, default=1.0, help="Photo size relative to a 12 MP camera")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--depth", type=int, default=None, help="Look-ahead window (default PDF_PREFETCH)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Prefetch processes (default PDF_PREFETCH_PROCESSES)")
+    parser.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "inspection_bench"))
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_prefetch_"))
+    os.environ["ANALYSIS_CACHE_DIR"] = str(work / "cache")
+    os.environ["DERIVATIVE_CACHE_MB"] = "0"
+
+    import bench_pipeline
+    from reportlab import rl_config
+    rl_config.invariant = 1
+    import pdf_prefetch
+    import run_report
+
+    if args.depth is not None:
+        pdf_prefetch.PDF_PREFETCH = args.depth
+    if args.processes is not None:
+        pdf_prefetch.PDF_PREFETCH_PROCESSES = args.processes
+    depth = pdf_prefetch.PDF_PREFETCH
+
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = bench_pipeline.generate_set(data_dir, args.photos, args.seed, args.scale,
+                                           bench_pipeline._heic_available(), os.cpu_count() or 2)
+    photos = work / "photos"
+    with zipfile.ZipFile(zip_path) as z:
+        z.extractall(work)
+    images = run_report.collect_images(photos)
+
+    report = {"photos": len(images), "depth": depth, "processes": pdf_prefetch.PDF_PREFETCH_PROCESSES}
+    digests = {}
+    for label, window in (("sequential", 0), ("prefetch", depth)):
+        pdf_prefetch.PDF_PREFETCH = window
+        pdf_path = work / f"{label}.pdf"
+        started = time.perf_counter()
+        run_report.generate_pdf("100 Benchmark Way", images, pdf_path)
+        elapsed = time.perf_counter() - started
+        pages = bench_pipeline._count_pages(pdf_path)
+        digests[label] = hashlib.sha256(pdf_path.read_bytes()).hexdigest()
+        report[label] = {"pdf_s": round(elapsed, 2), "pages": pages,
+                         "pages_per_sec": round(pages / elapsed, 1) if elapsed > 0 else None}
+    report["identical"] = digests["sequential"] == digests["prefetch"]
+    report["speedup"] = round(report["prefetch"]["pages_per_sec"] / report["sequential"]["pages_per_sec"], 2)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of build_reports' stages over synthetic inspections.
+
+Generates photo sets (default 50, 500 and 5,000 photos) that look like a phone
+export: 12 MP JPEGs in both orientations with EXIF orientation tags, PNG
+screenshots, and HEIC photos when pillow_heif is installed, zipped under
+photos/. Each set then runs extract -> collect -> dedupe -> analyze (against
+benchmarks/standin_server.py) -> PDF in a fresh child process, so peak RSS is
+per set, with an empty vision cache and derivative store.
+
+Reported per set, as JSON: wall time per stage, pages/sec (PDF stage and end
+to end), peak RSS of the report process and of its largest child (the prep
+pool), and PDF / ZIP sizes.
+
+Generated sets are kept in --data-dir and reused, since writing 5,000 12 MP
+photos takes longer than analyzing them.
+
+Usage:
+    python benchmarks/bench_pipeline.py --sizes 50,500 --save-baseline bench_baseline.json
+    python benchmarks/bench_pipeline.py --sizes 50,500 --compare bench_baseline.json --tolerance 15
+
+With --compare, metrics worse than the baseline by more than --tolerance percent
+are listed under "regressions" and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+
+# Phone exports: mostly landscape/portrait camera JPEGs, a few screenshots and HEICs
+CAMERA_SIZES = ((4032, 3024), (3024, 4032), (4000, 3000), (3264, 2448))
+SCREENSHOT_SIZE = (1170, 2532)
+ORIENTATIONS = ((1, 0.60), (6, 0.25), (8, 0.10), (3, 0.05))
+PNG_SHARE = 0.08
+HEIC_SHARE = 0.12
+
+# (metric, True if higher is better, smallest change worth reporting)
+COMPARED_METRICS = (
+    ("stages.extract_s", False, 0.05),
+    ("stages.collect_s", False, 0.05),
+    ("stages.dedupe_s", False, 0.05),
+    ("stages.analyze_s", False, 0.05),
+    ("stages.pdf_s", False, 0.05),
+    ("total_s", False, 0.1),
+    ("pages_per_sec", True, 0.5),
+    ("end_to_end_pages_per_sec", True, 0.5),
+    ("peak_rss_mb", False, 5.0),
+    ("peak_child_rss_mb", False, 5.0),
+    ("pdf_mb", False, 0.05),
+)
+
+
+def _heic_available() -> bool:
+    try:
+        from pillow_heif import register_heif_opener
+    except ImportError:
+        return False
+    register_heif_opener()
+    return True
+
+
+def _pick(rng: random.Random, weighted) -> object:
+    roll = rng.random()
+    for value, weight in weighted:
+        roll -= weight
+        if roll < 0:
+            return value
+    return weighted[-1][0]
+
+
+def _photo_spec(seed: int, index: int, heic: bool, scale: float) -> tuple:
+    """(file name, format, size, EXIF orientation) for one photo, fixed by seed and index."""
+    rng = random.Random(seed * 1_000_003 + index)
+    roll = rng.random()
+    if roll < PNG_SHARE:
+        fmt, size, orientation = "PNG", SCREENSHOT_SIZE, 1
+    else:
+        fmt = "HEIF" if heic and roll < PNG_SHARE + HEIC_SHARE else "JPEG"
+        size, orientation = rng.choice(CAMERA_SIZES), _pick(rng, ORIENTATIONS)
+    size = (max(64, int(size[0] * scale)), max(64, int(size[1] * scale)))
+    ext = {"JPEG": "JPG", "PNG": "PNG", "HEIF": "HEIC"}[fmt]
+    return f"IMG_{index + 1:04d}.{ext}", fmt, size, orientation
+
+
+def _write_photo(folder: str, seed: int, index: int, heic: bool, scale: float) -> int:
+    """Runs in a pool process. Writes one photo and returns its size in bytes."""
+    from PIL import Image
+    if heic:
+        _heic_available()
+    name, fmt, (w, h), orientation = _photo_spec(seed, index, heic, scale)
+    rng = random.Random(seed * 7_919 + index)
+    # Random 24 px blocks: distinct per photo (no dedupe collapse) and sharp enough for the quality gate
+    block = 24
+    bw, bh = w // block + 1, h // block + 1
+    img = Image.frombytes("RGB", (bw, bh), rng.randbytes(bw * bh * 3))
+    img = img.resize((bw * block, bh * block), Image.NEAREST).crop((0, 0, w, h))
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = "Synthetic"
+    path = Path(folder) / name
+    if fmt == "PNG":
+        img.save(path, format="PNG", exif=exif.tobytes())
+    else:
+        img.save(path, format=fmt, quality=85, exif=exif.tobytes())
+    return path.stat().st_size
+
+
+def generate_set(data_dir: Path, count: int, seed: int, scale: float, heic: bool, workers: int) -> Path:
+    """Return the ZIP for this set, generating it first if data_dir doesn't have it yet."""
+    tag = f"set_{count}_s{seed}_x{scale:g}{'_heic' if heic else ''}"
+    zip_path = data_dir / f"{tag}.zip"
+    if zip_path.exists():
+        return zip_path
+    staging = data_dir / f"{tag}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    photos = staging / "photos"
+    photos.mkdir(parents=True)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        written = sum(pool.map(_write_photo, [str(photos)] * count, [seed] * count, range(count),
+                               [heic] * count, [scale] * count, chunksize=8))
+    # Photos are already compressed; phone exports store them as-is
+    partial = zip_path.with_suffix(".zip.part")
+    with zipfile.ZipFile(partial, "w", compression=zipfile.ZIP_STORED) as z:
+        for p in sorted(photos.iterdir()):
+            z.write(p, f"photos/{p.name}")
+    partial.rename(zip_path)
+    shutil.rmtree(staging, ignore_errors=True)
+    print(f"Generated {count} photos ({written / 2**20:.0f} MB) in {time.perf_counter() - started:.1f}s "
+          f"-> {zip_path}", file=sys.stderr, flush=True)
+    return zip_path
+
+
+def _count_pages(pdf_path: Path) -> int:
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(str(pdf_path)).pages)
+    except ImportError:
+        import re
+        return len(re.findall(rb"/Type\s*/Page\b", pdf_path.read_bytes()))
+
+
+def _max_rss_mb(who: int) -> float:
+    rss = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def run_set(zip_path: Path, engine: str) -> dict:
+    """Run build_reports' stages on zip_path in this process. Env must already point at the stand-in."""
+    import run_report
+
+    stages = {}
+    started = time.perf_counter()
+    async_engine = run_report.create_async_engine() if engine == "async" else None
+    fragments = None
+    photos_dir = None
+    try:
+        t0 = time.perf_counter()
+        photos_dir = run_report.extract_zip(zip_path)
+        stages["extract_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        images = run_report.collect_images(photos_dir)
+        stages["collect_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        analysis_images, duplicates = images, {}
+        if run_report.DEDUPE_AVAILABLE:
+            analysis_images, duplicates = run_report.collapse_near_duplicates(images)
+        stages["dedupe_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        if run_report.INCREMENTAL_RENDER:
+            fragments = run_report.PhotoFragmentRenderer(duplicates)
+        vision_results = run_report.analyze_images(analysis_images, engine=engine, async_engine=async_engine,
+                                                   on_result=fragments.submit if fragments else None)
+        if duplicates:
+            vision_results = run_report.expand_duplicate_results(vision_results, duplicates)
+        stages["analyze_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        pdf_path = run_report.OUTPUTS_DIR / "bench.pdf"
+        run_report.generate_pdf("100 Benchmark Way", images, pdf_path, vision_results,
+                                "Bench Client", "Quarterly", [], fragments=fragments)
+        stages["pdf_s"] = time.perf_counter() - t0
+    finally:
+        if async_engine is not None:
+            async_engine.close()
+        if fragments is not None:
+            fragments.close()
+        if photos_dir is not None:
+            shutil.rmtree(photos_dir, ignore_errors=True)
+    total = time.perf_counter() - started
+
+    pages = _count_pages(pdf_path)
+    result = {
+        "photos": len(images),
+        "analyzed": len(analysis_images),
+        "pages": pages,
+        "stages": {k: round(v, 3) for k, v in stages.items()},
+        "total_s": round(total, 3),
+        "pages_per_sec": round(pages / stages["pdf_s"], 2) if stages["pdf_s"] > 0 else 0.0,
+        "end_to_end_pages_per_sec": round(pages / total, 2) if total > 0 else 0.0,
+        "peak_rss_mb": _max_rss_mb(resource.RUSAGE_SELF),
+        "peak_child_rss_mb": _max_rss_mb(resource.RUSAGE_CHILDREN),
+        "pdf_mb": round(pdf_path.stat().st_size / 2**20, 3),
+        "zip_mb": round(zip_path.stat().st_size / 2**20, 1),
+    }
+    if run_report.PIPELINE_AVAILABLE and run_report.pipeline_stats():
+        result["pipeline"] = run_report.pipeline_stats()
+    return result
+
+
+def _run_child(zip_path: Path, engine: str, base_url: str, work: Path, log_path: Path) -> dict:
+    """Run one set in a fresh interpreter with its own workspace and empty caches."""
+    env = dict(os.environ)
+    env.update({
+        "VISION_BASE_URL": base_url,
+        "OPENAI_API_KEY": "bench",
+        "WORKSPACE_DIR": str(work / "workspace"),
+        "ANALYSIS_CACHE_DIR": str(work / "cache"),
+    })
+    out_path = work / "result.json"
+    with open(log_path, "w") as log:
+        subprocess.run([sys.executable, str(Path(__file__).resolve()), "--run-set", str(zip_path),
+                        "--engine", engine, "--result", str(out_path)],
+                       cwd=str(work), env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+    return json.loads(out_path.read_text())
+
+
+def _lookup(result: dict, dotted: str):
+    value = result
+    for part in dotted.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(current: dict, baseline: dict, tolerance_pct: float) -> tuple:
+    """Return ({set: {metric: change}}, [regression descriptions])."""
+    changes, regressions = {}, []
+    for size, result in current["sets"].items():
+        base = baseline.get("sets", {}).get(size)
+        if base is None:
+            continue
+        per_set = {}
+        for metric, higher_is_better, min_delta in COMPARED_METRICS:
+            now, before = _lookup(result, metric), _lookup(base, metric)
+            if now is None or before is None or before == 0:
+                continue
+            change_pct = (now - before) / before * 100
+            worse = (now < before) if higher_is_better else (now > before)
+            regressed = worse and abs(change_pct) > tolerance_pct and abs(now - before) >= min_delta
+            per_set[metric] = {"baseline": before, "current": now, "change_pct": round(change_pct, 1),
+                               "regression": regressed}
+            if regressed:
+                regressions.append(f"{size} photos: {metric} {before} -> {now} ({change_pct:+.1f}%)")
+        changes[size] = per_set
+    return changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end report pipeline benchmark")
+    parser.add_argument("--sizes", default="50,500,5000", help="Comma-separated photo counts")
+    parser.add_argument("--engine", default=os.getenv("ANALYSIS_ENGINE", "threads"))
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale photo dimensions (1.0 = 12 MP)")
+    parser.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "bench_pipeline_data"))
+    parser.add_argument("--gen-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--no-heic", action="store_true", help="Don't include HEIC photos even if pillow_heif is installed")
+    parser.add_argument("--save-baseline", help="Write the results here for later --compare runs")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Allowed slowdown, in percent")
+    parser.add_argument("--keep", action="store_true", help="Keep workspaces and logs")
+    parser.add_argument("--run-set", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    import standin_server
+    standin_server.add_arguments(parser)
+    parser.set_defaults(latency="lognormal:300:0.4", seed=7)
+    args = parser.parse_args()
+
+    if args.run_set:
+        Path(args.result).write_text(json.dumps(run_set(Path(args.run_set), args.engine.lower())))
+        return
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())  # fail before spending the run time
+
+    heic = not args.no_heic and _heic_available()
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    state = standin_server.state_from_args(args)
+    server = standin_server.start_server(state)
+    report = {
+        "config": {"engine": args.engine, "scale": args.scale, "heic": heic, "latency": args.latency,
+                   "rpm": args.rpm, "rate_429": args.rate_429, "rate_5xx": args.rate_5xx,
+                   "seed": args.seed, "cpus": os.cpu_count()},
+        "sets": {},
+    }
+    try:
+        for count in sizes:
+            zip_path = generate_set(data_dir, count, args.seed, args.scale, heic, args.gen_workers)
+            work = Path(tempfile.mkdtemp(prefix=f"bench_pipeline_{count}_"))
+            state.reset()
+            print(f"Running {count} photos (log: {work / 'run.log'})", file=sys.stderr, flush=True)
+            try:
+                result = _run_child(zip_path, args.engine.lower(), standin_server.base_url(server),
+                                    work, work / "run.log")
+            except subprocess.CalledProcessError:
+                print(f"Run failed; see {work / 'run.log'}", file=sys.stderr)
+                raise
+            result["standin"] = state.stats()
+            report["sets"][str(count)] = result
+            if not args.keep:
+                shutil.rmtree(work, ignore_errors=True)
+    finally:
+        server.shutdown()
+
+    regressions = []
+    if args.compare:
+        report["comparison"], regressions = compare(report, baseline, args.tolerance)
+        report["regressions"] = regressions
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:g}%:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Measure the per-image CPU cost of the photo quality gate.
+
+Generates synthetic 12 MP-style photos (sharp, motion-blurred, pocket-dark,
+blank/thumb-over-lens, and a sharp but mostly flat ceiling with a water stain), runs them through vision._analysis_image_bytes with
+the gate on and off, and reports CPU milliseconds per image for the gate alone
+and for the full preparation step, plus the verdict for each kind of photo.
+
+Usage:
+    python benchmarks/bench_quality_gate.py --size 4032x3024 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+
+
+def _make_images(folder: Path, size: tuple) -> dict:
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = np.random.default_rng(7)
+    w, h = size
+    # Blocky texture with hard edges stands in for a real room
+    blocks = rng.integers(40, 220, size=(h // 64 + 1, w // 64 + 1, 3), dtype=np.uint8)
+    base = np.kron(blocks, np.ones((64, 64, 1), dtype=np.uint8))[:h, :w]
+    base = np.clip(base.astype(np.int16) + rng.integers(-12, 12, size=base.shape), 0, 255).astype(np.uint8)
+    sharp = Image.fromarray(base)
+    # In-focus ceiling: flat paint with a little sensor noise and one stain
+    paint = np.full((h, w, 3), (228, 226, 218), dtype=np.float32) + rng.normal(0, 2.5, size=(h, w, 1))
+    ceiling = Image.fromarray(np.clip(paint, 0, 255).astype(np.uint8))
+    ImageDraw.Draw(ceiling).ellipse((w * 3 // 8, h // 3, w * 4 // 7, h // 2), fill=(205, 195, 170),
+                                    outline=(170, 150, 115), width=max(2, w // 300))
+
+    kinds = {
+        "sharp": sharp,
+        "blurry": sharp.filter(ImageFilter.BoxBlur(40)),
+        "dark": Image.fromarray((base // 12).astype(np.uint8)),
+        "blank": Image.new("RGB", size, (182, 120, 104)).filter(ImageFilter.GaussianBlur(8)),
+        "flat_stain": ceiling,
+    }
+    paths = {}
+    for name, im in kinds.items():
+        p = folder / f"{name}.jpg"
+        im.save(p, quality=90)
+        paths[name] = p
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the photo quality gate")
+    parser.add_argument("--size", default="4032x3024", help="Synthetic photo size WxH")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_quality_"))
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ["ANALYSIS_CACHE_DIR"] = str(work / "cache")
+
+    import quality_gate
+    import vision
+    from PIL import Image, ImageOps
+
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    paths = _make_images(work, size)
+
+    report = {}
+    for name, path in paths.items():
+        # Gate alone, on the same downscaled copy _analysis_image_bytes checks
+        with Image.open(path) as im:
+            im = ImageOps.exif_transpose(im)
+            im.thumbnail((vision.ANALYSIS_MAX_PX, vision.ANALYSIS_MAX_PX), Image.LANCZOS)
+            im.load()
+        started = time.process_time()
+        for _ in range(args.repeat):
+            metrics = quality_gate.measure(im)
+        gate_ms = (time.process_time() - started) * 1000 / args.repeat
+
+        # Full preparation with and without the gate
+        timings = {}
+        for enabled in (False, True):
+            quality_gate.QUALITY_GATE_ENABLED = enabled
+            started = time.process_time()
+            for _ in range(args.repeat):
+                try:
+                    vision._analysis_image_bytes(path)
+                except quality_gate.PhotoRejected:
+                    pass
+            timings[enabled] = (time.process_time() - started) * 1000 / args.repeat
+
+        report[name] = {
+            "verdict": quality_gate.verdict(metrics) or "ok",
+            "metrics": {k: round(v, 2) for k, v in metrics.items()},
+            "gate_cpu_ms": round(gate_ms, 2),
+            "prepare_cpu_ms_gate_off": round(timings[False], 2),
+            "prepare_cpu_ms_gate_on": round(timings[True], 2),
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of analysis lookups at report scale (default 10,000 photos).
+
+Builds synthetic analyses spread over the report's rooms and times the work
+generate_pdf does per photo — grouping by location, the action items page map
+and one lookup per photo page — two ways:
+
+- scan: the previous lookup (full path, else a scan of every result for the
+  same file name)
+- store: InspectionResultStore's indexes
+
+Each runs with result keys equal to the image paths ("same paths") and with
+keys under another directory ("moved", e.g. a resumed job whose photos were
+re-extracted), where every scan lookup falls back to the full scan. Scan
+timings in the moved case are measured on --sample photos and scaled up,
+since the full quadratic run takes minutes.
+
+Usage:
+    python benchmarks/bench_result_store.py --photos 10000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+
+ROOM_NAMES = ("Kitchen", "Living Room", "Master Bedroom", "Bedroom 2", "Bathroom", "Half Bath",
+              "Garage", "Front Yard", "Patio", "Hallway", "Laundry", "Closet", "Unknown")
+
+
+def _legacy_lookup(vision_results: Dict, img_path: Path):
+    img_path_str = str(img_path)
+    if img_path_str in vision_results:
+        return vision_results[img_path_str]
+    for key, value in vision_results.items():
+        if Path(key).name == img_path.name:
+            return value
+    return None
+
+
+def _make_results(count: int, key_dir: Path):
+    from analysis_model import Analysis, Issue
+
+    rng = random.Random(7)
+    results = {}
+    for i in range(count):
+        issues = [Issue("Loose outlet cover", rng.choice(("OWNER", "TENANT")), "FIX SOON")] \
+            if rng.random() < 0.2 else []
+        results[str(key_dir / f"IMG_{i:05d}.jpg")] = Analysis(rng.choice(ROOM_NAMES), issues)
+    return results
+
+
+def _scan_pass(images, results, normalize, limit: Optional[int] = None) -> float:
+    """Group + page map + page loop with the legacy scan, over the first limit photos."""
+    sample = images[:limit] if limit else images
+    started = time.perf_counter()
+    groups: Dict[str, list] = {}
+    for img in sample:
+        analysis = _legacy_lookup(results, img)
+        loc = normalize(analysis.location) if analysis and analysis.location else "Other"
+        groups.setdefault(loc, []).append(img)
+    page_map = {str(img): n for n, img in enumerate(sample)}
+    for img in sample:
+        _legacy_lookup(results, img)
+    elapsed = time.perf_counter() - started
+    assert page_map
+    return elapsed * (len(images) / len(sample))
+
+
+def _store_pass(images, results) -> float:
+    import run_report
+
+    started = time.perf_counter()
+    store = run_report.result_store(results)
+    grouped = run_report.group_images_by_location(images, store)
+    run_report.calculate_image_page_map(grouped, True, store)
+    for img in images:
+        store.lookup(img)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analysis lookups at report scale")
+    parser.add_argument("--photos", type=int, default=10000)
+    parser.add_argument("--sample", type=int, default=300, help="Photos timed for the quadratic scan")
+    args = parser.parse_args()
+
+    import run_report
+
+    photos_dir = Path("/inspection/photos")
+    images = [photos_dir / f"IMG_{i:05d}.jpg" for i in range(args.photos)]
+    report = {"photos": args.photos}
+    for case, key_dir in (("same paths", photos_dir), ("moved", Path("/previous-run/photos"))):
+        results = _make_results(args.photos, key_dir)
+        limit = None if key_dir == photos_dir else min(args.sample, args.photos)
+        scan_s = _scan_pass(images, results, run_report.normalize_location, limit)
+        store_s = _store_pass(images, results)
+        report[case] = {
+            "scan_s": round(scan_s, 3),
+            "scan_extrapolated": limit is not None,
+            "store_s": round(store_s, 3),
+            "speedup": round(scan_s / store_s, 1) if store_s > 0 else None,
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Compare generate_pdf drawing its location sections in one process and in parallel.
+
+Renders the same synthetic photo set (bench_pipeline's generator, default 300
+photos) with made-up analyses spread over --rooms report sections, about one
+photo in five with issues (some long enough for continuation pages). Runs once
+with PDF_SECTIONS_PARALLEL off and once with the section pool on, then checks
+that both PDFs have the same page count and the same footer page numbers.
+
+Reports pages/sec for both runs as JSON. Needs pypdf for the parallel run.
+
+Usage:
+    python benchmarks/bench_section_render.py --photos 300 --rooms 14 --processes 4
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+ROOMS = ("Kitchen", "Living Room", "Dining Room", "Main Bedroom", "Bedroom 2", "Bedroom 3",
+         "Main Bathroom", "Bathroom", "Half Bathroom", "Laundry Room", "Garage", "Exterior",
+         "Patio", "Porch", "Attic", "Basement", "Hallway", "Closet", "Office")
+
+
+def _make_results(images, rooms: int, seed: int):
+    from analysis_model import Analysis, Issue
+
+    rng = random.Random(seed)
+    results = {}
+    for img in images:
+        issues = []
+        if rng.random() < 0.2:
+            issues = [Issue(f"Water stain on the ceiling near the vent, about {n} inches across; "
+                            f"check the unit above for a slow leak", rng.choice(("OWNER", "TENANT")), "FIX SOON")
+                      for n in range(rng.choice((1, 2, 12)))]
+        results[str(img)] = Analysis(ROOMS[rng.randrange(rooms)], issues)
+    return results
+
+
+def _footer_pages(pdf_path: Path):
+    """Page numbers printed in the footers, in page order."""
+    from pypdf import PdfReader
+    return [re.findall(r"Page (\d+)", page.extract_text() or "")[-1:] for page in PdfReader(str(pdf_path)).pages]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark section-parallel PDF rendering in generate_pdf")
+    parser.add_argument("--photos", type=int, default=300)
+    parser.add_argument("--rooms", type=int, default=14, help=f"Report sections (at most {len(ROOMS)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="Photo size relative to a 12 MP camera")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Section processes (default PDF_SECTION_PROCESSES)")
+    parser.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "inspection_bench"))
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_sections_"))
+    os.environ["ANALYSIS_CACHE_DIR"] = str(work / "cache")
+
+    import bench_pipeline
+    import section_render
+    import run_report
+
+    if not section_render.PYPDF_AVAILABLE:
+        sys.exit("pypdf is not installed; the parallel run needs it")
+    if args.processes is not None:
+        section_render.PDF_SECTION_PROCESSES = args.processes
+    section_render.PDF_SECTION_MIN = 2
+
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = bench_pipeline.generate_set(data_dir, args.photos, args.seed, args.scale,
+                                           bench_pipeline._heic_available(), os.cpu_count() or 2)
+    photos = work / "photos"
+    with zipfile.ZipFile(zip_path) as z:
+        z.extractall(work)
+    images = run_report.collect_images(photos)
+    results = _make_results(images, min(args.rooms, len(ROOMS)), args.seed)
+
+    # Both runs compress every photo once; warm the derivative store so neither pays for it
+    for img in images:
+        run_report.pdf_jpeg(img)
+
+    report = {"photos": len(images), "sections": len(run_report.group_images_by_location(images, results)),
+              "processes": section_render.PDF_SECTION_PROCESSES}
+    footers = {}
+    for label, parallel in (("sequential", False), ("parallel", True)):
+        section_render.PDF_SECTIONS_PARALLEL = parallel
+        pdf_path = work / f"{label}.pdf"
+        started = time.perf_counter()
+        run_report.generate_pdf("100 Benchmark Way", images, pdf_path, results)
+        elapsed = time.perf_counter() - started
+        pages = bench_pipeline._count_pages(pdf_path)
+        footers[label] = _footer_pages(pdf_path)
+        report[label] = {"pdf_s": round(elapsed, 2), "pages": pages,
+                         "pages_per_sec": round(pages / elapsed, 1) if elapsed > 0 else None}
+    report["same_page_numbers"] = footers["sequential"] == footers["parallel"]
+    report["speedup"] = round(report["parallel"]["pages_per_sec"] / report["sequential"]["pages_per_sec"], 2)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Compare the adaptive upload policy with the fixed ANALYSIS_MAX_PX upload.
+
+Runs the same photo folder through analyze_images twice, each in a fresh child
+process with an empty vision cache and derivative store: once with
+UPLOAD_POLICY=fixed and once with UPLOAD_POLICY=adaptive. Reported per policy,
+as JSON: upload bytes and estimated image tokens per image (first and second
+pass), the plan tiers chosen, preparation + analysis wall time, and how many
+photos came back with issues.
+
+By default the requests go to benchmarks/standin_server.py, which answers from
+a hash of the uploaded bytes, so the two runs' answers are unrelated and only
+the byte, token and timing numbers mean anything. With --live the requests go
+to the configured API (this costs money) and the report also includes how
+often both policies agreed on whether a photo has issues and on its issue
+count.
+
+Without --dir a mixed synthetic set is generated: plain walls (smooth, with a
+sharp door edge), room shots (large features) and close-ups (fine texture).
+
+Usage:
+    python benchmarks/bench_upload_policy.py --count 60
+    python benchmarks/bench_upload_policy.py --dir "C:/Inspections/123 Main St" --live
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+
+POLICIES = ("fixed", "adaptive")
+KINDS = (("wall", 0.35), ("room", 0.40), ("closeup", 0.25))
+
+
+def _synthetic_photo(rng: random.Random, kind: str, size: tuple):
+    from PIL import Image, ImageChops, ImageDraw, ImageFilter
+    w, h = size
+    if kind == "closeup":
+        block = 3                     # texture finer than a 512 px copy can show
+    elif kind == "room":
+        block = max(8, w // 40)       # large furniture-sized features
+    else:
+        block = max(8, w // 12)
+    bw, bh = w // block + 1, h // block + 1
+    img = Image.frombytes("RGB", (bw, bh), rng.randbytes(bw * bh * 3))
+    img = img.resize((bw * block, bh * block), Image.NEAREST).crop((0, 0, w, h))
+    if kind == "wall":
+        img = img.filter(ImageFilter.GaussianBlur(block))
+        x = rng.randrange(w // 4, 3 * w // 4)
+        ImageDraw.Draw(img).rectangle((x, h // 5, x + w // 6, h), fill=(90, 60, 40))
+        # Faint plaster texture and sensor noise, so the quality gate doesn't call it blurry
+        noise = Image.effect_noise((w, h), 8).convert("RGB")
+        img = ImageChops.add(img, noise, offset=-128)
+    return img
+
+
+def generate_set(folder: Path, count: int, seed: int, scale: float) -> None:
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        rng = random.Random(seed * 1_000_003 + i)
+        roll, kind = rng.random(), KINDS[-1][0]
+        for name, weight in KINDS:
+            roll -= weight
+            if roll < 0:
+                kind = name
+                break
+        size = (max(64, int(4032 * scale)), max(64, int(3024 * scale)))
+        _synthetic_photo(rng, kind, size).save(folder / f"{kind}_{i + 1:04d}.jpg", quality=85)
+
+
+def run_policy(folder: Path) -> dict:
+    """Analyze folder in this process. Env must already select the policy and endpoint."""
+    import run_report
+    import upload_policy
+
+    images = run_report.collect_images(folder)
+    started = time.perf_counter()
+    results = run_report.analyze_images(images, engine="threads")
+    wall = time.perf_counter() - started
+    tiers = {}
+    for passes in upload_policy.upload_stats().values():
+        for tier, n in passes["tiers"].items():
+            tiers[tier] = tiers.get(tier, 0) + n
+    return {
+        "wall_s": round(wall, 3),
+        "uploads": upload_policy.upload_stats(),
+        "tiers": tiers,
+        "answers": {Path(p).name: len(a.issues) for p, a in results.items()},
+    }
+
+
+def _run_child(policy: str, folder: Path, env_extra: dict, work: Path) -> dict:
+    env = dict(os.environ)
+    env.update(env_extra)
+    env.update({"UPLOAD_POLICY": policy, "ANALYSIS_CACHE_DIR": str(work / "cache"),
+                "WORKSPACE_DIR": str(work / "workspace")})
+    out_path = work / "result.json"
+    with open(work / "run.log", "w") as log:
+        subprocess.run([sys.executable, str(Path(__file__).resolve()), "--run-policy", str(folder),
+                        "--result", str(out_path)],
+                       cwd=str(work), env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+    return json.loads(out_path.read_text())
+
+
+def _summary(result: dict) -> dict:
+    out = {"wall_s": result["wall_s"], "tiers": result["tiers"]}
+    for pass_name, up in result["uploads"].items():
+        out[pass_name] = {
+            "images": up["images"],
+            "mb": round(up["bytes"] / 2**20, 2),
+            "kb_per_image": round(up["bytes"] / 1024 / up["images"], 1),
+            "tokens": up["tokens"],
+            "tokens_per_image": round(up["tokens"] / up["images"], 1),
+        }
+    out["with_issues"] = sum(1 for n in result["answers"].values() if n)
+    return out
+
+
+def _agreement(fixed: dict, adaptive: dict) -> dict:
+    names = sorted(set(fixed) & set(adaptive))
+    if not names:
+        return {}
+    same_verdict = sum(1 for n in names if bool(fixed[n]) == bool(adaptive[n]))
+    same_count = sum(1 for n in names if fixed[n] == adaptive[n])
+    return {"photos": len(names),
+            "same_issue_verdict_pct": round(100.0 * same_verdict / len(names), 1),
+            "same_issue_count_pct": round(100.0 * same_count / len(names), 1)}
+
+
+def _change(before: float, after: float) -> float:
+    return round((after - before) / before * 100, 1) if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive vs fixed upload policy")
+    parser.add_argument("--dir", help="Photo folder (default: generate a synthetic set)")
+    parser.add_argument("--count", type=int, default=40, help="Synthetic photos to generate")
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale synthetic photos (1.0 = 12 MP)")
+    parser.add_argument("--live", action="store_true", help="Use the configured API instead of the stand-in")
+    parser.add_argument("--keep", action="store_true", help="Keep workspaces and logs")
+    parser.add_argument("--run-policy", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    import standin_server
+    standin_server.add_arguments(parser)
+    parser.set_defaults(latency="lognormal:300:0.4", seed=7)
+    args = parser.parse_args()
+
+    if args.run_policy:
+        Path(args.result).write_text(json.dumps(run_policy(Path(args.run_policy))))
+        return
+
+    work_root = Path(tempfile.mkdtemp(prefix="bench_upload_policy_"))
+    folder = Path(args.dir) if args.dir else work_root / "photos"
+    if not args.dir:
+        generate_set(folder, args.count, args.seed, args.scale)
+
+    server = None
+    env_extra = {}
+    if not args.live:
+        server = standin_server.start_server(standin_server.state_from_args(args))
+        env_extra = {"VISION_BASE_URL": standin_server.base_url(server), "OPENAI_API_KEY": "bench"}
+    results = {}
+    try:
+        for policy in POLICIES:
+            work = work_root / policy
+            work.mkdir()
+            print(f"Running {policy} (log: {work / 'run.log'})", file=sys.stderr, flush=True)
+            results[policy] = _run_child(policy, folder, env_extra, work)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    fixed, adaptive = _summary(results["fixed"]), _summary(results["adaptive"])
+    report = {"config": {"photos": str(folder) if args.dir else f"synthetic x{args.count}",
+                         "scale": args.scale, "live": args.live},
+              "fixed": fixed, "adaptive": adaptive, "change_pct": {}}
+    for pass_name in ("first pass", "second pass"):
+        if pass_name in fixed and pass_name in adaptive:
+            report["change_pct"][pass_name] = {
+                metric: _change(fixed[pass_name][metric], adaptive[pass_name][metric])
+                for metric in ("kb_per_image", "tokens_per_image")}
+    report["change_pct"]["wall_s"] = _change(fixed["wall_s"], adaptive["wall_s"])
+    if args.live:
+        report["agreement"] = _agreement(results["fixed"]["answers"], results["adaptive"]["answers"])
+    print(json.dumps(report, indent=2))
+    if not args.keep:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Offline OpenAI-compatible stand-in for the vision endpoint.
+
+Serves /v1/chat/completions with a configurable latency distribution, a
+requests-per-minute limit, and random 429 / 5xx injection, so analyze_images
+can be load-tested and regression-tested without spending API money. Point
+the vision client at it with VISION_BASE_URL.
+
+Answers come in the format the client asked for: JSON matching the response
+schema (single photo or batch), or the free-text SYSTEM format when no
+response_format is sent (VISION_OUTPUT=text). "canned" mode returns the same
+answer every time; "seeded" mode derives a room, issues and actions from the
+photo bytes and --seed, so the same photo always gets the same analysis no
+matter the request order.
+
+Requests with "stream": true get server-sent events: the first chunk arrives
+after --ttft-fraction of the sampled latency and the rest of the answer is
+spread over the remainder. --stream-tail keeps "generating" that many extra
+characters after the answer, like a model that rambles on, so clients that
+hang up early can be measured (non-streamed answers wait for, and include,
+the tail too).
+
+Usage:
+    python benchmarks/standin_server.py --port 8765 --latency lognormal:400:0.6 \\
+        --rate-429 0.02 --rate-5xx 0.01 --analysis seeded
+    VISION_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=standin python run_report.py ...
+
+GET /v1/standin/stats returns request, error and per-photo latency counters.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+
+from analysis_model import ROOMS
+
+# (description, responsibility, priority, action)
+ISSUE_POOL = (
+    ("Water stain on the ceiling", "OWNER", "FIX SOON", "Call a contractor to find and fix the leak"),
+    ("Dirty air filter in the air conditioner", "TENANT", "FIX SOON", "Tenant buys a new filter at the hardware store"),
+    ("Smoke alarm is missing", "OWNER", "FIX NOW", "Put up a smoke alarm (required by law)"),
+    ("Slow drain in the sink", "TENANT", "FIX SOON", "Tenant uses drain cleaner or a plunger"),
+    ("Hole in the wall", "OWNER", "FIX SOON", "Call a handyman to patch the wall"),
+    ("Broken outlet cover", "OWNER", "FIX NOW", "Call an electrician"),
+    ("Toilet keeps running", "TENANT", "FIX SOON", "Tenant replaces the rubber piece inside the tank"),
+    ("Cracked window glass", "OWNER", "FIX SOON", "Call a handyman to replace the glass"),
+)
+
+CANNED = {
+    "location": "Kitchen",
+    "issues": [{"description": "Water stain on ceiling above the sink",
+                "responsibility": "OWNER", "priority": "FIX SOON"}],
+    "actions": ["Call a contractor to find and fix the leak"],
+}
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency spec into a sampler returning seconds:
+    fixed:MS, uniform:LO_MS:HI_MS or lognormal:MEDIAN_MS:SIGMA.
+    """
+    kind, _, rest = spec.partition(":")
+    args = [float(v) for v in rest.split(":") if v]
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0] / 1000.0
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1]) / 1000.0
+    if kind == "lognormal" and len(args) == 2:
+        mu = math.log(max(args[0], 0.001))
+        return lambda rng: rng.lognormvariate(mu, args[1]) / 1000.0
+    raise ValueError(f"Bad latency spec {spec!r} (use fixed:MS, uniform:LO:HI or lognormal:MEDIAN:SIGMA)")
+
+
+def seeded_analysis(photo_key: str, seed: int, clean_rate: float, salt: str = "") -> dict:
+    """Deterministic analysis for one photo (salt gives the second pass its own draw)."""
+    rng = random.Random(f"{seed}:{photo_key}:{salt}")
+    location = ROOMS[rng.randrange(len(ROOMS))]
+    if rng.random() < clean_rate:
+        return {"location": location, "issues": [], "actions": []}
+    picks = rng.sample(ISSUE_POOL, rng.randint(1, 3))
+    return {
+        "location": location,
+        "issues": [{"description": d, "responsibility": r, "priority": p} for d, r, p, _ in picks],
+        "actions": [a for _, _, _, a in picks],
+    }
+
+
+def as_text(analysis: dict) -> str:
+    """Render an analysis in the free-text SYSTEM format."""
+    if not analysis["issues"]:
+        return f"Location: {analysis['location']}\nNo repairs needed"
+    issues = "\n".join(f"- [{i['responsibility']}] [{i['priority']}] {i['description']}" for i in analysis["issues"])
+    actions = "\n".join(f"- {a}" for a in analysis["actions"])
+    return f"Location: {analysis['location']}\n\nIssues to Address:\n{issues}\n\nWhat To Do:\n{actions}"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class StandinState:
+    """Configuration plus counters shared by all request handler threads."""
+
+    def __init__(self, latency: str = "fixed:400", rpm: int = 0, rate_429: float = 0.0,
+                 rate_5xx: float = 0.0, retry_after_s: float = 1.0, analysis: str = "seeded",
+                 seed: int = 0, clean_rate: float = 0.4, ttft_fraction: float = 0.3,
+                 stream_tail: int = 0):
+        self.sample_latency = parse_latency(latency)
+        self.latency_spec = latency
+        self.rpm = rpm
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after_s = retry_after_s
+        self.analysis = analysis
+        self.seed = seed
+        self.clean_rate = clean_rate
+        self.ttft_fraction = ttft_fraction
+        self.stream_tail = stream_tail
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.requests = 0
+        self.ok = 0
+        self.throttled = 0    # 429s from the RPM limit
+        self.injected_429 = 0
+        self.injected_5xx = 0
+        self._photos: Dict[str, List[float]] = {}  # photo key -> [first request, last answer]
+
+    def reset(self) -> None:
+        with self.lock:
+            self.window_start, self.window_count = time.monotonic(), 0
+            self.requests = self.ok = self.throttled = self.injected_429 = self.injected_5xx = 0
+            self._photos = {}
+
+    def admit(self, photo_keys: List[str]) -> Tuple[int, int, float, float]:
+        """Decide one request's fate: (status, remaining, reset_s, latency_s)."""
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            for key in photo_keys:
+                self._photos.setdefault(key, [now, 0.0])
+            if now - self.window_start >= 60:
+                self.window_start, self.window_count = now, 0
+            reset = 60 - (now - self.window_start)
+            if self.rpm and self.window_count >= self.rpm:
+                self.throttled += 1
+                return 429, 0, reset, 0.0
+            self.window_count += 1
+            remaining = max(0, self.rpm - self.window_count) if self.rpm else 1_000_000
+            roll = self.rng.random()
+            if roll < self.rate_429:
+                self.injected_429 += 1
+                return 429, remaining, reset, 0.0
+            if roll < self.rate_429 + self.rate_5xx:
+                self.injected_5xx += 1
+                return self.rng.choice((500, 502, 503)), remaining, reset, 0.0
+            return 200, remaining, reset, self.sample_latency(self.rng)
+
+    def answered(self, photo_keys: List[str]) -> None:
+        with self.lock:
+            self.ok += 1
+            now = time.monotonic()
+            for key in photo_keys:
+                self._photos.setdefault(key, [now, 0.0])[1] = now
+
+    def stats(self) -> dict:
+        """Counters plus per-photo latency: first request to last answer, so retries count."""
+        with self.lock:
+            spans = [end - start for start, end in self._photos.values() if end]
+            unanswered = sum(1 for _, end in self._photos.values() if not end)
+            return {
+                "requests": self.requests,
+                "ok": self.ok,
+                "throttled_429": self.throttled,
+                "injected_429": self.injected_429,
+                "injected_5xx": self.injected_5xx,
+                "photos": len(self._photos),
+                "photos_unanswered": unanswered,
+                "photo_latency_ms": {
+                    "p50": round(_percentile(spans, 0.50) * 1000, 1),
+                    "p95": round(_percentile(spans, 0.95) * 1000, 1),
+                    "p99": round(_percentile(spans, 0.99) * 1000, 1),
+                    "max": round(max(spans, default=0.0) * 1000, 1),
+                },
+            }
+
+    def answer(self, photo_keys: List[str], second_pass: bool) -> List[dict]:
+        salt = "nudge" if second_pass else ""
+        if self.analysis == "canned":
+            return [dict(CANNED) for _ in photo_keys]
+        return [seeded_analysis(k, self.seed, self.clean_rate, salt) for k in photo_keys]
+
+
+def _photo_keys(messages: list) -> List[str]:
+    """One key per image in the request, from its data URL bytes."""
+    keys = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if part.get("type") == "image_url":
+                url = part.get("image_url", {}).get("url", "")
+                keys.append(hashlib.blake2b(url.encode("utf-8"), digest_size=12).hexdigest())
+    return keys
+
+
+def _is_second_pass(messages: list) -> bool:
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            if any(p.get("type") == "text" and p.get("text", "").startswith("Look again") for p in content):
+                return True
+    return False
+
+
+def _content(request: dict, analyses: list) -> str:
+    response_format = request.get("response_format")
+    if response_format:
+        if response_format.get("json_schema", {}).get("name") == "inspection_batch":
+            return json.dumps({"photos": analyses})
+        return json.dumps(analyses[0])
+    if len(analyses) == 1:
+        return as_text(analyses[0])
+    return "\n\n".join(f"=== PHOTO {k} ===\n{as_text(a)}" for k, a in enumerate(analyses, 1))
+
+
+def _chunks(text: str) -> List[str]:
+    return [text[i:i + 16] for i in range(0, len(text), 16)]
+
+
+def _chunk_delay(content: str, latency: float, ttft_fraction: float) -> float:
+    """Seconds between streamed chunks, so the whole answer takes latency."""
+    return latency * (1 - ttft_fraction) / max(1, len(_chunks(content)) - 1)
+
+
+def _tail(request: dict, length: int) -> str:
+    """Text a rambling model would keep generating after a complete answer."""
+    if length <= 0:
+        return ""
+    if request.get("response_format"):
+        return " " * length  # whitespace after the object is still valid JSON
+    filler = "\n\nAdditional notes: the rest of the room appears to be in normal condition."
+    return (filler * (length // len(filler) + 1))[:length]
+
+
+def make_handler(state: StandinState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: dict, headers: Optional[dict] = None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client cancelled the request (speculative second pass)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/standin/stats"):
+                self._send(200, state.stats())
+            else:
+                self._send(200, {"object": "list", "data": [{"id": "standin", "object": "model"}]})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", "0"))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            messages = request.get("messages", [])
+            keys = _photo_keys(messages) or ["-"]
+            status, remaining, reset, latency = state.admit(keys)
+            headers = {
+                "x-ratelimit-remaining-requests": str(remaining),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s",
+            }
+            if state.rpm:
+                headers["x-ratelimit-limit-requests"] = str(state.rpm)
+            if status == 429:
+                headers["retry-after"] = f"{state.retry_after_s:.3f}"
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, headers)
+                return
+            if status >= 500:
+                self._send(status, {"error": {"message": "Injected server error", "type": "server_error"}}, headers)
+                return
+            content = _content(request, state.answer(keys, _is_second_pass(messages)))
+            if request.get("stream"):
+                self._stream(request, content, latency, headers, keys)
+                return
+            tail = _tail(request, state.stream_tail)
+            time.sleep(latency + _chunk_delay(content, latency, state.ttft_fraction) * len(_chunks(tail)))
+            content += tail
+            self._send(200, {
+                "id": "chatcmpl-standin",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "standin"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+            }, headers)
+            state.answered(keys)
+
+        def _stream(self, request: dict, content: str, latency: float, headers: dict, keys: List[str]):
+            """Send content as chat.completion.chunk events, then the tail, until the client hangs up."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.close_connection = True
+
+            pieces = _chunks(content) or [""]
+            tail_pieces = _chunks(_tail(request, state.stream_tail))
+            step = _chunk_delay(content, latency, state.ttft_fraction)
+            time.sleep(latency * state.ttft_fraction)
+            try:
+                for n, piece in enumerate(pieces + tail_pieces):
+                    if n:
+                        time.sleep(step)
+                    chunk = {
+                        "id": "chatcmpl-standin",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "standin"),
+                        "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece},
+                                     "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if n == len(pieces) - 1:
+                        state.answered(keys)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client hung up once it had a complete answer
+
+    return Handler
+
+
+def start_server(state: StandinState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve on a background thread; the base URL is base_url(server)."""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="standin", daemon=True).start()
+    return server
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Stand-in options, shared with the benchmarks that start one."""
+    parser.add_argument("--latency", default="fixed:400",
+                        help="fixed:MS, uniform:LO:HI or lognormal:MEDIAN:SIGMA (milliseconds)")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests-per-minute limit (0 = none)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of requests answered 500/502/503")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds sent with 429s")
+    parser.add_argument("--analysis", choices=["seeded", "canned"], default="seeded")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clean-rate", type=float, default=0.4, help="Seeded photos with no issues")
+    parser.add_argument("--ttft-fraction", type=float, default=0.3,
+                        help="Share of the latency before the first streamed chunk")
+    parser.add_argument("--stream-tail", type=int, default=0,
+                        help="Characters streamed after the answer (a model that keeps going)")
+
+
+def state_from_args(args) -> StandinState:
+    return StandinState(latency=args.latency, rpm=args.rpm, rate_429=args.rate_429,
+                        rate_5xx=args.rate_5xx, retry_after_s=args.retry_after,
+                        analysis=args.analysis, seed=args.seed, clean_rate=args.clean_rate,
+                        ttft_fraction=args.ttft_fraction, stream_tail=args.stream_tail)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible vision stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state_from_args(args)))
+    server.daemon_threads = True
+    print(f"Vision stand-in listening; set VISION_BASE_URL={base_url(server)}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
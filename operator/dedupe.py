@@ -0,0 +1,185 @@
+"""
+Near-Duplicate Collapsing - Skip repeat API calls for burst shots
+
+Inspectors often take 3-5 nearly identical photos in a row. This module computes a
+64-bit perceptual hash (pHash or dHash) per photo, clusters neighbours whose hashes
+are within a Hamming distance threshold, and picks one representative per cluster
+to send to the vision model. The representative's analysis is then copied to the
+rest of its cluster, so downstream code still sees one result per photo.
+
+A wrong merge hands one photo another's location and issues, so collapsing is
+off unless DEDUPE_ENABLED=true and is strict when on: a small pHash distance
+(a 9x8 dHash sees a plain wall and the same wall with a crack as identical),
+and photos must have been taken within DEDUPE_MAX_GAP_S of each other by their
+EXIF capture times; photos without one are never merged. Photos that inherit
+an analysis say so on their page (see shared_analysis).
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from analysis_model import Analysis
+
+try:
+    import numpy as np
+except ImportError:  # dedupe is skipped without NumPy
+    np = None
+
+# ---------------- Tunables (override via .env if desired) ----------------
+DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "false").lower() == "true"
+DEDUPE_METHOD = os.getenv("DEDUPE_METHOD", "phash").lower()   # phash or dhash
+DEDUPE_THRESHOLD = int(os.getenv("DEDUPE_THRESHOLD", "2"))    # max differing bits out of 64
+DEDUPE_MAX_GAP_S = float(os.getenv("DEDUPE_MAX_GAP_S", "5"))  # max seconds between captures in one burst
+DEDUPE_WINDOW = int(os.getenv("DEDUPE_WINDOW", "8"))          # bursts are adjacent; only compare recent clusters
+DEDUPE_WORKERS = int(os.getenv("DEDUPE_WORKERS", str(min(8, os.cpu_count() or 4))))
+
+_DCT_SIZE = 32
+_DCT_MATRIX = None
+
+_EXIF_IFD = 0x8769
+_DATETIME_ORIGINAL = 36867
+_SUBSEC_ORIGINAL = 37521
+_DATETIME = 306
+
+
+def _gray(path: Path, size: Tuple[int, int]) -> "np.ndarray":
+    """Decode a small upright grayscale copy (JPEG draft mode keeps this cheap)."""
+    with Image.open(path) as im:
+        im.draft("L", (size[0] * 8, size[1] * 8))
+        im = ImageOps.exif_transpose(im).convert("L")
+        im = im.resize(size, Image.Resampling.BILINEAR)
+        return np.asarray(im, dtype=np.float32)
+
+
+def _bits_to_int(bits: "np.ndarray") -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+def dhash(path: Path) -> int:
+    """Difference hash: 8x8 horizontal gradient signs."""
+    px = _gray(path, (9, 8))
+    return _bits_to_int(px[:, 1:] > px[:, :-1])
+
+
+def phash(path: Path) -> int:
+    """Perceptual hash: low-frequency 8x8 block of a 32x32 DCT against its median."""
+    global _DCT_MATRIX
+    if _DCT_MATRIX is None:
+        n = np.arange(_DCT_SIZE)
+        m = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * _DCT_SIZE))
+        m[0] /= np.sqrt(2)
+        _DCT_MATRIX = m.astype(np.float32)
+    px = _gray(path, (_DCT_SIZE, _DCT_SIZE))
+    low = (_DCT_MATRIX @ px @ _DCT_MATRIX.T)[:8, :8].ravel()
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+_HASHERS = {"dhash": dhash, "phash": phash}
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def capture_time(path: Path) -> Optional[float]:
+    """EXIF capture time in seconds (DateTimeOriginal, else DateTime), or None."""
+    try:
+        with Image.open(path) as im:
+            exif = im.getexif()
+            sub = exif.get_ifd(_EXIF_IFD)
+            stamp = sub.get(_DATETIME_ORIGINAL) or exif.get(_DATETIME)
+            if not stamp:
+                return None
+            seconds = datetime.strptime(str(stamp).strip(), "%Y:%m:%d %H:%M:%S").timestamp()
+            fraction = str(sub.get(_SUBSEC_ORIGINAL) or "").strip()
+            return seconds + (float("0." + fraction) if fraction.isdigit() else 0.0)
+    except Exception:
+        return None
+
+
+def _fingerprint(hasher, path: Path) -> Tuple[Optional[int], Optional[float]]:
+    try:
+        h = hasher(path)
+    except Exception:
+        return None, None  # unreadable photos stay in their own cluster
+    return h, capture_time(path)
+
+
+def collapse_near_duplicates(images: List[Path], threshold: int = DEDUPE_THRESHOLD,
+                             method: str = DEDUPE_METHOD) -> Tuple[List[Path], Dict[str, List[Path]]]:
+    """
+    Cluster near-identical photos.
+
+    Returns (representatives, duplicates) where representatives keeps the input
+    order and duplicates maps str(representative) -> the other photos in its
+    cluster. Photos are only compared with the last DEDUPE_WINDOW clusters in the
+    same folder, which is where burst shots land after collect_images' sort, and
+    only join a cluster whose latest capture is within DEDUPE_MAX_GAP_S.
+    """
+    if not DEDUPE_ENABLED or np is None or len(images) < 2:
+        return list(images), {}
+
+    hasher = _HASHERS.get(method, phash)
+    with ThreadPoolExecutor(max_workers=DEDUPE_WORKERS) as pool:
+        prints = list(pool.map(lambda p: _fingerprint(hasher, p), images))
+
+    # Each cluster: [anchor hash, folder, [members], latest capture time]
+    clusters: List[list] = []
+    for img_path, (h, taken) in zip(images, prints):
+        match = None
+        if h is not None and taken is not None:
+            for cluster in reversed(clusters[-DEDUPE_WINDOW:]):
+                if (cluster[0] is not None and cluster[3] is not None and cluster[1] == img_path.parent
+                        and abs(taken - cluster[3]) <= DEDUPE_MAX_GAP_S and hamming(cluster[0], h) <= threshold):
+                    match = cluster
+                    break
+        if match:
+            match[2].append(img_path)
+            match[3] = max(match[3], taken)
+        else:
+            clusters.append([h, img_path.parent, [img_path], taken])
+
+    representatives = []
+    duplicates: Dict[str, List[Path]] = {}
+    for _, _, members, _ in clusters:
+        # Largest file tends to be the sharpest shot of the burst
+        rep = max(members, key=_file_size)
+        representatives.append(rep)
+        if len(members) > 1:
+            duplicates[str(rep)] = [m for m in members if m is not rep]
+
+    # Keep the caller's ordering
+    order = {str(p): i for i, p in enumerate(images)}
+    representatives.sort(key=lambda p: order[str(p)])
+    return representatives, duplicates
+
+
+def shared_analysis(analysis: Analysis, representative: Path) -> Analysis:
+    """A duplicate's copy of its representative's analysis, noting where it came from."""
+    note = f"Near-duplicate of {Path(representative).name}; this analysis was made for that photo."
+    return Analysis(analysis.location, analysis.issues, analysis.actions, analysis.skipped,
+                    f"{analysis.note}\n{note}" if analysis.note else note)
+
+
+def expand_duplicate_results(vision_results: Dict[str, Analysis], duplicates: Dict[str, List[Path]]) -> Dict[str, Analysis]:
+    """Give the rest of each cluster a shared_analysis copy of its representative's analysis."""
+    for rep, members in duplicates.items():
+        analysis = vision_results.get(rep)
+        if analysis is None:
+            continue
+        shared = shared_analysis(analysis, Path(rep))
+        for member in members:
+            vision_results[str(member)] = shared
+    return vision_results
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
@@ -0,0 +1,120 @@
+# derivative_store.py - persistent, content-addressed store of prepared image bytes
+# One row per (photo content digest, transform). The transform string spells out
+# everything that affects the bytes (purpose, max px, format, quality, orientation
+# handling), so changing a setting simply misses instead of serving stale images.
+# Re-rendering a report after a note or template change reuses every photo.
+import os, time, sqlite3, threading
+from pathlib import Path
+from typing import Optional
+
+from vision_cache import _SQLiteStore
+
+DERIVATIVE_DB_NAME = "derivatives.sqlite3"
+EVICT_EVERY = 32  # puts between size checks
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS derivatives (
+    digest     TEXT    NOT NULL,   -- blake2b-160 of the original photo
+    transform  TEXT    NOT NULL,   -- e.g. pdf/720/jpeg/q50/exif
+    mime       TEXT    NOT NULL,
+    data       BLOB    NOT NULL,
+    size       INTEGER NOT NULL,
+    created_at REAL    NOT NULL,
+    last_used  REAL    NOT NULL,
+    PRIMARY KEY (digest, transform)
+);
+CREATE INDEX IF NOT EXISTS derivatives_last_used ON derivatives (last_used);
+"""
+
+
+class DerivativeStore(_SQLiteStore):
+    """
+    SQLite (WAL) blob store shared by the analysis path and generate_pdf.
+
+    Reads refresh last_used; once the total blob size exceeds max_bytes the least
+    recently used rows are dropped (checked every EVICT_EVERY writes).
+    """
+
+    SCHEMA = _SCHEMA
+
+    def __init__(self, path: Path, max_bytes: int = 0):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, digest: str, transform: str) -> Optional[tuple[bytes, str]]:
+        """Return (data, mime) or None."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT data, mime FROM derivatives WHERE digest=? AND transform=?", (digest, transform)
+        ).fetchone()
+        with self._stats_lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not row:
+            return None
+        try:
+            conn.execute("UPDATE derivatives SET last_used=? WHERE digest=? AND transform=?",
+                         (time.time(), digest, transform))
+        except sqlite3.OperationalError:
+            pass  # LRU bookkeeping only
+        return bytes(row[0]), row[1]
+
+    def put(self, digest: str, transform: str, data: bytes, mime: str) -> None:
+        now = time.time()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO derivatives (digest, transform, mime, data, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (digest, transform, mime, sqlite3.Binary(data), len(data), now, now),
+            )
+        with self._stats_lock:
+            self._puts += 1
+            check = self._puts % EVICT_EVERY == 0
+        if check and self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least recently used rows until the store fits in max_bytes. Returns rows removed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        if not limit:
+            return 0
+        with self._write() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM derivatives").fetchone()[0]
+            if total <= limit:
+                return 0
+            # Walk the last_used index only as far as needed, then drop those rows in one statement
+            doomed = []
+            for rowid, size in conn.execute("SELECT rowid, size FROM derivatives ORDER BY last_used"):
+                if total <= limit:
+                    break
+                doomed.append(rowid)
+                total -= size
+            conn.executemany("DELETE FROM derivatives WHERE rowid=?", ((r,) for r in doomed))
+            return len(doomed)
+
+    def stats(self) -> dict:
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM derivatives"
+        ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+if __name__ == "__main__":
+    import argparse, json
+
+    parser = argparse.ArgumentParser(description="Inspect or maintain the image derivative store")
+    parser.add_argument("command", choices=["stats", "evict"])
+    parser.add_argument("--cache-dir", default=os.getenv("ANALYSIS_CACHE_DIR", ".cache"))
+    parser.add_argument("--max-mb", type=float, default=float(os.getenv("DERIVATIVE_CACHE_MB", "1024")))
+    args = parser.parse_args()
+
+    store = DerivativeStore(Path(args.cache_dir) / DERIVATIVE_DB_NAME, int(args.max_mb * 1024 * 1024))
+    if args.command == "evict":
+        print(f"Evicted {store.evict()} entries")
+    print(json.dumps(store.stats(), indent=2))
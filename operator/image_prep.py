@@ -0,0 +1,370 @@
+"""
+Image Preparation - Decode each photo once for both analysis and the PDF
+
+The vision model wants a ~1000 px copy and the PDF embeds a 720 px JPEG. Both
+used to fully decode the 12 MP original. prepare_image() decodes once, using
+JPEG draft mode (DCT scaling) so libjpeg only produces roughly the pixels the
+larger target needs, then derives the analysis copy and the PDF JPEG from that
+single decode.
+
+Both outputs are also written to a persistent, content-addressed derivative
+store (see derivative_store), keyed by the photo's content digest and the exact
+transform. Re-running analysis or re-rendering a report after a note or
+template change then does no image work at all. Within one run the PDF JPEG is
+additionally held in a small in-memory LRU for generate_pdf.
+
+How the analysis copy is encoded (size, JPEG/WebP/PNG) is decided per photo by
+upload_policy; the signals it uses are measured on the same decode and stored
+alongside the derivatives.
+"""
+
+import io
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+import quality_gate
+import upload_policy
+from quality_gate import check_image, PhotoRejected
+from vision_cache import DigestMemo, CACHE_DB_NAME
+from derivative_store import DerivativeStore, DERIVATIVE_DB_NAME
+
+# ---------------- Tunables (override via .env if desired) ----------------
+PDF_MAX_PX = int(os.getenv("PDF_IMAGE_MAX_PX", "720"))             # email-friendly PDF photo size
+PDF_JPEG_QUALITY = int(os.getenv("PDF_JPEG_QUALITY", "50"))
+ANALYSIS_JPEG_QUALITY = int(os.getenv("ANALYSIS_JPEG_QUALITY", "88"))
+PREP_MEMORY_MB = float(os.getenv("PREP_MEMORY_MB", "256"))         # PDF JPEGs kept between analysis and PDF
+DERIVATIVE_CACHE_MB = float(os.getenv("DERIVATIVE_CACHE_MB", "1024"))  # persistent store cap (0 = disabled)
+CACHE_DIR = Path(os.getenv("ANALYSIS_CACHE_DIR", ".cache"))
+
+PREP_VERSION = 1  # bump when decode/resize/encode code changes so old derivatives miss
+REJECTED_MIME = "application/x-quality-rejected"  # analysis row recording a quality gate rejection
+
+_ORIENTATION_TRANSPOSE = {
+    3: Image.Transpose.ROTATE_180,
+    6: Image.Transpose.ROTATE_270,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+class PreparedImage:
+    """Outputs of one decode: the analysis copy, the PDF JPEG and the gate's verdict."""
+
+    def __init__(self, analysis: bytes, analysis_mime: str, pdf: bytes,
+                 rejection: Optional[PhotoRejected] = None):
+        self.analysis = analysis
+        self.analysis_mime = analysis_mime
+        self.pdf = pdf
+        self.rejection = rejection
+
+
+def _upright(im: Image.Image) -> Image.Image:
+    """Apply the EXIF orientation, falling back to the raw orientation tag."""
+    try:
+        return ImageOps.exif_transpose(im)
+    except Exception:
+        try:
+            exif = im._getexif()
+            orientation = exif.get(0x0112) if exif else None
+            if orientation in _ORIENTATION_TRANSPOSE:
+                return im.transpose(_ORIENTATION_TRANSPOSE[orientation])
+        except (AttributeError, KeyError):
+            pass  # No EXIF data or orientation info
+        return im
+
+
+def _decode(path: Path, max_px: int) -> Image.Image:
+    """Decode path just large enough for a max_px long edge and return it upright."""
+    with Image.open(path) as im:
+        w, h = im.size
+        if max(w, h) > max_px:
+            scale = max_px / float(max(w, h))
+            # draft() keeps every requested dimension, so ask for the proportional size
+            im.draft("RGB", (math.ceil(w * scale), math.ceil(h * scale)))
+        im = _upright(im)
+        im.load()
+        return im
+
+
+def _larger_source(path: Path, im: Image.Image) -> bool:
+    with Image.open(path) as src:
+        return max(src.size) > max(im.size)
+
+
+def _fit(im: Image.Image, max_px: int) -> Image.Image:
+    if max(im.size) <= max_px:
+        return im
+    scale = max_px / float(max(im.size))
+    return im.resize((int(im.width * scale), int(im.height * scale)), Image.Resampling.LANCZOS)
+
+
+def _pdf_jpeg_bytes(im: Image.Image) -> bytes:
+    im = _fit(im, PDF_MAX_PX)
+    if im.mode in ("RGBA", "P"):
+        im = im.convert("RGB")
+    buf = io.BytesIO()
+    im.save(buf, "JPEG", quality=PDF_JPEG_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+def _analysis_format(path: Path) -> str:
+    # PNGs stay PNG for the model (matches the old extension-based mime choice)
+    return "png" if Path(path).suffix.lower() == ".png" else "jpeg"
+
+
+def _analysis_transform(plan: upload_policy.UploadPlan) -> str:
+    return f"analysis/v{PREP_VERSION}/{plan.key()}/exif/gate-{quality_gate.signature()}"
+
+
+def _upload_transform(plan: upload_policy.UploadPlan) -> str:
+    # Second-pass copies skip the gate: the photo already passed it at first-pass size
+    return f"upload/v{PREP_VERSION}/{plan.key()}/exif"
+
+
+def _signals_transform() -> str:
+    return f"signals/v{upload_policy.SIGNALS_VERSION}/{upload_policy.SIGNAL_PX}"
+
+
+def _pdf_transform() -> str:
+    return f"pdf/v{PREP_VERSION}/{PDF_MAX_PX}/jpeg/q{PDF_JPEG_QUALITY}/exif"
+
+
+def _digest(path: Path) -> Optional[str]:
+    if store is None:
+        return None
+    try:
+        return digests.digest(path)[0]
+    except OSError:
+        return None
+
+
+def _stored(digest: Optional[str], transform: str) -> Optional[Tuple[bytes, str]]:
+    if digest is None:
+        return None
+    try:
+        return store.get(digest, transform)
+    except Exception as e:
+        print(f"[prep] Derivative store read failed: {e!r}", flush=True)
+        return None
+
+
+def _store(digest: Optional[str], transform: str, data: bytes, mime: str) -> None:
+    if digest is None:
+        return
+    try:
+        store.put(digest, transform, data, mime)
+    except Exception as e:
+        print(f"[prep] Derivative store write failed: {e!r}", flush=True)
+
+
+def _encode(im: Image.Image, plan: upload_policy.UploadPlan) -> Tuple[bytes, str]:
+    buf = io.BytesIO()
+    if plan.fmt == "png":
+        im.save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), "image/png"
+    if plan.fmt == "webp":
+        im.convert("RGB").save(buf, format="WEBP", quality=plan.quality, method=upload_policy.WEBP_METHOD)
+        return buf.getvalue(), "image/webp"
+    im.convert("RGB").save(buf, format="JPEG", quality=plan.quality, optimize=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+def _analysis_bytes(im: Image.Image, plan: upload_policy.UploadPlan) -> Tuple[bytes, str]:
+    im = _fit(im, plan.max_px)
+    check_image(im)
+    return _encode(im, plan)
+
+
+def _stored_signals(digest: Optional[str]) -> Optional[Dict[str, float]]:
+    row = _stored(digest, _signals_transform())
+    if not row:
+        return None
+    try:
+        return json.loads(row[0].decode("utf-8"))
+    except ValueError:
+        return None
+
+
+def _first_pass_plan(path: Path, analysis_max_px: int, signals: Optional[Dict[str, float]],
+                     unsure: bool) -> Optional[upload_policy.UploadPlan]:
+    """The plan for path, or None while adaptive signals are still unknown."""
+    fmt = _analysis_format(path)
+    if not upload_policy.adaptive():
+        return upload_policy.fixed_plan(analysis_max_px, fmt, ANALYSIS_JPEG_QUALITY)
+    if signals is None:
+        return None
+    return upload_policy.first_pass_plan(signals, fmt, analysis_max_px, ANALYSIS_JPEG_QUALITY, unsure)
+
+
+def prepare_image(path: Path, analysis_max_px: int, unsure: bool = False,
+                  decoded: Optional[Image.Image] = None, digest: Optional[str] = None) -> PreparedImage:
+    """
+    Return the analysis copy and the PDF JPEG for path, decoding it at most once
+    (twice for photos the upload policy sends at its fine tier).
+
+    Both come from the derivative store when this content was prepared before
+    with the same settings. A photo that fails the quality gate still gets its
+    PDF JPEG; the rejection is returned instead of raised so the caller decides
+    what to do with it. unsure asks the adaptive upload policy for its fine
+    tier (earlier first passes in this folder often found nothing).
+
+    Callers that already hold the upright photo (ZIP ingestion decodes members
+    from memory) pass it as decoded together with the content digest; it must
+    be at least as large as every output, as path is then never opened.
+    """
+    if digest is None:
+        digest = _digest(path)
+    signals = _stored_signals(digest) if upload_policy.adaptive() else None
+    plan = _first_pass_plan(path, analysis_max_px, signals, unsure)
+    p_key = _pdf_transform()
+    analysis_row = _stored(digest, _analysis_transform(plan)) if plan else None
+    pdf_row = _stored(digest, p_key) if analysis_row else None
+    if analysis_row and pdf_row:
+        data, mime = analysis_row
+        _pdf_memory.put(path, pdf_row[0])
+        if mime == REJECTED_MIME:
+            return PreparedImage(b"", "", pdf_row[0], PhotoRejected(data.decode("utf-8")))
+        return PreparedImage(data, mime, pdf_row[0])
+
+    im = decoded if decoded is not None else _decode(path, max(analysis_max_px, PDF_MAX_PX))
+    if plan is None:
+        signals = upload_policy.measure(im)
+        _store(digest, _signals_transform(), json.dumps(signals).encode("utf-8"), "application/json")
+        plan = _first_pass_plan(path, analysis_max_px, signals, unsure)
+    if decoded is None and plan.max_px > max(im.size) and _larger_source(path, im):
+        # Only the fine tier asks for more than the standard decode; decoding
+        # everything that large would defeat draft mode for all photos
+        im = _decode(path, plan.max_px)
+    a_key = _analysis_transform(plan)
+    rejection = None
+    analysis, mime = b"", ""
+    try:
+        # Derive the smaller output from the larger one rather than the decode
+        if plan.max_px >= PDF_MAX_PX:
+            analysis_im = _fit(im, plan.max_px)
+            analysis, mime = _analysis_bytes(analysis_im, plan)
+            pdf = _pdf_jpeg_bytes(analysis_im)
+        else:
+            pdf_im = _fit(im, PDF_MAX_PX)
+            pdf = _pdf_jpeg_bytes(pdf_im)
+            analysis, mime = _analysis_bytes(pdf_im, plan)
+    except PhotoRejected as e:
+        rejection = e
+        pdf = _pdf_jpeg_bytes(im)
+
+    if rejection is not None:
+        _store(digest, a_key, rejection.reason.encode("utf-8"), REJECTED_MIME)
+    else:
+        _store(digest, a_key, analysis, mime)
+    _store(digest, p_key, pdf, "image/jpeg")
+    _pdf_memory.put(path, pdf)
+    return PreparedImage(analysis, mime, pdf, rejection)
+
+
+def second_pass_copy(path: Path) -> Tuple[bytes, str]:
+    """
+    (bytes, mime) of the larger copy the adaptive policy sends with the second
+    pass, from the derivative store or a fresh draft-mode decode.
+    """
+    plan = upload_policy.second_pass_plan(_analysis_format(path), ANALYSIS_JPEG_QUALITY)
+    digest = _digest(path)
+    key = _upload_transform(plan)
+    row = _stored(digest, key)
+    if row:
+        return row
+    data, mime = _encode(_fit(_decode(path, plan.max_px), plan.max_px), plan)
+    _store(digest, key, data, mime)
+    return data, mime
+
+
+def pdf_jpeg(path: Path) -> bytes:
+    """
+    PDF JPEG for path: the one made during analysis if still in memory, else the
+    derivative store, else a fresh draft-mode decode (which is then stored).
+    """
+    data = _pdf_memory.take(path)
+    if data is not None:
+        return data
+    digest = _digest(path)
+    row = _stored(digest, _pdf_transform())
+    if row:
+        return row[0]
+    data = _pdf_jpeg_bytes(_decode(path, PDF_MAX_PX))
+    _store(digest, _pdf_transform(), data, "image/jpeg")
+    return data
+
+
+def keep_pdf(path: Path, data: bytes) -> None:
+    """Hold a PDF JPEG made elsewhere (e.g. in a pipeline process) for generate_pdf."""
+    _pdf_memory.put(path, data)
+
+
+def pdf_in_memory(path: Path) -> bool:
+    """Whether path's PDF JPEG is waiting in memory (made during analysis or prefetched)."""
+    return _pdf_memory.has(path)
+
+
+def derivative_stats() -> dict:
+    """Hit/miss counters for this process plus the size of the derivative store."""
+    return store.stats() if store is not None else {}
+
+
+class _DerivativeLRU:
+    """Thread-safe LRU of PDF JPEG bytes, keyed by path and stat so edited files miss."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: Path) -> Optional[tuple]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (str(path), st.st_mtime_ns, st.st_size)
+
+    def put(self, path: Path, data: bytes) -> None:
+        key = self._key(path)
+        if key is None or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self._size -= len(dropped)
+
+    def has(self, path: Path) -> bool:
+        key = self._key(path)
+        with self._lock:
+            return key is not None and key in self._items
+
+    def take(self, path: Path) -> Optional[bytes]:
+        """Return and forget the bytes for path (each PDF JPEG is embedded once)."""
+        key = self._key(path)
+        if key is None:
+            return None
+        with self._lock:
+            data = self._items.pop(key, None)
+            if data is not None:
+                self._size -= len(data)
+            return data
+
+
+_pdf_memory = _DerivativeLRU(int(PREP_MEMORY_MB * 1024 * 1024))
+
+store = (DerivativeStore(CACHE_DIR / DERIVATIVE_DB_NAME, int(DERIVATIVE_CACHE_MB * 1024 * 1024))
+         if DERIVATIVE_CACHE_MB > 0 else None)
+digests = DigestMemo(CACHE_DIR / CACHE_DB_NAME)
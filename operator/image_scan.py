@@ -0,0 +1,209 @@
+"""
+Image Scan - One fast photo scanner for the CLI and the operator UI
+
+collect_images used rglob('*') plus an is_file() stat per entry, the operator
+UI counted photos with two rglob walks per extension, and the file preview
+recounted every source whenever the list changed. scan_images() replaces all
+of them:
+
+- os.scandir walks each directory once; the entry type comes with the listing.
+- Photos are recognized by their magic bytes, not their extension, so a
+  "photo.JPG.txt" from a messaging app is found and an AppleDouble "._IMG.jpg"
+  is not.
+- What a directory contains is remembered in a manifest keyed by the
+  directory's mtime. A directory whose mtime is unchanged costs one stat() on
+  a rescan; when it did change, only names it didn't have before are sniffed.
+
+Manifests are kept in memory and in CACHE_DIR/scan.sqlite3, so CLI runs over
+a folder the UI already scanned are free too. A directory's mtime changes when
+entries are added, removed or renamed, not when a file is overwritten in
+place; such a file keeps the verdict it had.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from vision_cache import _SQLiteStore
+
+# ---------------- Tunables (override via .env if desired) ----------------
+SCAN_MANIFEST = os.getenv("SCAN_MANIFEST", "true").lower() == "true"  # false: manifests live in memory only
+CACHE_DIR = Path(os.getenv("ANALYSIS_CACHE_DIR", ".cache"))
+
+SCAN_DB_NAME = "scan.sqlite3"
+SNIFF_BYTES = 32
+RACY_NS = 2_000_000_000  # mtimes this fresh may not show a change made in the same tick (FAT: 2 s)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dir_manifests (
+    path     TEXT    PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    files    TEXT    NOT NULL,   -- JSON {name: image extension or null}
+    dirs     TEXT    NOT NULL    -- JSON [subdirectory names]
+);
+"""
+
+
+def sniff_image(head: bytes) -> Optional[str]:
+    """File extension for the image format head starts with, or None if it is not a photo we take."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    if head.startswith(b"BM") and len(head) >= 14:
+        return ".bmp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"hevc", b"hevx", b"heim",
+                                                  b"heis", b"mif1", b"msf1"):
+        return ".heic"
+    return None
+
+
+def _sniff_file(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return sniff_image(f.read(SNIFF_BYTES))
+    except OSError:
+        return None
+
+
+class _Manifest:
+    __slots__ = ("mtime_ns", "files", "dirs")
+
+    def __init__(self, mtime_ns: int, files: Dict[str, Optional[str]], dirs: List[str]):
+        self.mtime_ns = mtime_ns
+        self.files = files
+        self.dirs = dirs
+
+
+class ImageScanner(_SQLiteStore):
+    """
+    Recursive photo scanner with per-directory manifests. Safe to share between
+    threads (the UI's main and background threads) and between processes.
+    """
+
+    SCHEMA = _SCHEMA
+
+    def __init__(self, path: Optional[Path]):
+        if path is not None:
+            super().__init__(path)
+        self.persistent = path is not None
+        self._mem: Dict[str, _Manifest] = {}
+        self._mem_lock = threading.Lock()
+        self.dirs_listed = 0
+        self.dirs_reused = 0
+        self.files_sniffed = 0
+
+    def _load(self, dir_str: str) -> Optional[_Manifest]:
+        with self._mem_lock:
+            hit = self._mem.get(dir_str)
+        if hit is not None or not self.persistent:
+            return hit
+        try:
+            row = self._conn().execute(
+                "SELECT mtime_ns, files, dirs FROM dir_manifests WHERE path=?", (dir_str,)
+            ).fetchone()
+        except Exception:
+            return None  # a locked or broken manifest only costs a rescan
+        return _Manifest(row[0], json.loads(row[1]), json.loads(row[2])) if row else None
+
+    def _save(self, dir_str: str, manifest: _Manifest) -> None:
+        with self._mem_lock:
+            self._mem[dir_str] = manifest
+        if not self.persistent:
+            return
+        try:
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO dir_manifests (path, mtime_ns, files, dirs) VALUES (?, ?, ?, ?)",
+                    (dir_str, manifest.mtime_ns, json.dumps(manifest.files), json.dumps(manifest.dirs)),
+                )
+        except Exception as e:
+            print(f"[scan] Could not save manifest for {dir_str}: {e!r}", flush=True)
+
+    def _manifest(self, dir_str: str) -> Optional[_Manifest]:
+        """Current manifest of one directory, listing and sniffing only what changed."""
+        try:
+            mtime_ns = os.stat(dir_str).st_mtime_ns
+        except OSError:
+            return None
+        old = self._load(dir_str)
+        if old is not None and old.mtime_ns == mtime_ns:
+            self.dirs_reused += 1
+            return old
+
+        known = old.files if old is not None else {}
+        files: Dict[str, Optional[str]] = {}
+        dirs: List[str] = []
+        try:
+            with os.scandir(dir_str) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.name)
+                        elif entry.is_file():
+                            if entry.name in known:
+                                files[entry.name] = known[entry.name]
+                            else:
+                                files[entry.name] = _sniff_file(entry.path)
+                                self.files_sniffed += 1
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        self.dirs_listed += 1
+        manifest = _Manifest(mtime_ns, files, sorted(dirs))
+        if time.time_ns() - mtime_ns > RACY_NS:
+            self._save(dir_str, manifest)
+        return manifest
+
+    def scan(self, root: Path) -> List[Path]:
+        """Every photo under root, sorted by file name (case-insensitive) like collect_images."""
+        images: List[Path] = []
+        stack = [str(root)]
+        while stack:
+            dir_str = stack.pop()
+            manifest = self._manifest(os.path.abspath(dir_str))
+            if manifest is None:
+                continue
+            for name, ext in manifest.files.items():
+                if ext is not None:
+                    images.append(Path(dir_str, name))
+            stack.extend(os.path.join(dir_str, d) for d in manifest.dirs)
+        images.sort(key=lambda p: p.name.lower())
+        return images
+
+    def stats(self) -> Dict[str, int]:
+        return {"dirs_listed": self.dirs_listed, "dirs_reused": self.dirs_reused,
+                "files_sniffed": self.files_sniffed}
+
+
+scanner = ImageScanner(CACHE_DIR / SCAN_DB_NAME if SCAN_MANIFEST else None)
+
+
+def scan_images(root: Path) -> List[Path]:
+    """Every photo under root (see ImageScanner.scan)."""
+    return scanner.scan(Path(root))
+
+
+def count_images(root: Path) -> int:
+    return len(scanner.scan(Path(root)))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scan a folder for photos and time cold vs. manifest rescans")
+    parser.add_argument("folder")
+    args = parser.parse_args()
+
+    for label in ("first scan", "rescan"):
+        t0 = time.perf_counter()
+        found = scan_images(Path(args.folder))
+        print(f"{label}: {len(found)} photos in {(time.perf_counter() - t0) * 1000:.1f} ms {scanner.stats()}")
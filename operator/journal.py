@@ -0,0 +1,194 @@
+"""
+Job Journal - Append-only record of one build_reports run, for --resume
+
+Each job writes workspace/jobs/<job id>.jsonl, one JSON object per line:
+
+    {"event": "start", "params": {...}}        source, client, address, notes, engine
+    {"event": "extracted", "dir": "..."}       where the ZIP was extracted
+    {"event": "analysis", "photo": "...", "analysis": {...}}   one per finished photo
+    {"event": "done", "pdf_path": "...", "report_id": "..."}
+
+If the process dies (network drop, laptop sleep, UI closed), `run_report.py
+--resume <job id>` replays the journal: the extraction directory is reused if
+it still exists, finished analyses are taken from the journal and only the
+rest go to the model. Failed analyses are never journaled, like the vision
+cache never stores them, so they are retried. The PDF is always rendered again
+from the start (a half-written PDF can't be continued), so rendering progress
+is not journaled; "render" records written by older versions are ignored.
+
+Analysis lines are queued and written by a writer thread, one fsync for
+everything queued since the last one (group commit). note_analysis never
+waits for the disk, which matters because the async engine calls it on its
+event loop thread. A crash loses at most the photos queued since the last
+fsync; flush() waits for them, and the other events flush before they are
+written so the file stays in order. A torn last line is ignored on replay.
+"""
+
+import json
+import os
+import secrets
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from analysis_model import Analysis
+
+# ---------------- Tunables (override via .env if desired) ----------------
+JOURNAL_ENABLED = os.getenv("JOB_JOURNAL", "true").lower() == "true"
+JOBS_DIR = Path(os.getenv("JOBS_DIR", str(Path(os.getenv("WORKSPACE_DIR", "./workspace")) / "jobs")))
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "true").lower() == "true"
+
+
+def completed(analysis: Optional[Analysis]) -> bool:
+    """Whether an analysis is a finished answer (or a gate skip) rather than an error to retry."""
+    if analysis is None:
+        return False
+    if analysis.skipped:
+        return True
+    if analysis.note.startswith("Analysis failed"):
+        return False
+    return bool(analysis.location or analysis.issues or analysis.actions or analysis.note)
+
+
+class JobJournal:
+    """The journal of one job. Use create() for a new job and load() to resume one."""
+
+    def __init__(self, job_id: str, path: Path):
+        self.job_id = job_id
+        self.path = path
+        self.params: dict = {}
+        self.extracted: Optional[str] = None
+        self.analyses: Dict[str, dict] = {}
+        self.done: Optional[dict] = None
+        self._lock = threading.Lock()  # the file
+        self._cond = threading.Condition()  # the queue below
+        self._queued: List[str] = []
+        self._writer: Optional[threading.Thread] = None
+
+    # ----- opening -----
+    @classmethod
+    def create(cls, params: dict) -> "JobJournal":
+        job_id = f"{datetime.now():%Y%m%d_%H%M%S}_{secrets.token_hex(3)}"
+        JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        journal = cls(job_id, JOBS_DIR / f"{job_id}.jsonl")
+        journal.params = dict(params)
+        journal._append({"event": "start", "params": journal.params}, sync=True)
+        return journal
+
+    @classmethod
+    def load(cls, job: str) -> "JobJournal":
+        """Replay a journal by job id or path. Raises FileNotFoundError if there is none."""
+        path = Path(job)
+        if not path.suffix:
+            path = JOBS_DIR / f"{job}.jsonl"
+        journal = cls(path.stem, path)
+        with open(path, "rb") as f:
+            data = f.read()
+        for line in data.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn write from the crash
+            journal._replay(record)
+        if data and not data.endswith(b"\n"):
+            # Start the next record on its own line, after the torn one
+            with open(path, "ab") as f:
+                f.write(b"\n")
+        return journal
+
+    def _replay(self, record: dict) -> None:
+        event = record.get("event")
+        if event == "start":
+            self.params = record.get("params") or {}
+        elif event == "extracted":
+            self.extracted = record.get("dir")
+        elif event == "analysis" and record.get("photo"):
+            self.analyses[record["photo"]] = record.get("analysis") or {}
+        elif event == "done":
+            self.done = record
+
+    # ----- writing -----
+    @staticmethod
+    def _line(record: dict) -> str:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _write_lines(self, lines: List[str], sync: bool) -> None:
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                if sync and JOURNAL_FSYNC:
+                    os.fsync(f.fileno())
+
+    def _append(self, record: dict, sync: bool = False) -> None:
+        """Write record now, after anything still queued."""
+        self.flush()
+        self._write_lines([self._line(record)], sync)
+
+    def _queue(self, record: dict) -> None:
+        """Hand record to the writer thread (started if idle) and return without waiting."""
+        with self._cond:
+            self._queued.append(self._line(record))
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_queued, name="journal", daemon=True)
+                self._writer.start()
+
+    def _write_queued(self) -> None:
+        while True:
+            with self._cond:
+                if not self._queued:
+                    self._writer = None
+                    self._cond.notify_all()
+                    return
+                lines, self._queued = self._queued, []
+            try:
+                self._write_lines(lines, sync=True)
+            except OSError as e:
+                print(f"Warning: could not write job journal {self.path}: {e}")
+
+    def flush(self) -> None:
+        """Wait until every queued record is written (and fsynced)."""
+        with self._cond:
+            while self._writer is not None:
+                self._cond.wait()
+
+    def note_extracted(self, photos_dir: Path) -> None:
+        self.extracted = str(photos_dir)
+        self._append({"event": "extracted", "dir": self.extracted}, sync=True)
+
+    def note_analysis(self, photos_dir: Path, img_path: Path, analysis: Analysis) -> None:
+        """Queue one finished photo (see flush); errors are skipped so a resume retries them."""
+        if not completed(analysis):
+            return
+        photo = _photo_key(photos_dir, img_path)
+        self.analyses[photo] = analysis.to_dict()
+        self._queue({"event": "analysis", "photo": photo, "analysis": self.analyses[photo]})
+
+    def note_done(self, pdf_path: Path, report_id: str) -> None:
+        self.done = {"event": "done", "pdf_path": str(pdf_path), "report_id": report_id}
+        self._append(self.done, sync=True)
+
+    # ----- resuming -----
+    def extracted_dir(self) -> Optional[Path]:
+        """The extraction directory from before, if it still exists."""
+        if self.extracted and Path(self.extracted).is_dir():
+            return Path(self.extracted)
+        return None
+
+    def completed_analyses(self, photos_dir: Path, images: List[Path]) -> Dict[str, Analysis]:
+        """{str(path): analysis} for the images the journal already has answers for."""
+        out = {}
+        for img_path in images:
+            data = self.analyses.get(_photo_key(photos_dir, img_path))
+            if data is not None:
+                out[str(img_path)] = Analysis.from_dict(data)
+        return out
+
+
+def _photo_key(photos_dir: Path, img_path: Path) -> str:
+    # Relative, so answers still match if the ZIP has to be extracted again elsewhere
+    try:
+        return Path(img_path).relative_to(photos_dir).as_posix()
+    except ValueError:
+        return str(img_path)
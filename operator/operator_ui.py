@@ -36,6 +36,17 @@ try:
 except Exception:
     pass
 
+# Photo scanner shared with run_report (magic-byte detection, per-folder manifests)
+from image_scan import count_images
+
+# Background analysis of added folders (fills the cache before Generate)
+try:
+    from prewarm import BackgroundPrewarm
+    PREWARM_AVAILABLE = True
+except ImportError:
+    PREWARM_AVAILABLE = False
+PREWARM_STOP_TIMEOUT_S = 3  # on close, how long the prewarm child gets to exit before it is killed
+
 # ============ BRANDING ============
 COMPANY_NAME = "CheckMyRental"
 APP_TITLE = "Inspection Report Generator"
@@ -69,7 +80,6 @@ OUTPUT_DIR = Path("workspace/outputs")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 PROGRESS_RE = re.compile(r"\[(\d+)\s*/\s*(\d+)\]")
-IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.heic', '.heif'}
 
 
 
@@ -88,11 +98,26 @@ class ReportGeneratorApp(tk.Tk):
         self.inspector_notes = []  # List of note dicts: {text, responsibility, priority}
         self.is_running = False
         self.output_queue = queue.Queue()
+        self.image_counts = {}     # folder -> photo count
+        self.warm = {}             # folder -> (photos analyzed, photos to analyze)
+        self.preview_labels = {}   # folder -> its label in the file preview
+        self.prewarmer = None
+        if PREWARM_AVAILABLE:
+            self.prewarmer = BackgroundPrewarm(
+                lambda folder, done, total: self.output_queue.put(('warm', (folder, done, total))),
+                cwd=Path(__file__).parent)
 
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         self.after(500, self._check_api_key)
         self._poll_output()
 
+    def _on_close(self):
+        """Stop background prewarming before the window goes; its child would keep making API calls."""
+        if self.prewarmer is not None:
+            self.prewarmer.stop(timeout=PREWARM_STOP_TIMEOUT_S)
+        self.destroy()
+
 
     def _build_ui(self):
         """Build premium, polished UI"""
@@ -565,17 +590,18 @@ class ReportGeneratorApp(tk.Tk):
             count = self._count_images(folder)
             if count > 0:
                 self.sources.append((folder, 'folder'))
+                self.image_counts[folder] = count
+                # Start analyzing in the background while the operator fills in notes
+                if self.prewarmer is not None and not self.is_running:
+                    self.prewarmer.add(folder)
                 self._update_file_count()
                 self._update_property_dropdown()  # Update property selector for notes
             else:
                 messagebox.showwarning("No Photos", "No image files found in folder.")
 
     def _count_images(self, folder):
-        count = 0
-        for ext in IMAGE_EXTENSIONS:
-            count += len(list(Path(folder).rglob(f"*{ext}")))
-            count += len(list(Path(folder).rglob(f"*{ext.upper()}")))
-        return count
+        # Manifest-backed: re-counting an unchanged folder is one stat per directory
+        return count_images(Path(folder))
 
     def _update_property_dropdown(self):
         """Update the property/folder selector dropdown for notes"""
@@ -596,7 +622,11 @@ class ReportGeneratorApp(tk.Tk):
             self.note_property_var.set(options[0])
 
     def _clear_sources(self):
+        if self.prewarmer is not None:
+            self.prewarmer.stop()
         self.sources = []
+        self.warm = {}
+        self.image_counts = {}
         self._update_file_count()
         self._update_property_dropdown()  # Reset property selector
 
@@ -606,14 +636,15 @@ class ReportGeneratorApp(tk.Tk):
             self.file_count_label.config(text="No files selected")
             self.file_preview_frame.pack_forget()
         else:
-            self.file_count_label.config(text=f"{count} source{'s' if count != 1 else ''}")
             self._update_file_preview()
+            self._update_warm_status()
 
     def _update_file_preview(self):
         """Update the file preview list with uploaded file names"""
         # Clear existing preview items
         for widget in self.file_preview_list.winfo_children():
             widget.destroy()
+        self.preview_labels = {}
 
         if not self.sources:
             self.file_preview_frame.pack_forget()
@@ -635,17 +666,42 @@ class ReportGeneratorApp(tk.Tk):
             if len(name) > 40:
                 name = name[:37] + "..."
 
-            # Count images in source
-            if source_type == 'folder':
-                img_count = self._count_images(source_path)
-                count_text = f"  ({img_count} photos)"
-            else:
-                count_text = ""
-
-            tk.Label(item_frame, text=f"{icon}  {name}{count_text}",
+            label = tk.Label(item_frame, text=f"{icon}  {name}",
                     font=(FONT_FAMILY, 10),
                     fg=TEXT_SECONDARY, bg=BG_SECONDARY,
-                    anchor="w").pack(side="left", fill="x")
+                    anchor="w")
+            label.pack(side="left", fill="x")
+            self.preview_labels[source_path] = (label, f"{icon}  {name}")
+
+    def _source_detail(self, source_path, source_type):
+        """Photo count and background analysis progress shown next to a source"""
+        if source_type != 'folder':
+            return ""
+        if source_path not in self.image_counts:
+            self.image_counts[source_path] = self._count_images(source_path)
+        text = f"  ({self.image_counts[source_path]} photos"
+        done, total = self.warm.get(source_path, (0, 0))
+        if total:
+            text += f", {done * 100 // total}% analyzed"
+        return text + ")"
+
+    def _update_warm_status(self):
+        """Refresh per-source and overall 'already analyzed' figures"""
+        for source_path, source_type in self.sources:
+            entry = self.preview_labels.get(source_path)
+            if entry is not None and entry[0].winfo_exists():
+                label, base = entry
+                label.config(text=base + self._source_detail(source_path, source_type))
+
+        count = len(self.sources)
+        text = f"{count} source{'s' if count != 1 else ''}"
+        done = sum(d for d, _ in self.warm.values())
+        total = sum(t for _, t in self.warm.values())
+        if total:
+            text += f" · {done * 100 // total}% warm"
+            if not self.is_running:
+                self.log_label.config(text=f"Analyzing photos in the background: {done} of {total} ready")
+        self.file_count_label.config(text=text)
 
     def _generate_reports(self):
         if not self.sources:
@@ -654,11 +710,20 @@ class ReportGeneratorApp(tk.Tk):
 
         inspector = self.inspector_var.get().strip() or "Property Owner"
 
+        # The report run takes over; photos analyzed so far are already cached
+        if self.prewarmer is not None:
+            self.prewarmer.stop()
+        done = sum(d for d, _ in self.warm.values())
+        total = sum(t for _, t in self.warm.values())
+
         self.is_running = True
         self._update_button_state()
         self.status_label.config(text="Processing...", fg=ACCENT)
         self._set_progress(0)
-        self.log_label.config(text="Starting...")
+        if total:
+            self.log_label.config(text=f"Starting... ({done} of {total} photos already analyzed)")
+        else:
+            self.log_label.config(text="Starting...")
 
         # Serialize notes to JSON for passing to subprocess
         notes_json = json.dumps(self.inspector_notes) if self.inspector_notes else "[]"
@@ -749,6 +814,11 @@ class ReportGeneratorApp(tk.Tk):
                     self.log_label.config(text=data)
                 elif msg_type == 'progress':
                     self._set_progress(data)
+                elif msg_type == 'warm':
+                    folder, done, total = data
+                    if any(folder == s[0] for s in self.sources):
+                        self.warm[folder] = (done, total)
+                        self._update_warm_status()
                 elif msg_type == 'done':
                     self._on_complete(data)
         except queue.Empty:
@@ -0,0 +1,191 @@
+"""
+Page Fragments - Record photo pages now, place them in the PDF later
+
+A photo page's body (framed photo, badge or analysis column, continuation pages)
+depends only on the photo and its analysis, not on where it ends up in the
+report. RecordingCanvas captures those drawing calls so the body can be
+rendered as soon as the photo's analysis arrives, on a background thread, while
+other photos are still being analyzed. generate_pdf later replays each
+fragment onto the real canvas in group_images_by_location order and adds the
+position-dependent parts (photo number, section name, page numbers) itself.
+
+The photo is recorded as a PhotoImage (its PDF JPEG bytes), so a fragment
+pickles to a few KB plus the JPEG. Fragments waiting for generate_pdf are
+kept in a FragmentSpill temp file rather than in memory, so a large report
+holds one photo's fragment at a time, not all of them. The file has a path so
+section_render's worker processes can read fragments from it directly.
+"""
+
+import io
+import os
+import pickle
+import tempfile
+import threading
+from typing import Any, List, Optional, Tuple
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.pathobject import PDFPathObject
+
+Op = Tuple[str, tuple, dict]
+
+
+class PhotoImage:
+    """A photo's PDF JPEG in recorded calls; becomes an ImageReader when the fragment is replayed."""
+
+    __slots__ = ("data", "_size")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._size: Optional[Tuple[int, int]] = None
+
+    def getSize(self) -> Tuple[int, int]:
+        if self._size is None:
+            self._size = ImageReader(io.BytesIO(self.data)).getSize()
+        return self._size
+
+    def __getstate__(self):
+        return (self.data, self._size)
+
+    def __setstate__(self, state) -> None:
+        self.data, self._size = state
+
+
+class RecordingCanvas:
+    """
+    Stand-in for a reportlab canvas that records drawing calls per page.
+
+    stringWidth and beginPath are answered directly since callers need their
+    return values; showPage starts a new recorded page. Every other method is
+    recorded as (name, args, kwargs) and returns None.
+    """
+
+    def __init__(self, pagesize: Tuple[float, float]):
+        self._pagesize = pagesize
+        self.pages: List[List[Op]] = [[]]
+
+    def stringWidth(self, text: str, fontName: str, fontSize: float) -> float:
+        return stringWidth(text, fontName, fontSize)
+
+    def beginPath(self) -> PDFPathObject:
+        return PDFPathObject()
+
+    def showPage(self) -> None:
+        self.pages.append([])
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.pages[-1].append((name, args, kwargs))
+
+        return record
+
+
+def replay_ops(c, ops) -> None:
+    """Issue recorded calls on c (a real canvas or another RecordingCanvas)."""
+    for name, args, kwargs in ops:
+        getattr(c, name)(*args, **kwargs)
+
+
+class PhotoFragment:
+    """Recorded pages for one photo. Its photo is a PhotoImage held by the recorded calls."""
+
+    def __init__(self, pages: List[List[Op]]):
+        self.pages = pages
+        self._readers: dict = {}
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def _arg(self, arg):
+        if isinstance(arg, PhotoImage):
+            reader = self._readers.get(id(arg))
+            if reader is None:
+                reader = self._readers[id(arg)] = ImageReader(io.BytesIO(arg.data))
+            return reader
+        return arg
+
+    def replay_page(self, c, index: int) -> None:
+        for name, args, kwargs in self.pages[index]:
+            getattr(c, name)(*(self._arg(a) for a in args), **kwargs)
+
+    def dumps(self) -> bytes:
+        return pickle.dumps(self.pages, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def loads(cls, data: bytes) -> "PhotoFragment":
+        return cls(pickle.loads(data))
+
+    def cleanup(self) -> None:
+        """Drop the recorded calls (and with them the photo's JPEG) once placed or discarded."""
+        self.pages = []
+        self._readers = {}
+
+
+class SpilledFragment:
+    """A fragment parked in a FragmentSpill: only its place in the file stays in memory."""
+
+    __slots__ = ("_spill", "_offset", "_length", "page_count")
+
+    def __init__(self, spill: "FragmentSpill", offset: int, length: int, page_count: int):
+        self._spill = spill
+        self._offset = offset
+        self._length = length
+        self.page_count = page_count
+
+    @property
+    def location(self) -> Tuple[str, int, int]:
+        """(path, offset, length) for load_spilled, e.g. in another process while the spill is open."""
+        return (self._spill.path, self._offset, self._length)
+
+    def load(self) -> PhotoFragment:
+        return PhotoFragment.loads(self._spill.read(self._offset, self._length))
+
+    def cleanup(self) -> None:
+        pass  # the spill file goes away as a whole when it is closed
+
+
+def load_spilled(path: str, offset: int, length: int) -> PhotoFragment:
+    """Load a fragment by its SpilledFragment.location."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return PhotoFragment.loads(f.read(length))
+
+
+class FragmentSpill:
+    """Append-only temp file of pickled fragments; deleted on close()."""
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="fragments_")
+        self._file = os.fdopen(fd, "w+b")
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+    def put(self, fragment: PhotoFragment) -> SpilledFragment:
+        """Write fragment out and drop it from memory."""
+        data = fragment.dumps()
+        with self._lock:
+            self._file.seek(0, io.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()  # readable through the path right away
+            self.bytes += len(data)
+        spilled = SpilledFragment(self, offset, len(data), fragment.page_count)
+        fragment.cleanup()
+        return spilled
+
+    def read(self, offset: int, length: int) -> bytes:
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
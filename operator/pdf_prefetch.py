@@ -0,0 +1,100 @@
+"""
+PDF Prefetch - Compress the next photos in worker processes while pages are drawn
+
+generate_pdf's photo loop used to decode, rotate, resize and JPEG-encode each
+photo (image_prep.pdf_jpeg) right before drawing its page, on one core. When
+those JPEGs were not already made during analysis (re-renders after the
+in-memory LRU is gone, derivative store off or evicted) that dominated the
+render.
+
+PdfPrefetcher keeps a window of up to PDF_PREFETCH photos ahead of the photo
+being drawn in a spawn ProcessPoolExecutor. take() waits for the photo's JPEG
+and hands it to image_prep's in-memory LRU, where render_photo_fragment picks
+it up. The bytes are produced by the same pdf_jpeg() in the worker, so the
+PDF is byte-for-byte what the sequential loop writes.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import tracing
+
+# ---------------- Tunables (override via .env if desired) ----------------
+PDF_PREFETCH = int(os.getenv("PDF_PREFETCH", "8"))                  # look-ahead window (0 = off)
+PDF_PREFETCH_PROCESSES = int(os.getenv("PDF_PREFETCH_PROCESSES",
+                                       str(max(1, min(8, (os.cpu_count() or 2) - 1)))))
+PDF_PREFETCH_MIN = int(os.getenv("PDF_PREFETCH_MIN", "8"))          # below this, process startup isn't worth it
+
+
+def _pdf_jpeg_in_worker(path_str: str) -> tuple:
+    """Runs in a pool process. Returns (PDF JPEG bytes, busy s, pid)."""
+    import image_prep
+    started = time.perf_counter()
+    data = image_prep.pdf_jpeg(Path(path_str))
+    return data, time.perf_counter() - started, os.getpid()
+
+
+def should_prefetch(photo_count: int) -> bool:
+    return PDF_PREFETCH > 0 and PDF_PREFETCH_PROCESSES > 0 and photo_count >= PDF_PREFETCH_MIN
+
+
+class PdfPrefetcher:
+    """
+    Prepares PDF JPEGs for paths, in drawing order, at most depth ahead of the
+    last take(). Paths never taken are simply left behind as the window moves on.
+    """
+
+    def __init__(self, paths: List[Path], depth: int = PDF_PREFETCH,
+                 processes: int = PDF_PREFETCH_PROCESSES):
+        self._paths = list(paths)
+        self._depth = max(1, depth)
+        self._next = 0
+        self._futures: Dict[str, object] = {}
+        self._position = {str(p): i for i, p in enumerate(self._paths)}
+        ctx = multiprocessing.get_context("spawn")  # no forked SQLite state in children
+        self._pool = ProcessPoolExecutor(max_workers=max(1, processes), mp_context=ctx)
+        self.prefetched = 0
+        self.waited_s = 0.0
+        self._fill(0)
+
+    def _fill(self, position: int) -> None:
+        while self._next < len(self._paths) and self._next < position + self._depth:
+            path_str = str(self._paths[self._next])
+            self._futures[path_str] = self._pool.submit(_pdf_jpeg_in_worker, path_str)
+            self._next += 1
+
+    def take(self, img_path: Path) -> None:
+        """Wait for img_path's JPEG (if it is prefetched) and leave it for pdf_jpeg."""
+        import image_prep
+
+        path_str = str(img_path)
+        position = self._position.get(path_str)
+        if position is None:
+            return
+        self._fill(position + 1)
+        for passed in [k for k in self._futures if self._position[k] < position]:
+            self._futures.pop(passed).cancel()  # pre-rendered after all; nobody will take it
+        fut = self._futures.pop(path_str, None)
+        if fut is None:
+            return
+        waited = time.perf_counter()
+        try:
+            data, busy, pid = fut.result()
+        except Exception as e:
+            print(f"  Prefetching {img_path.name} failed ({e}); compressing it now")
+            return
+        self.waited_s += time.perf_counter() - waited
+        tracing.complete("prefetch pdf jpeg", time.perf_counter() - busy, busy, cat="pdf",
+                         track=f"pdf process {pid}", photo=img_path.name)
+        image_prep.keep_pdf(img_path, data)
+        self.prefetched += 1
+
+    def close(self) -> None:
+        for fut in self._futures.values():
+            fut.cancel()
+        self._futures = {}
+        self._pool.shutdown(wait=True)
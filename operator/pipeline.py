@@ -0,0 +1,267 @@
+"""
+Analysis Pipeline - Process-pool image preparation feeding the API workers
+
+analyze_images used to decode/resize and call the API in the same thread, so
+the GIL serialized the PIL work across all analysis threads. This module splits
+the work into two stages connected by a bounded queue:
+
+1. Prepare: a ProcessPoolExecutor runs image_prep.prepare_image (decode, resize,
+   quality gate, derivative store) for photos that missed the vision cache.
+2. Describe: API workers (threads, or the async engine) take prepared bytes off
+   the queue and run the model passes.
+
+At most PIPELINE_QUEUE prepared photos wait in the queue and at most one batch
+of PREP_PROCESSES photos is being prepared beyond that, so memory stays flat no
+matter how many photos a report has. Per-stage utilization is kept in
+last_stats for the end-of-run summary.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import tracing
+from analysis_model import Analysis
+
+# ---------------- Tunables (override via .env if desired) ----------------
+PIPELINE_ENABLED = os.getenv("PIPELINE_ENABLED", "true").lower() == "true"
+PREP_PROCESSES = int(os.getenv("PREP_PROCESSES", str(max(1, min(8, (os.cpu_count() or 2) - 1)))))
+PIPELINE_QUEUE = int(os.getenv("PIPELINE_QUEUE", str(2 * PREP_PROCESSES)))
+PIPELINE_MIN_IMAGES = int(os.getenv("PIPELINE_MIN_IMAGES", "8"))  # below this, process startup isn't worth it
+
+_DONE = object()
+
+last_stats: Optional[dict] = None
+
+
+def _prepare_in_worker(path_str: str, analysis_max_px: int, unsure: bool = False) -> tuple:
+    """Runs in a pool process. Returns (path, analysis bytes, mime, pdf bytes or None, rejection, busy s, pid)."""
+    import image_prep
+    started = time.perf_counter()
+    prepared = image_prep.prepare_image(Path(path_str), analysis_max_px, unsure)
+    reason = prepared.rejection.reason if prepared.rejection is not None else None
+    # With the derivative store on, the PDF JPEG is already on disk for generate_pdf
+    pdf = prepared.pdf if image_prep.store is None else None
+    return path_str, prepared.analysis, prepared.analysis_mime, pdf, reason, time.perf_counter() - started, os.getpid()
+
+
+class StageMeter:
+    """Busy time and item count for one stage's workers."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.busy += seconds
+            self.items += 1
+
+    def summary(self, wall: float) -> dict:
+        capacity = self.workers * wall
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_s": round(self.busy, 2),
+            "utilization": round(self.busy / capacity, 3) if capacity > 0 else 0.0,
+        }
+
+
+def should_pipeline(image_count: int) -> bool:
+    return PIPELINE_ENABLED and PREP_PROCESSES > 0 and image_count >= PIPELINE_MIN_IMAGES
+
+
+def pipeline_stats() -> Optional[dict]:
+    """Stage metrics of the last run_pipeline call (None if none since reset_stats)."""
+    return last_stats
+
+
+def reset_stats() -> None:
+    global last_stats
+    last_stats = None
+
+
+def run_pipeline(images: List[Path], api_workers: int, async_engine=None,
+                 on_start: Optional[Callable[[Path], None]] = None,
+                 on_result: Optional[Callable[[str, Analysis], None]] = None) -> Dict[str, Analysis]:
+    """
+    Analyze images through the prepare -> describe pipeline and return
+    {str(path): analysis}. Cache hits are answered up front without entering
+    either stage. Describe runs on api_workers threads, or on async_engine if given.
+    on_result(path, analysis) is called as each photo finishes.
+    """
+    global last_stats
+    import vision
+    import image_prep
+    from quality_gate import skipped_analysis
+
+    vision._require_api_key()
+    started = time.perf_counter()
+    results: Dict[str, Analysis] = {}
+    results_lock = threading.Lock()
+
+    # Cache lookups are stat + index lookups; keep them out of the stages
+    pending = []
+    for img_path in images:
+        key = vision._cache_key(img_path)
+        cached = vision._cache_get(img_path, key)
+        if cached:
+            if on_start:
+                on_start(img_path)
+            results[str(img_path)] = cached
+            if on_result:
+                on_result(str(img_path), cached)
+        else:
+            pending.append((img_path, key))
+
+    prep = StageMeter("prepare", PREP_PROCESSES)
+    api = StageMeter("describe", async_engine.concurrency if async_engine else api_workers)
+    ready: "queue.Queue" = queue.Queue(maxsize=max(1, PIPELINE_QUEUE))
+    keys = {str(p): k for p, k in pending}
+    backpressure = [0.0]   # producer time spent waiting for queue space
+    starved = [0.0]        # describe time spent waiting for prepared photos
+    max_depth = [0]
+
+    def finish(path_str: str, analysis: Analysis) -> None:
+        with results_lock:
+            results[path_str] = analysis
+        if on_result:
+            on_result(path_str, analysis)
+
+    def produce() -> None:
+        """Keep the pool busy while the queue has room; the blocking put is the backpressure."""
+        ctx = multiprocessing.get_context("spawn")  # no forked SQLite/HTTP state in children
+        todo = list(pending)
+        inflight = set()
+        owners = {}
+        try:
+            with ProcessPoolExecutor(max_workers=PREP_PROCESSES, mp_context=ctx) as pool:
+                while todo or inflight:
+                    while todo and len(inflight) < PREP_PROCESSES:
+                        img_path, _ = todo.pop(0)
+                        fut = pool.submit(_prepare_in_worker, str(img_path), vision.ANALYSIS_MAX_PX,
+                                          vision._first_pass_unsure(img_path))
+                        owners[fut] = img_path
+                        inflight.add(fut)
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        try:
+                            item = fut.result()
+                            prep.add(item[5])
+                            # Timed in the worker; placed on its process's track ending now
+                            tracing.complete("prepare", time.perf_counter() - item[5], item[5], cat="pipeline",
+                                             track=f"prep process {item[6]}", photo=Path(item[0]).name,
+                                             rejected=item[4] or "")
+                        except Exception as e:
+                            item = (str(owners[fut]), e)
+                        owners.pop(fut, None)
+                        waited = time.perf_counter()
+                        ready.put(item)
+                        backpressure[0] += time.perf_counter() - waited
+                        max_depth[0] = max(max_depth[0], ready.qsize())
+        finally:
+            for _ in range(consumers):
+                ready.put(_DONE)
+
+    def handle(item) -> Optional[tuple]:
+        """Settle items that need no API call; return (path, bytes, mime, key) otherwise."""
+        path_str = item[0]
+        img_path = Path(path_str)
+        if on_start:
+            on_start(img_path)
+        if len(item) == 2:
+            print(f"  Error preparing {img_path.name}: {item[1]}")
+            finish(path_str, Analysis.failed(str(item[1])))
+            return None
+        _, img_bytes, mime, pdf, reason, _, _ = item
+        if pdf is not None:
+            image_prep.keep_pdf(img_path, pdf)
+        if reason:
+            print(f"[vision] Quality gate: skipping {img_path.name} ({reason})", flush=True)
+            finish(path_str, skipped_analysis(reason))
+            return None
+        return img_path, img_bytes, mime, keys.get(path_str)
+
+    def take():
+        waited = time.perf_counter()
+        item = ready.get()
+        starved[0] += time.perf_counter() - waited
+        return item
+
+    def describe_worker() -> None:
+        while True:
+            item = take()
+            if item is _DONE:
+                return
+            job = handle(item)
+            if job is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                with tracing.span("describe", cat="pipeline", photo=job[0].name):
+                    finish(str(job[0]), vision.describe_prepared(*job))
+            except Exception as e:
+                print(f"  Error analyzing {job[0].name}: {e}")
+                finish(str(job[0]), Analysis.failed(str(e)))
+            api.add(time.perf_counter() - t0)
+
+    def async_dispatcher() -> None:
+        slots = threading.BoundedSemaphore(async_engine.concurrency)
+        futures = []
+        while True:
+            item = take()
+            if item is _DONE:
+                break
+            job = handle(item)
+            if job is None:
+                continue
+            slots.acquire()  # don't pull more than the engine can run
+            t0 = time.perf_counter()
+            fut = async_engine.submit_prepared(*job)
+
+            def done(f, path_str=str(job[0]), t0=t0):
+                try:
+                    finish(path_str, f.result())
+                except Exception as e:
+                    finish(path_str, Analysis.failed(str(e)))
+                api.add(time.perf_counter() - t0)
+                slots.release()
+
+            fut.add_done_callback(done)
+            futures.append(fut)
+        wait(futures)
+
+    consumers = 1 if async_engine is not None else max(1, api_workers)
+    target = async_dispatcher if async_engine is not None else describe_worker
+    threads = [threading.Thread(target=target, name=f"describe-{i}", daemon=True) for i in range(consumers)]
+    for t in threads:
+        t.start()
+    if pending:
+        produce()
+    else:
+        for _ in range(consumers):
+            ready.put(_DONE)
+    for t in threads:
+        t.join()
+
+    wall = time.perf_counter() - started
+    last_stats = {
+        "photos": len(images),
+        "cached": len(images) - len(pending),
+        "wall_s": round(wall, 2),
+        "prepare": prep.summary(wall),
+        "describe": api.summary(wall),
+        "queue_capacity": ready.maxsize,
+        "queue_max_depth": max_depth[0],
+        "backpressure_s": round(backpressure[0], 2),
+        "describe_starved_s": round(starved[0], 2),
+    }
+    return results
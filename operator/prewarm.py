@@ -0,0 +1,178 @@
+"""
+Prewarm - Analyze a photo folder into the caches before the report is requested
+
+The operator UI starts this as soon as a folder is added, while the operator
+is still typing notes. It runs the same steps as build_reports up to analysis
+(collect, near-duplicate collapse, hashing, preparation, both model passes),
+so the vision cache and derivative store are filled and the run started by
+Generate mostly hits them.
+
+It runs as a low-priority child process with reduced concurrency so the UI
+stays responsive, and prints "[warm] done/total" lines the UI turns into a
+warm percentage. Stopping it at any point is safe: every finished photo is
+already committed to the cache, and unfinished ones are simply analyzed again
+by the real run.
+
+Usage:
+    python prewarm.py --dir "C:/Inspections/123 Main St"
+"""
+
+import os
+import platform
+import re
+import signal
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# ---------------- Tunables (override via .env if desired) ----------------
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))   # API workers (report runs use 8)
+PREWARM_PROCESSES = int(os.getenv("PREWARM_PROCESSES", "1"))       # image preparation processes
+PREWARM_NICE = int(os.getenv("PREWARM_NICE", "10"))
+
+WARM_RE = re.compile(r"\[warm\]\s*(\d+)\s*/\s*(\d+)")
+
+
+def lower_priority() -> None:
+    """Drop this process (and the pool processes it starts) to background priority."""
+    try:
+        if platform.system() == "Windows":
+            import ctypes
+            below_normal = 0x4000
+            ctypes.windll.kernel32.SetPriorityClass(ctypes.windll.kernel32.GetCurrentProcess(), below_normal)
+        else:
+            os.nice(PREWARM_NICE)
+    except Exception:
+        pass  # best effort
+
+
+def prewarm_folder(folder: Path, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Analyze every photo in folder into the cache; returns the number of photos analyzed."""
+    import run_report
+
+    images = run_report.collect_images(folder)
+    analysis_images = images
+    if run_report.DEDUPE_AVAILABLE and images:
+        # build_reports only analyzes representatives, so those are what to warm
+        analysis_images, _ = run_report.collapse_near_duplicates(images)
+
+    total = len(analysis_images)
+    done = [0]
+    lock = threading.Lock()
+
+    def on_result(path_str, analysis) -> None:
+        with lock:
+            done[0] += 1
+            current = done[0]
+        if on_progress:
+            on_progress(current, total)
+
+    if on_progress:
+        on_progress(0, total)
+    if total:
+        run_report.analyze_images(analysis_images, engine="threads", on_result=on_result)
+    return done[0]
+
+
+class BackgroundPrewarm:
+    """
+    Runs prewarm.py for each added folder, one at a time, in a low-priority
+    child process. on_progress(folder, done, total) is called from a reader
+    thread as photos finish.
+    """
+
+    def __init__(self, on_progress: Callable[[str, int, int], None], cwd: Optional[Path] = None):
+        self.on_progress = on_progress
+        self.cwd = cwd or Path(__file__).parent
+        self._pending: List[str] = []
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def add(self, folder: str) -> None:
+        """Queue a folder; starts the worker thread if it isn't running."""
+        if not PREWARM_ENABLED:
+            return
+        with self._lock:
+            self._stopped = False
+            self._pending.append(folder)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prewarm", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the current child and drop queued folders (their finished photos stay cached).
+        With a timeout, wait that long for the child to exit and kill it if it hasn't.
+        """
+        with self._lock:
+            self._stopped = True
+            self._pending.clear()
+            process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            if timeout is not None:
+                try:
+                    process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._stopped or not self._pending:
+                    self._thread = None
+                    return
+                folder = self._pending.pop(0)
+                cmd = [sys.executable, str(Path(__file__).resolve()), "--dir", folder]
+                flags = getattr(subprocess, "BELOW_NORMAL_PRIORITY_CLASS", 0)
+                self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                 text=True, cwd=str(self.cwd), encoding="utf-8",
+                                                 errors="replace", creationflags=flags)
+                process = self._process
+            for line in iter(process.stdout.readline, ""):
+                match = WARM_RE.search(line)
+                if match:
+                    self.on_progress(folder, int(match.group(1)), int(match.group(2)))
+            process.wait()
+            with self._lock:
+                self._process = None
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyze a photo folder into the cache ahead of a report run")
+    parser.add_argument("--dir", required=True, help="Photo folder to warm")
+    args = parser.parse_args()
+
+    # Imported first: vision loads .env with override=True, so set the pool sizes after it
+    import run_report
+    os.environ["ANALYSIS_CONCURRENCY"] = str(PREWARM_CONCURRENCY)
+    if run_report.PIPELINE_AVAILABLE:
+        import pipeline
+        pipeline.PREP_PROCESSES = PREWARM_PROCESSES
+    lower_priority()
+    if hasattr(signal, "SIGTERM") and platform.system() != "Windows":
+        # Exit through normal shutdown so the preparation pool is torn down too
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    folder = Path(args.dir)
+    if not folder.is_dir():
+        print(f"Error: Directory not found: {folder}")
+        sys.exit(1)
+
+    def report(done: int, total: int) -> None:
+        print(f"[warm] {done}/{total}", flush=True)
+
+    count = prewarm_folder(folder, report)
+    print(f"Prewarm complete: {count} photos analyzed", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Photo Quality Gate - Skip blurry, dark and blank frames before they cost API calls
+
+A few percent of every upload is motion blur, black pocket shots or a thumb over
+the lens. This module scores the downscaled analysis copy of each photo with a
+handful of vectorized NumPy statistics:
+
+- Laplacian variance per tile, taking the sharpest tile (sharpness)
+- Luminance histogram percentiles (under/over exposure)
+- Histogram entropy (blank or covered frames)
+
+Sharpness is local: a ceiling or wall is flat almost everywhere, so the
+variance of the whole frame is near zero even when it is in focus. The crack
+or stain that is the point of the photo is in a few tiles, and a photo counts
+as sharp if any part of it is. For the same reason a low-entropy frame is only
+"blank" if no tile has an edge either.
+
+Photos that fail are not sent to the vision model; their Analysis carries the
+reason in its skipped field and the report renders it as a flag. The gate is
+off unless QUALITY_GATE_ENABLED=true, until its thresholds are validated on
+real uploads.
+"""
+
+import os
+from typing import Dict, Optional
+
+from PIL import Image
+
+from analysis_model import Analysis
+
+try:
+    import numpy as np
+except ImportError:  # the gate is skipped without NumPy
+    np = None
+
+# ---------------- Tunables (override via .env if desired) ----------------
+QUALITY_GATE_ENABLED = os.getenv("QUALITY_GATE_ENABLED", "false").lower() == "true"
+QUALITY_SAMPLE_PX = int(os.getenv("QUALITY_SAMPLE_PX", "512"))          # long edge the stats are computed at
+QUALITY_TILES = int(os.getenv("QUALITY_TILES", "8"))                     # sharpness grid is this many tiles per side
+QUALITY_MIN_SHARPNESS = float(os.getenv("QUALITY_MIN_SHARPNESS", "25"))  # sharpest tile's Laplacian variance below this = blurry
+QUALITY_DARK_P95 = float(os.getenv("QUALITY_DARK_P95", "40"))            # 95th percentile luminance below this = dark
+QUALITY_BRIGHT_P05 = float(os.getenv("QUALITY_BRIGHT_P05", "245"))       # 5th percentile above this = blown out
+QUALITY_MIN_ENTROPY = float(os.getenv("QUALITY_MIN_ENTROPY", "3.0"))     # bits; below this = blank/covered
+
+
+class PhotoRejected(Exception):
+    """Raised by the analysis image path when a photo fails the quality gate."""
+
+    def __init__(self, reason: str, metrics: Optional[Dict[str, float]] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.metrics = metrics or {}
+
+
+def _tile_variances(lap: "np.ndarray") -> "np.ndarray":
+    """Variance of lap in each cell of a QUALITY_TILES grid (fewer cells for tiny images)."""
+    tiles = max(1, min(QUALITY_TILES, lap.shape[0], lap.shape[1]))
+    th, tw = lap.shape[0] // tiles, lap.shape[1] // tiles
+    grid = lap[:th * tiles, :tw * tiles].reshape(tiles, th, tiles, tw)
+    return grid.var(axis=(1, 3))
+
+
+def measure(im: Image.Image) -> Dict[str, float]:
+    """
+    Return sharpness (sharpest tile), whole-frame sharpness, exposure
+    percentiles and entropy for an (already upright) image.
+    """
+    gray = im.convert("L")
+    if max(gray.size) > QUALITY_SAMPLE_PX:
+        gray = gray.copy()
+        gray.thumbnail((QUALITY_SAMPLE_PX, QUALITY_SAMPLE_PX), Image.Resampling.BILINEAR)
+    a = np.asarray(gray, dtype=np.float32)
+
+    lap = (a[:-2, 1:-1] + a[2:, 1:-1] + a[1:-1, :-2] + a[1:-1, 2:]) - 4.0 * a[1:-1, 1:-1]
+    hist = np.bincount(a.astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+    cdf = np.cumsum(hist) / hist.sum()
+    p = hist[hist > 0] / hist.sum()
+    return {
+        "sharpness": float(_tile_variances(lap).max()) if lap.size else 0.0,
+        "frame_sharpness": float(lap.var()) if lap.size else 0.0,
+        "p05": float(np.searchsorted(cdf, 0.05)),
+        "p95": float(np.searchsorted(cdf, 0.95)),
+        "mean": float(a.mean()),
+        "entropy": float(abs((p * np.log2(p)).sum())),
+    }
+
+
+def verdict(metrics: Dict[str, float]) -> Optional[str]:
+    """Return a rejection reason for the metrics, or None if the photo is usable."""
+    if metrics["p95"] < QUALITY_DARK_P95:
+        return "too dark"
+    if metrics["p05"] > QUALITY_BRIGHT_P05:
+        return "overexposed"
+    if metrics["entropy"] < QUALITY_MIN_ENTROPY and metrics["sharpness"] < QUALITY_MIN_SHARPNESS:
+        return "blank or lens covered"
+    if metrics["sharpness"] < QUALITY_MIN_SHARPNESS:
+        return "too blurry"
+    return None
+
+
+def check_image(im: Image.Image) -> None:
+    """Raise PhotoRejected if the image fails the gate (no-op when disabled)."""
+    if not QUALITY_GATE_ENABLED or np is None:
+        return
+    metrics = measure(im)
+    reason = verdict(metrics)
+    if reason:
+        raise PhotoRejected(reason, metrics)
+
+
+def signature() -> str:
+    """Short string naming the active thresholds, for caching verdicts ('off' when disabled)."""
+    if not QUALITY_GATE_ENABLED or np is None:
+        return "off"
+    return (f"s{QUALITY_SAMPLE_PX}-t{QUALITY_TILES}-b{QUALITY_MIN_SHARPNESS:g}-d{QUALITY_DARK_P95:g}"
+            f"-o{QUALITY_BRIGHT_P05:g}-e{QUALITY_MIN_ENTROPY:g}")
+
+
+def skipped_analysis(reason: str) -> Analysis:
+    """Analysis for a photo the gate kept away from the model."""
+    return Analysis(skipped=reason)
+
+
+def skip_reason(analysis: Optional[Analysis]) -> Optional[str]:
+    """Return the gate's reason if the photo was skipped, else None."""
+    return analysis.skipped if analysis is not None else None
@@ -0,0 +1,138 @@
+"""
+Result Store - One report's analyses, indexed for constant-time lookups
+
+generate_pdf and group_images_by_location found each photo's analysis by its
+full path and, failing that, by scanning every result for one with the same
+file name. Whenever keys and image paths differ (a resumed job's extraction
+directory, results handed over from another tool) that scan ran once per
+photo, so rendering was O(N^2) in the number of photos.
+
+InspectionResultStore is a read-only Mapping of {path string: Analysis}, so
+code that iterates results keeps working, with indexes built as results are
+added:
+
+- full path (the mapping itself)
+- file name (first result with that name, as the scan returned)
+- content digest, built on first use from the stat-keyed digest memo, so a
+  renamed or moved photo still finds its analysis
+- normalized location -> photos, in the order they were added
+- results that have issues, for the action items page
+"""
+
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from analysis_model import Analysis
+
+
+class InspectionResultStore(Mapping):
+    """
+    Analyses keyed by str(path). lookup() resolves an image path by full path,
+    then content digest (when digest_of is given), then file name.
+    normalize maps a raw location to its report section.
+    """
+
+    def __init__(self, results: Optional[Mapping] = None,
+                 normalize: Optional[Callable[[str], str]] = None,
+                 digest_of: Optional[Callable[[Path], Optional[str]]] = None):
+        self._normalize = normalize or (lambda loc: loc)
+        self._digest_of = digest_of
+        self._by_path: Dict[str, Analysis] = {}
+        self._by_name: Dict[str, str] = {}
+        self._by_digest: Optional[Dict[str, str]] = None
+        self._by_location: Dict[str, List[str]] = {}
+        self._with_issues: List[str] = []
+        self._normalized: Dict[str, str] = {}
+        for key, analysis in (results or {}).items():
+            self.add(key, analysis)
+
+    # ----- Mapping -----
+    def __getitem__(self, key: str) -> Analysis:
+        return self._by_path[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_path)
+
+    def __len__(self) -> int:
+        return len(self._by_path)
+
+    def __contains__(self, key) -> bool:
+        return key in self._by_path
+
+    # ----- updates -----
+    def add(self, key: str, analysis: Analysis) -> None:
+        key = str(key)
+        if key in self._by_path:
+            self._unindex(key)
+        self._by_path[key] = analysis
+        self._by_name.setdefault(Path(key).name, key)
+        if self._by_digest is not None:
+            digest = self._digest(Path(key))
+            if digest is not None:
+                self._by_digest.setdefault(digest, key)
+        if analysis is not None:
+            self._by_location.setdefault(self.normalized(analysis.location), []).append(key)
+            if analysis.issues:
+                self._with_issues.append(key)
+
+    def _unindex(self, key: str) -> None:
+        old = self._by_path[key]
+        if old is not None:
+            self._by_location[self.normalized(old.location)].remove(key)
+            if old.issues:
+                self._with_issues.remove(key)
+
+    # ----- queries -----
+    def key_for(self, img_path: Path) -> Optional[str]:
+        """The result key img_path resolves to, or None."""
+        img_path_str = str(img_path)
+        if img_path_str in self._by_path:
+            return img_path_str
+        if self._digest_of is not None:
+            if self._by_digest is None:
+                self._build_digest_index()
+            digest = self._digest(Path(img_path))
+            if digest is not None and digest in self._by_digest:
+                return self._by_digest[digest]
+        return self._by_name.get(Path(img_path).name)
+
+    def lookup(self, img_path: Path) -> Optional[Analysis]:
+        """A photo's analysis, or None."""
+        key = self.key_for(img_path)
+        return self._by_path[key] if key is not None else None
+
+    def normalized(self, location: str) -> str:
+        """Report section for a raw location ("Other" when there is none)."""
+        if not location:
+            return "Other"
+        section = self._normalized.get(location)
+        if section is None:
+            section = self._normalized[location] = self._normalize(location)
+        return section
+
+    def location_of(self, img_path: Path) -> str:
+        analysis = self.lookup(img_path)
+        return self.normalized(analysis.location) if analysis else "Other"
+
+    def at_location(self, section: str) -> List[str]:
+        """Result keys whose analysis falls in section, in the order they were added."""
+        return list(self._by_location.get(section, ()))
+
+    def with_issues(self) -> List[Tuple[str, Analysis]]:
+        """(key, analysis) of every result that has issues, in the order they were added."""
+        return [(key, self._by_path[key]) for key in self._with_issues]
+
+    # ----- digests -----
+    def _digest(self, path: Path) -> Optional[str]:
+        try:
+            return self._digest_of(path)
+        except OSError:
+            return None
+
+    def _build_digest_index(self) -> None:
+        self._by_digest = {}
+        for key in self._by_path:
+            digest = self._digest(Path(key))
+            if digest is not None:
+                self._by_digest.setdefault(digest, key)
@@ -16,7 +16,10 @@ if sys.platform == 'win32':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+import io
 import json
+import functools
+import time
 import secrets
 import sqlite3
 import zipfile
@@ -24,7 +27,7 @@ import tempfile
 import shutil
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Callable
 from PIL import Image
 # Enable HEIC/HEIF support (Apple's image format)
 try:
@@ -34,32 +37,95 @@ except ImportError:
     pass  # HEIC support not available
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
 from reportlab.lib.units import inch
 
+from analysis_model import Analysis, parse_analysis
+import tracing
+
 # Import vision analysis module
 try:
-    from vision import describe_image
+    from vision import describe_image, describe_images_batch, cache_stats, prehash_images, VISION_BATCH_SIZE
+    from vision import second_pass_stats, stream_stats
 except ImportError:
     print("Warning: vision.py not found, using placeholder analysis")
     def describe_image(path):
-        return "Image analysis not available"
+        return Analysis(note="Image analysis not available")
+    def cache_stats():
+        return {}
+    def prehash_images(paths):
+        return 0
+    describe_images_batch = None
+    VISION_BATCH_SIZE = 1
+    def second_pass_stats():
+        return {}
+    def stream_stats():
+        return {}
+
+from image_prep import pdf_jpeg, pdf_in_memory, derivative_stats, digests
+from upload_policy import upload_stats
+from page_fragments import (RecordingCanvas, PhotoFragment, PhotoImage, FragmentSpill, SpilledFragment, Op,
+                            replay_ops)
+from image_scan import scan_images
+from result_store import InspectionResultStore
+
+# Import preprocessing pipeline (process pool feeding the API workers)
+try:
+    from pipeline import run_pipeline, should_pipeline, pipeline_stats, reset_stats as reset_pipeline_stats
+    PIPELINE_AVAILABLE = True
+except ImportError:
+    PIPELINE_AVAILABLE = False
+
+# Import photo quality gate (skipped photos are flagged in the report)
+try:
+    from quality_gate import skip_reason
+except ImportError:
+    def skip_reason(analysis):
+        return None
 
 # Import tenant action items module
 try:
     from tenant_actions import (
         parse_issues_from_vision_results,
         generate_action_items_page,
-        extract_location
     )
     ACTION_ITEMS_AVAILABLE = True
 except ImportError:
     ACTION_ITEMS_AVAILABLE = False
     print("Warning: tenant_actions.py not found, action items page will be skipped")
-    def extract_location(analysis):
-        import re
-        match = re.search(r'Location:\s*(.+?)(?:\n|$)', analysis, re.IGNORECASE)
-        return match.group(1).strip() if match else "Unknown"
+
+# Import the job journal (lets --resume continue a job that died part way)
+try:
+    from journal import JobJournal, JOURNAL_ENABLED
+except ImportError:
+    JobJournal = None
+    JOURNAL_ENABLED = False
+
+# Import PDF JPEG prefetching (photos compressed in worker processes ahead of the drawing loop)
+try:
+    from pdf_prefetch import PdfPrefetcher, should_prefetch
+    PREFETCH_AVAILABLE = True
+except ImportError:
+    PREFETCH_AVAILABLE = False
+
+# Import section-parallel rendering (location sections drawn in worker processes, then merged)
+try:
+    from section_render import SectionJob, render_sections, should_render_sections, PDF_SECTION_PROCESSES
+    SECTIONS_AVAILABLE = True
+except ImportError:
+    SECTIONS_AVAILABLE = False
+
+# Import streaming ZIP ingestion (photos are read out of the archive, not extracted)
+try:
+    from zip_source import ingest_zip, ZIP_STREAMING
+except ImportError:
+    ZIP_STREAMING = False
+
+# Import near-duplicate collapsing (burst shots share one analysis)
+try:
+    from dedupe import collapse_near_duplicates, expand_duplicate_results, shared_analysis
+    DEDUPE_AVAILABLE = True
+except ImportError:
+    DEDUPE_AVAILABLE = False
 
 # Directory Configuration
 WORKSPACE = Path(os.environ.get('WORKSPACE_DIR', './workspace'))
@@ -71,6 +137,16 @@ DB_PATH = WORKSPACE / 'inspection_portal.db'
 for dir_path in [WORKSPACE, OUTPUTS_DIR, INCOMING_DIR]:
     dir_path.mkdir(parents=True, exist_ok=True)
 
+# Analysis engine: "threads" (ThreadPoolExecutor around describe_image) or "async" (vision_async)
+ANALYSIS_ENGINES = ('threads', 'async')
+ANALYSIS_ENGINE = os.environ.get('ANALYSIS_ENGINE', 'threads').strip().lower()
+
+# Photo pages are rendered into fragments while analysis runs (see PhotoFragmentRenderer)
+INCREMENTAL_RENDER = os.environ.get('INCREMENTAL_RENDER', 'true').strip().lower() == 'true'
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', '1'))
+# Laid-out analysis columns kept for reuse (a few KB each; only photos with issues or notes have one)
+ANALYSIS_COLUMN_CACHE = int(os.environ.get('ANALYSIS_COLUMN_CACHE', '4096'))
+
 # Portal configuration
 PORTAL_EXTERNAL_BASE_URL = os.environ.get("PORTAL_EXTERNAL_BASE_URL", "http://localhost:8000").rstrip("/")
 
@@ -202,6 +278,7 @@ def now_iso() -> str:
 
 # ============== Image Processing Functions ==============
 
+@tracing.traced()
 def extract_zip(zip_path: Path) -> Path:
     """Extract ZIP file to temporary directory and return path to photos"""
     extract_dir = Path(tempfile.mkdtemp(prefix="inspection_"))
@@ -218,18 +295,10 @@ def extract_zip(zip_path: Path) -> Path:
     # Return root extraction dir if no subdirectory found
     return extract_dir
 
+@tracing.traced()
 def collect_images(photos_dir: Path) -> List[Path]:
-    """Collect all image files from directory"""
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.heic', '.heif'}
-    images = []
-    
-    for file_path in photos_dir.rglob('*'):
-        if file_path.is_file() and file_path.suffix.lower() in image_extensions:
-            images.append(file_path)
-    
-    # Sort by name for consistent ordering
-    images.sort(key=lambda p: p.name.lower())
-    return images
+    """Collect all image files from directory, sorted by name (see image_scan)"""
+    return scan_images(photos_dir)
 
 def normalize_location(location: str) -> str:
     """
@@ -354,7 +423,8 @@ def normalize_location(location: str) -> str:
     return location
 
 
-def group_images_by_location(images: List[Path], vision_results: Optional[Dict[str, str]] = None) -> List[Tuple[str, List[Path]]]:
+@tracing.traced()
+def group_images_by_location(images: List[Path], vision_results: Optional[Dict[str, Analysis]] = None) -> List[Tuple[str, List[Path]]]:
     """
     Group images by their location extracted from vision results.
 
@@ -365,26 +435,12 @@ def group_images_by_location(images: List[Path], vision_results: Optional[Dict[s
     if not vision_results:
         return [("All Photos", images)]
 
+    results = result_store(vision_results)
     groups: Dict[str, List[Path]] = {}
 
     for img_path in images:
-        img_path_str = str(img_path)
-        analysis = None
-
-        # Match by full path or by filename
-        if img_path_str in vision_results:
-            analysis = vision_results[img_path_str]
-        else:
-            for key, value in vision_results.items():
-                if Path(key).name == img_path.name:
-                    analysis = value
-                    break
-
-        if analysis:
-            raw_location = extract_location(analysis)
-            location = normalize_location(raw_location)
-        else:
-            location = "Other"
+        # Match by full path, content or filename (indexed, see InspectionResultStore)
+        location = results.location_of(img_path)
 
         if location not in groups:
             groups[location] = []
@@ -399,9 +455,11 @@ def group_images_by_location(images: List[Path], vision_results: Optional[Dict[s
     return [(loc, groups[loc]) for loc in sorted_locations]
 
 
-def calculate_page_layout(grouped_images: List[Tuple[str, List[Path]]], has_action_items: bool) -> List[Tuple[str, int, int]]:
+def calculate_page_layout(grouped_images: List[Tuple[str, List[Path]]], has_action_items: bool,
+                          photo_pages: Optional[Dict[str, int]] = None) -> List[Tuple[str, int, int]]:
     """
     Pre-calculate starting page number for each location section.
+    photo_pages gives the pages each photo takes (see photo_page_count); one if missing.
 
     Returns: [(location_name, photo_count, starting_page_number), ...]
     """
@@ -415,51 +473,143 @@ def calculate_page_layout(grouped_images: List[Tuple[str, List[Path]]], has_acti
         current_page += 1  # Section divider page
         section_start = current_page
         sections.append((location_name, len(location_images), section_start))
-        current_page += len(location_images)  # One page per photo (minimum)
+        for img_path in location_images:
+            current_page += (photo_pages or {}).get(str(img_path), 1)
 
     return sections
 
 
-def calculate_image_page_map(grouped_images: List[Tuple[str, List[Path]]], has_action_items: bool) -> Dict[str, int]:
+def calculate_image_page_map(grouped_images: List[Tuple[str, List[Path]]], has_action_items: bool,
+                             results: Optional[InspectionResultStore] = None,
+                             photo_pages: Optional[Dict[str, int]] = None, sections: bool = True) -> Dict[str, int]:
     """
-    Map each image path to its page number in the PDF.
+    Map each image path to the page its photo is drawn on in the PDF.
+    With results, the result key each image resolves to is mapped as well, so
+    action items keyed by their analysis find their page. photo_pages is as for
+    calculate_page_layout; without sections there is no TOC and no dividers.
 
     Returns: {image_path_str: page_number, ...}
     """
+    # current_page is the last page already used (cover, action items, TOC,
+    # a divider or the previous photo's last page); a photo starts on the next
     page_map = {}
     current_page = 1  # Cover
     if has_action_items:
         current_page += 1  # Action items page
-    current_page += 1  # TOC
+    if sections:
+        current_page += 1  # TOC
 
     for location_name, location_images in grouped_images:
-        current_page += 1  # Section divider page
+        if sections:
+            current_page += 1  # Section divider page
         for img_path in location_images:
-            page_map[str(img_path)] = current_page
-            current_page += 1
+            page = current_page + 1  # first page after the last one used
+            page_map[str(img_path)] = page
+            if results is not None:
+                key = results.key_for(img_path)
+                if key is not None:
+                    page_map.setdefault(key, page)
+            current_page += (photo_pages or {}).get(str(img_path), 1)
 
     return page_map
 
 
-def analyze_images(images: List[Path]) -> Dict[str, str]:
-    """Analyze all images using vision AI with concurrent processing"""
+def create_async_engine():
+    """Start the async vision engine and begin warming its connection pool.
+
+    Returns None if the async engine is unavailable (e.g. vision.py missing).
+    """
+    try:
+        from vision_async import AsyncVisionEngine
+    except ImportError as e:
+        print(f"Warning: async vision engine unavailable ({e}), using threads")
+        return None
+    engine = AsyncVisionEngine()
+    engine.warm_up()
+    return engine
+
+
+def make_analysis_batches(images: List[Path], batch_size: int) -> List[List[Path]]:
+    """Split images into batches of consecutive photos from the same folder (same room, usually)"""
+    batches: List[List[Path]] = []
+    for img_path in images:
+        if batches and len(batches[-1]) < batch_size and batches[-1][-1].parent == img_path.parent:
+            batches[-1].append(img_path)
+        else:
+            batches.append([img_path])
+    return batches
+
+
+@tracing.traced()
+def analyze_images(images: List[Path], engine: Optional[str] = None, async_engine=None,
+                   batch_size: Optional[int] = None,
+                   on_result: Optional[Callable[[str, Analysis], None]] = None) -> Dict[str, Analysis]:
+    """Analyze all images using vision AI with concurrent processing
+
+    Args:
+        images: Image paths to analyze
+        engine: "threads" or "async" (defaults to ANALYSIS_ENGINE)
+        async_engine: Pre-warmed AsyncVisionEngine to reuse for the async engine
+        batch_size: Photos per request for the threads engine (defaults to VISION_BATCH_SIZE)
+        on_result: Called with (path, analysis) as each photo finishes
+    """
     import concurrent.futures
     import threading
     
     results = {}
     total = len(images)
-    
+    engine = (engine or ANALYSIS_ENGINE).lower()
+
+    # Hash all photos up front (in parallel) so each cache lookup is a stat + index hit
+    started = time.perf_counter()
+    hashed = prehash_images(images)
+    if hashed:
+        print(f"Hashed {hashed} images in {time.perf_counter() - started:.2f}s")
+
     # Get concurrency setting from environment (default 8 for fast batch processing)
     max_workers = int(os.getenv('ANALYSIS_CONCURRENCY', '8'))
     
-    print(f"Starting analysis of {total} images (concurrency={max_workers})...")
+    batch_size = VISION_BATCH_SIZE if batch_size is None else batch_size
+    if describe_images_batch is None:
+        batch_size = 1
+
+    # Decode/resize in a process pool while API workers drain a bounded queue
+    if PIPELINE_AVAILABLE and should_pipeline(total) and (engine == 'async' or batch_size <= 1):
+        return analyze_images_pipelined(images, engine, async_engine, max_workers, on_result)
+
+    if engine == 'async':
+        owns_engine = async_engine is None
+        if owns_engine:
+            async_engine = create_async_engine()
+        if async_engine is not None:
+            print(f"Starting analysis of {total} images (engine=async, concurrency={async_engine.concurrency})...")
+            counter = [0]
+
+            def on_start(img_path: Path) -> None:
+                # Runs on the engine's event loop thread, so no lock needed
+                counter[0] += 1
+                print(f"[{counter[0]}/{total}] Analyzing {img_path.name}...")
+
+            try:
+                results = async_engine.analyze(images, on_start=on_start, on_result=on_result)
+            finally:
+                if owns_engine:
+                    async_engine.close()
+            print_cache_stats()
+            return results
+    
+    
+    if batch_size > 1:
+        print(f"Starting analysis of {total} images (concurrency={max_workers}, batch size={batch_size})...")
+    else:
+        print(f"Starting analysis of {total} images (concurrency={max_workers})...")
     
     # Thread-safe counter for progress
     counter_lock = threading.Lock()
     counter = [0]
     
-    def analyze_one(img_path: Path) -> Tuple[str, str]:
-        """Analyze a single image and return path and result"""
+    def analyze_one(img_path: Path) -> List[Tuple[str, Analysis]]:
+        """Analyze a single image and return [(path, result)]"""
         with counter_lock:
             counter[0] += 1
             current = counter[0]
@@ -467,26 +617,144 @@ def analyze_images(images: List[Path]) -> Dict[str, str]:
         print(f"[{current}/{total}] Analyzing {img_path.name}...")
         try:
             analysis = describe_image(img_path)
-            return str(img_path), analysis
+            return [(str(img_path), analysis)]
         except Exception as e:
             print(f"  Error analyzing {img_path.name}: {e}")
-            return str(img_path), f"Analysis failed: {str(e)}"
+            return [(str(img_path), Analysis.failed(str(e)))]
+    
+    def analyze_batch(batch: List[Path]) -> List[Tuple[str, Analysis]]:
+        """Analyze a batch of images in one request and return [(path, result), ...]"""
+        with counter_lock:
+            first = counter[0] + 1
+            counter[0] += len(batch)
+        
+        for offset, img_path in enumerate(batch):
+            print(f"[{first + offset}/{total}] Analyzing {img_path.name}...")
+        try:
+            return list(describe_images_batch(batch).items())
+        except Exception as e:
+            print(f"  Error analyzing batch starting at {batch[0].name}: {e}")
+            return [(str(p), Analysis.failed(str(e))) for p in batch]
     
     # Process images concurrently
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         # Submit all tasks
-        futures = [executor.submit(analyze_one, img) for img in images]
+        if batch_size > 1:
+            futures = [executor.submit(analyze_batch, batch) for batch in make_analysis_batches(images, batch_size)]
+        else:
+            futures = [executor.submit(analyze_one, img) for img in images]
         
         # Collect results as they complete
         for future in concurrent.futures.as_completed(futures):
             try:
-                path, analysis = future.result()
-                results[path] = analysis
+                for path, analysis in future.result():
+                    results[path] = analysis
+                    if on_result:
+                        on_result(path, analysis)
             except Exception as e:
                 print(f"  Unexpected error: {e}")
     
+    print_cache_stats()
+    return results
+
+
+def analyze_images_pipelined(images: List[Path], engine: str, async_engine, max_workers: int,
+                             on_result: Optional[Callable[[str, Analysis], None]] = None) -> Dict[str, Analysis]:
+    """Analyze images through the process-pool preprocessing pipeline (see pipeline.py)"""
+    import threading
+
+    total = len(images)
+    owns_engine = False
+    if engine == 'async' and async_engine is None:
+        async_engine = create_async_engine()
+        owns_engine = async_engine is not None
+    if engine == 'async' and async_engine is not None:
+        print(f"Starting pipelined analysis of {total} images (engine=async, concurrency={async_engine.concurrency})...")
+    else:
+        async_engine = None
+        print(f"Starting pipelined analysis of {total} images (concurrency={max_workers})...")
+
+    counter_lock = threading.Lock()
+    counter = [0]
+
+    def on_start(img_path: Path) -> None:
+        with counter_lock:
+            counter[0] += 1
+            current = counter[0]
+        print(f"[{current}/{total}] Analyzing {img_path.name}...")
+
+    try:
+        results = run_pipeline(images, max_workers, async_engine=async_engine, on_start=on_start,
+                               on_result=on_result)
+    finally:
+        if owns_engine:
+            async_engine.close()
+    print_cache_stats()
     return results
 
+
+def print_pipeline_stats() -> None:
+    """Print stage utilization for the last pipelined analysis, if any"""
+    if not PIPELINE_AVAILABLE:
+        return
+    stats = pipeline_stats()
+    if not stats:
+        return
+    prep, api = stats['prepare'], stats['describe']
+    print(f"Pipeline: {stats['photos']} photos ({stats['cached']} cached) in {stats['wall_s']:.1f}s")
+    print(f"  prepare:  {prep['items']} photos on {prep['workers']} processes, "
+          f"{prep['utilization'] * 100:.0f}% busy ({prep['busy_s']:.1f}s)")
+    print(f"  describe: {api['items']} photos on {api['workers']} workers, "
+          f"{api['utilization'] * 100:.0f}% busy ({api['busy_s']:.1f}s)")
+    print(f"  queue: max depth {stats['queue_max_depth']}/{stats['queue_capacity']}, "
+          f"backpressure {stats['backpressure_s']:.1f}s, describe idle {stats['describe_starved_s']:.1f}s")
+
+
+def print_cache_stats() -> None:
+    """Print the vision cache hit/miss counters for this run"""
+    stats = cache_stats()
+    if stats:
+        print(f"Vision cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['entries']} entries, {stats['bytes'] / (1024 * 1024):.1f} MB)")
+    derived = derivative_stats()
+    if derived.get("hits") or derived.get("misses"):
+        print(f"Image derivatives: {derived['hits']} reused, {derived['misses']} built "
+              f"({derived['entries']} stored, {derived['bytes'] / (1024 * 1024):.1f} MB)")
+    passes = second_pass_stats()
+    if passes.get("first_passes"):
+        line = (f"Second pass: fired for {passes['fired']}/{passes['first_passes']} photos "
+                f"({100.0 * passes['fired'] / passes['first_passes']:.0f}%)")
+        if passes["speculated"]:
+            line += (f"; speculated {passes['speculated']} ({passes['speculation_used']} used, "
+                     f"{passes['speculation_cancelled']} cancelled, {passes['speculation_wasted']} sent "
+                     f"and dropped, {passes['speculation_failed']} failed), saved {passes['saved_s']:.1f}s")
+        print(line)
+    streamed = stream_stats()
+    if streamed.get("streamed"):
+        print(f"Streaming: {streamed['streamed']} requests, {streamed['stopped_early']} stopped early; "
+              f"first token p50 {streamed['ttft_p50_s']:.2f}s / p95 {streamed['ttft_p95_s']:.2f}s, "
+              f"total p50 {streamed['total_p50_s']:.2f}s / p95 {streamed['total_p95_s']:.2f}s")
+    for pass_name, up in upload_stats().items():
+        if not up["images"]:
+            continue
+        tiers = ", ".join(f"{count} {tier}" for tier, count in sorted(up["tiers"].items()))
+        print(f"Uploads ({pass_name}): {up['images']} images, {up['bytes'] / (1024 * 1024):.1f} MB "
+              f"({up['bytes'] / 1024 / up['images']:.0f} KB/image), ~{up['tokens']:,} image tokens "
+              f"({up['tokens'] / up['images']:.0f}/image) [{tiers}]"
+              + (f", {up['wasted']} wasted (~{up['tokens'] * up['wasted'] // up['images']:,} tokens)"
+                 if up.get("wasted") else ""))
+
+def print_quality_gate_summary(vision_results: Dict[str, Analysis]) -> None:
+    """Print how many photos the quality gate kept from the model, by reason"""
+    reasons: Dict[str, int] = {}
+    for analysis in vision_results.values():
+        reason = skip_reason(analysis)
+        if reason:
+            reasons[reason] = reasons.get(reason, 0) + 1
+    if reasons:
+        detail = ', '.join(f"{count} {reason}" for reason, count in sorted(reasons.items()))
+        print(f"Quality gate: {sum(reasons.values())} photos flagged and not analyzed ({detail})")
+
 # ============== PDF Report Generation ==============
 
 def generate_table_of_contents(c, sections: List[Tuple[str, int, int]], width: float, height: float, has_action_items: bool) -> None:
@@ -649,7 +917,504 @@ def generate_section_divider(c, location_name: str, photo_count: int, width: flo
     c.drawCentredString(width / 2, 30, f"Section {section_number} of {total_sections}")
 
 
-def generate_pdf(address: str, images: List[Path], out_pdf: Path, vision_results: Optional[Dict[str, str]] = None, client_name: str = "", inspection_type: str = "Quarterly", inspector_notes: List[Dict] = None) -> None:
+def render_photo_fragment(img_path: Path, analysis: Optional[Analysis], width: float, height: float) -> PhotoFragment:
+    """Render the position-independent body of a photo's page(s) into a PhotoFragment.
+
+    Header, footer and continuation headers depend on where the photo lands in
+    the report, so generate_pdf adds them when the fragment is placed.
+    """
+    with tracing.span("render photo", photo=img_path.name):
+        c = RecordingCanvas((width, height))
+
+        # Compressed, upright PDF JPEG (max 720px, 50% quality) keeps reports
+        # under 5MB for email. Usually already made during analysis from the
+        # same decode as the analysis copy; see image_prep.
+        # ReportLab reads the JPEG straight from memory and embeds it as is; no
+        # temp file round trip per page.
+        draw_photo_body(c, PhotoImage(pdf_jpeg(img_path)), analysis, width, height)
+        return PhotoFragment(c.pages)
+
+
+def photo_page_count(analysis: Optional[Analysis], width: float, height: float) -> int:
+    """Pages a photo takes (its first page plus any continuation pages); the photo's size doesn't matter."""
+    if not analysis or not (analysis.issues or analysis.note) or skip_reason(analysis):
+        return 1
+    return len(_analysis_column(analysis, width, height))
+
+
+def draw_photo_body(c, img, analysis: Optional[Analysis], width: float, height: float) -> None:
+    """Framed photo plus its badge or analysis column; overflowing text continues on new pages."""
+    from reportlab.lib.colors import HexColor
+
+    text_secondary = HexColor('#7f8c8d')     # Medium gray
+
+    # Get image dimensions
+    img_width, img_height = img.getSize()
+
+    # Layout constants
+    left_margin = 30
+    right_margin = 30
+    column_gap = 20
+    header_height = 50  # Space for top header
+    footer_height = 50  # Space for bottom footer
+
+    # Photos the quality gate kept from the model get the same layout with a flag
+    skipped_reason = skip_reason(analysis)
+
+    if not analysis or not (analysis.issues or analysis.note) or skipped_reason:
+        # === NO ISSUES LAYOUT ===
+        # Photo at top (centered, full width available), "NO ISSUES" badge at bottom
+
+        # Calculate photo sizing for full-width layout
+        usable_width = width - left_margin - right_margin
+        photo_max_height = height - header_height - footer_height - 100  # Leave room for badge
+
+        scale = min(usable_width / img_width, photo_max_height / img_height, 1.0)
+        draw_width = img_width * scale
+        draw_height = img_height * scale
+
+        # Center photo horizontally, position at top
+        photo_x = (width - draw_width) / 2
+        photo_y = height - header_height - 20 - draw_height
+
+        # Image frame with shadow effect
+        c.setFillColor(HexColor('#e0e0e0'))
+        c.rect(photo_x - 2, photo_y - 2, draw_width + 4, draw_height + 4, fill=1, stroke=0)
+
+        # White border around image
+        c.setFillColor(HexColor('#ffffff'))
+        c.setStrokeColor(HexColor('#d0d0d0'))
+        c.setLineWidth(1)
+        c.rect(photo_x - 5, photo_y - 5, draw_width + 10, draw_height + 10, fill=1, stroke=1)
+
+        # Draw image
+        c.drawImage(img, photo_x, photo_y, draw_width, draw_height, preserveAspectRatio=True)
+
+        badge_y = photo_y - 50
+        if skipped_reason:
+            # "NOT ANALYZED" flag with the quality gate's reason
+            badge_width = 180
+            badge_x = (width - badge_width) / 2
+            c.setFillColor(HexColor('#f59e0b'))
+            c.roundRect(badge_x, badge_y, badge_width, 35, 14, fill=1, stroke=0)
+            c.setFillColor(HexColor('#ffffff'))
+            c.setFont("Helvetica-Bold", 14)
+            c.drawCentredString(width / 2, badge_y + 12, "NOT ANALYZED")
+            c.setFillColor(text_secondary)
+            c.setFont("Helvetica", 10)
+            c.drawCentredString(width / 2, badge_y - 16,
+                                f"Photo quality: {skipped_reason}. Please review or retake.")
+        else:
+            # "NO ISSUES" badge centered below the photo
+            badge_width = 140
+            badge_x = (width - badge_width) / 2
+            c.setFillColor(HexColor('#10b981'))
+            c.roundRect(badge_x, badge_y, badge_width, 35, 14, fill=1, stroke=0)
+            c.setFillColor(HexColor('#ffffff'))
+            c.setFont("Helvetica-Bold", 14)
+            c.drawCentredString(width / 2, badge_y + 12, "NO ISSUES")
+
+    else:
+        # === SIDE-BY-SIDE LAYOUT (for photos WITH issues) ===
+        # Left side: Photo (55% of width)
+        # Right side: Analysis text (45% of width)
+
+        # Calculate column widths
+        usable_width = width - left_margin - right_margin - column_gap
+        photo_col_width = usable_width * 0.55
+        text_col_width = usable_width * 0.45
+
+        # Photo column boundaries
+        photo_x = left_margin
+        photo_max_height = height - header_height - footer_height - 20
+
+        # Calculate photo scaling to fit in left column
+        scale = min(photo_col_width / img_width, photo_max_height / img_height, 1.0)
+        draw_width = img_width * scale
+        draw_height = img_height * scale
+
+        # Align photo top with text start position
+        text_start_y = height - header_height - 20
+        photo_y = text_start_y - draw_height  # photo_y is bottom edge, so subtract height
+
+        # Image frame with shadow effect
+        c.setFillColor(HexColor('#e0e0e0'))
+        c.rect(photo_x - 2, photo_y - 2, draw_width + 4, draw_height + 4, fill=1, stroke=0)
+
+        # White border around image
+        c.setFillColor(HexColor('#ffffff'))
+        c.setStrokeColor(HexColor('#d0d0d0'))
+        c.setLineWidth(1)
+        c.rect(photo_x - 5, photo_y - 5, draw_width + 10, draw_height + 10, fill=1, stroke=1)
+
+        # Draw image
+        c.drawImage(img, photo_x, photo_y, draw_width, draw_height, preserveAspectRatio=True)
+
+        # === TEXT COLUMN (right side) ===
+        # Laid out once per analysis; photo_page_count reads the same pages
+        for page, ops in enumerate(_analysis_column(analysis, width, height)):
+            if page:
+                c.showPage()  # continuation pages are full-width text
+            replay_ops(c, ops)
+
+
+@functools.lru_cache(maxsize=ANALYSIS_COLUMN_CACHE)
+def _analysis_column(analysis: Analysis, width: float, height: float) -> Tuple[Tuple[Op, ...], ...]:
+    """
+    Recorded pages of a photo's analysis text: the right-hand column of its
+    first page, then full-width continuation pages. The text never depends on
+    the photo, so it is laid out once per analysis and shared by
+    draw_photo_body and photo_page_count.
+    """
+    from reportlab.lib.colors import HexColor
+
+    primary_color = HexColor('#1a1a2e')      # Deep navy
+    accent_color = HexColor('#e74c3c')       # Signature red
+
+    # Same layout constants as draw_photo_body
+    left_margin = 30
+    right_margin = 30
+    column_gap = 20
+    header_height = 50
+    footer_height = 50
+    usable_width = width - left_margin - right_margin - column_gap
+    photo_col_width = usable_width * 0.55
+    text_col_width = usable_width * 0.45
+    c = RecordingCanvas((width, height))
+
+    text_col_x = left_margin + photo_col_width + column_gap
+    text_col_right = text_col_x + text_col_width
+    text_y = height - header_height - 20  # Start below header
+    text_bottom = footer_height + 10  # Don't go below footer
+    # Draw subtle background for text area
+    c.setFillColor(HexColor('#f8f9fa'))
+    c.roundRect(text_col_x - 5, text_bottom, text_col_width + 10, text_y - text_bottom + 10, 6, fill=1, stroke=0)
+
+    # Left accent bar for text area
+    c.setFillColor(accent_color)
+    c.rect(text_col_x - 5, text_bottom, 3, text_y - text_bottom + 10, fill=1, stroke=0)
+
+    # Calculate max characters per line based on column width (approx 6pt per char at 10pt font)
+    max_chars_per_line = int(text_col_width / 6)
+
+    # Write analysis: location, free-text note, issues, then what to do
+    entries = []
+    if analysis.location:
+        entries.append(('header', 'Location:', analysis.location))
+    entries.extend(('text', line.strip(), None) for line in analysis.note.split('\n') if line.strip())
+    if analysis.issues:
+        entries.append(('header', 'Issues to Address:', None))
+        entries.extend(('bullet', issue.description, issue.priority) for issue in analysis.issues)
+    if analysis.actions:
+        entries.append(('header', 'What To Do:', None))
+        entries.extend(('bullet', action, None) for action in analysis.actions)
+
+    priority_colors = {'FIX NOW': HexColor('#dc2626'), 'FIX SOON': HexColor('#f59e0b')}
+
+    for kind, text, extra in entries:
+        if text_y < text_bottom:
+            # Need continuation page - create new page with full-width text
+            # (its header and footer are added when the fragment is placed)
+            c.showPage()
+
+            # On continuation page, use full width for text
+            text_col_x = 45
+            text_col_width = width - 90
+            max_chars_per_line = int(text_col_width / 6)
+            text_y = height - 80
+            text_bottom = 50
+
+        if kind == 'header':
+            header_content = extra
+            if text_y < height - header_height - 30:
+                text_y -= 6
+            if 'Issues' in text:
+                c.setFillColor(accent_color)
+            else:
+                c.setFillColor(primary_color)
+            c.setFont("Helvetica-Bold", 10)
+            c.drawString(text_col_x, text_y, text.upper())
+            text_y -= 16
+
+            if header_content:
+                c.setFillColor(HexColor('#374151'))
+                c.setFont("Helvetica", 9)
+                # Wrap header content
+                if len(header_content) > max_chars_per_line:
+                    words = header_content.split()
+                    current_line = ""
+                    for word in words:
+                        test_line = current_line + " " + word if current_line else word
+                        if len(test_line) > max_chars_per_line:
+                            c.drawString(text_col_x + 10, text_y, current_line)
+                            text_y -= 14
+                            current_line = word
+                        else:
+                            current_line = test_line
+                    if current_line:
+                        c.drawString(text_col_x + 10, text_y, current_line)
+                        text_y -= 14
+                else:
+                    c.drawString(text_col_x + 10, text_y, header_content)
+                    text_y -= 14
+
+        elif kind == 'bullet':
+            # Issues carry a priority label; actions are plain bullets
+            priority_label = extra or None
+            priority_color = priority_colors.get(extra, accent_color)
+
+            # Draw bullet
+            c.setFillColor(priority_color)
+            c.circle(text_col_x + 4, text_y + 2, 2.5, fill=1, stroke=0)
+
+            text_start_x = text_col_x + 12
+            if priority_label:
+                c.setFont("Helvetica-Bold", 7)
+                c.drawString(text_start_x, text_y, priority_label)
+                label_w = c.stringWidth(priority_label, "Helvetica-Bold", 7)
+                text_start_x += label_w + 4
+
+            c.setFillColor(HexColor('#374151'))
+            c.setFont("Helvetica", 9)
+
+            # Wrap bullet text
+            adjusted_max = max_chars_per_line - 5
+            if len(text) > adjusted_max:
+                words = text.split()
+                current_line = ""
+                first_line = True
+                for word in words:
+                    test_line = current_line + " " + word if current_line else word
+                    if len(test_line) > adjusted_max:
+                        c.drawString(text_start_x if first_line else text_col_x + 12, text_y, current_line)
+                        text_y -= 14
+                        current_line = word
+                        first_line = False
+                    else:
+                        current_line = test_line
+                if current_line:
+                    c.drawString(text_start_x if first_line else text_col_x + 12, text_y, current_line)
+                    text_y -= 14
+            else:
+                c.drawString(text_start_x, text_y, text)
+                text_y -= 14
+
+        else:
+            c.setFillColor(HexColor('#374151'))
+            c.setFont("Helvetica", 9)
+
+            if len(text) > max_chars_per_line:
+                words = text.split()
+                current_line = ""
+                for word in words:
+                    test_line = current_line + " " + word if current_line else word
+                    if len(test_line) > max_chars_per_line:
+                        c.drawString(text_col_x, text_y, current_line)
+                        text_y -= 14
+                        current_line = word
+                    else:
+                        current_line = test_line
+                if current_line:
+                    c.drawString(text_col_x, text_y, current_line)
+                    text_y -= 14
+            else:
+                c.drawString(text_col_x, text_y, text)
+                text_y -= 14
+
+    return tuple(tuple(ops) for ops in c.pages)
+
+
+def draw_photo_page_header(c, photo_number: int, total_photos: int, section_name: str,
+                           address: str, width: float, height: float) -> None:
+    """Header of a photo's first page: logo mark, photo counter and address."""
+    from reportlab.lib.colors import HexColor
+
+    primary_color = HexColor('#1a1a2e')
+    accent_color = HexColor('#e74c3c')
+    text_secondary = HexColor('#7f8c8d')
+
+    # EXECUTIVE PAGE HEADER - Minimal and sophisticated
+    # Thin top border
+    c.setStrokeColor(accent_color)
+    c.setLineWidth(2)
+    c.line(0, height - 30, width, height - 30)
+    
+    # Small logo mark (left side)
+    logo_size = 12
+    c.saveState()
+    c.translate(35, height - 18)
+    c.rotate(45)
+    c.setFillColor(primary_color)
+    c.rect(-logo_size/2, -logo_size/2, logo_size, logo_size, fill=1, stroke=0)
+    c.restoreState()
+    
+    # Mini window
+    c.setFillColor(HexColor('#ffffff'))
+    c.rect(32, height - 21, 3, 3, fill=1)
+    c.rect(36, height - 21, 3, 3, fill=1)
+    
+    # Check badge
+    c.setFillColor(accent_color)
+    c.circle(42, height - 22, 3, fill=1, stroke=0)
+    
+    # Page information - clean typography
+    c.setFont("Helvetica", 9)
+    c.setFillColor(text_secondary)
+    if section_name:
+        c.drawString(55, height - 22, f"Photo {photo_number} of {total_photos} \u2014 {section_name}")
+    else:
+        c.drawString(55, height - 22, f"Photo {photo_number} of {total_photos}")
+    
+    # Property address (right aligned)
+    c.setFont("Helvetica", 8)
+    c.drawRightString(width - 35, height - 22, address[:45])
+
+
+def draw_continuation_header(c, photo_number: int, width: float, height: float) -> None:
+    """Header on a continued analysis page."""
+    from reportlab.lib.colors import HexColor
+
+    c.setFillColor(HexColor('#1a1a2e'))
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(45, height - 50, f"Photo {photo_number} Analysis (continued)")
+    c.setStrokeColor(HexColor('#e74c3c'))
+    c.setLineWidth(2)
+    c.line(45, height - 55, width - 45, height - 55)
+
+
+def draw_photo_page_footer(c, width: float, continued: bool) -> None:
+    """Date and page number; pages followed by a continuation use the right-hand layout."""
+    from reportlab.lib.colors import HexColor
+
+    card_margin = 60
+    c.setFont("Helvetica", 8)
+    c.setFillColor(HexColor('#95a5a6'))
+    c.drawString(card_margin, 30, datetime.now().strftime('%Y-%m-%d'))
+    if continued:
+        c.setFillColor(HexColor('#7f8c8d'))
+        c.drawString(width - 100, 30, f"Page {c.getPageNumber()}")
+    else:
+        c.drawString(width / 2 - 20, 30, f"Page {c.getPageNumber()}")
+
+
+def place_photo_fragment(c, fragment: PhotoFragment, photo_number: int, total_photos: int,
+                         section_name: str, address: str, width: float, height: float) -> None:
+    """Replay a photo fragment onto the report canvas with its header and footers."""
+    last = fragment.page_count - 1
+    for page in range(fragment.page_count):
+        if page == 0:
+            draw_photo_page_header(c, photo_number, total_photos, section_name, address, width, height)
+        else:
+            draw_continuation_header(c, photo_number, width, height)
+        fragment.replay_page(c, page)
+        draw_photo_page_footer(c, width, continued=page < last)
+        c.showPage()
+
+
+class PhotoFragmentRenderer:
+    """
+    Renders photo page fragments on a background thread as analyses complete,
+    so most of the photo pages are ready by the time generate_pdf runs.
+
+    Pass submit as analyze_images' on_result callback. Near-duplicates that share
+    a representative's analysis are rendered when the representative's arrives.
+    Finished fragments wait in a FragmentSpill temp file, not in memory; take
+    loads one back when generate_pdf places it.
+    """
+
+    def __init__(self, duplicates: Optional[Dict[str, List[Path]]] = None,
+                 workers: int = RENDER_WORKERS, pagesize=letter):
+        import concurrent.futures
+        import threading
+
+        self.duplicates = duplicates or {}
+        self.width, self.height = pagesize
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers),
+                                                               thread_name_prefix="render")
+        self._futures: Dict[str, Tuple[Analysis, Any]] = {}
+        self._lock = threading.Lock()
+        self._spill = FragmentSpill()
+
+    def _render(self, img_path: Path, analysis: Analysis):
+        return self._spill.put(render_photo_fragment(img_path, analysis, self.width, self.height))
+
+    def submit(self, path_str: str, analysis: Analysis) -> None:
+        """Queue the photo (and its near-duplicates, with their shared copy) for rendering with this analysis."""
+        jobs = [(Path(path_str), analysis)]
+        duplicates = self.duplicates.get(path_str)
+        if duplicates:
+            shared = shared_analysis(analysis, Path(path_str))  # what expand_duplicate_results will give them
+            jobs.extend((img_path, shared) for img_path in duplicates)
+        with self._lock:
+            for img_path, img_analysis in jobs:
+                fut = self._executor.submit(self._render, img_path, img_analysis)
+                old = self._futures.get(str(img_path))
+                self._futures[str(img_path)] = (img_analysis, fut)
+                if old is not None:
+                    old[1].add_done_callback(_discard_fragment)
+
+    def has(self, img_path: Path) -> bool:
+        """Whether a fragment is rendered or being rendered for the photo."""
+        with self._lock:
+            return str(img_path) in self._futures
+
+    def take(self, img_path: Path, analysis: Optional[Analysis]) -> Optional[PhotoFragment]:
+        """Return the photo's fragment if it was rendered for this exact analysis, else None."""
+        spilled = self.take_spilled(img_path, analysis)
+        return spilled.load() if spilled is not None else None
+
+    def take_spilled(self, img_path: Path, analysis: Optional[Analysis]) -> Optional[SpilledFragment]:
+        """As take, but leave the fragment in the spill file (valid until close)."""
+        with self._lock:
+            entry = self._futures.pop(str(img_path), None)
+        if entry is None:
+            return None
+        rendered_for, fut = entry
+        if rendered_for != analysis:
+            fut.add_done_callback(_discard_fragment)
+            return None
+        try:
+            return fut.result()
+        except Exception as e:
+            print(f"  Pre-rendering {img_path.name} failed ({e}); rendering it now")
+            return None
+
+    def close(self) -> None:
+        """Stop rendering and release fragments that were never placed."""
+        with self._lock:
+            leftovers, self._futures = list(self._futures.values()), {}
+        for _, fut in leftovers:
+            fut.cancel()
+            fut.add_done_callback(_discard_fragment)
+        self._executor.shutdown(wait=True)
+        self._spill.close()
+
+
+def _discard_fragment(fut) -> None:
+    if not fut.cancelled() and fut.exception() is None:
+        fut.result().cleanup()
+
+
+def _content_digest(path: Path) -> Optional[str]:
+    return digests.digest(path)[0]
+
+
+def result_store(vision_results: Optional[Dict[str, Analysis]]) -> InspectionResultStore:
+    """vision_results as an indexed InspectionResultStore (returned as is if it already is one)."""
+    if isinstance(vision_results, InspectionResultStore):
+        return vision_results
+    return InspectionResultStore(vision_results, normalize=normalize_location, digest_of=_content_digest)
+
+
+def lookup_analysis(vision_results: Optional[Dict[str, Analysis]], img_path: Path) -> Optional[Analysis]:
+    """Find a photo's analysis by full path, content or file name."""
+    if not vision_results:
+        return None
+    return result_store(vision_results).lookup(img_path)
+
+
+@tracing.traced()
+def generate_pdf(address: str, images: List[Path], out_pdf: Path, vision_results: Optional[Dict[str, Analysis]] = None, client_name: str = "", inspection_type: str = "Quarterly", inspector_notes: List[Dict] = None, fragments: Optional["PhotoFragmentRenderer"] = None) -> None:
     """Generate executive-quality PDF report with sophisticated design
 
     Args:
@@ -660,14 +1425,30 @@ def generate_pdf(address: str, images: List[Path], out_pdf: Path, vision_results
         client_name: Client name for report
         inspection_type: Type of inspection
         inspector_notes: List of inspector notes
+        fragments: Renderer holding photo pages pre-rendered while analysis ran
     """
     if inspector_notes is None:
         inspector_notes = []
-    from PIL import Image as PILImage, ImageOps
     from reportlab.lib.colors import HexColor
 
+    # Accept legacy text values too; parsing and indexing happen once here, not per page
+    if vision_results:
+        vision_results = result_store({path: parse_analysis(value) for path, value in vision_results.items()})
+    if vision_results and ACTION_ITEMS_AVAILABLE:
+        issues = parse_issues_from_vision_results(vision_results)
+    else:
+        issues = {'tenant': [], 'owner': []}
+
     c = canvas.Canvas(str(out_pdf), pagesize=letter)
     width, height = letter
+
+    # One trace span per page (or per photo's pages), measured from the previous one
+    page_started = [time.perf_counter()]
+
+    def page_done(name: str, page: Optional[int] = None, **args) -> None:
+        now = time.perf_counter()
+        tracing.complete(name, page_started[0], now - page_started[0], page=page or c.getPageNumber(), **args)
+        page_started[0] = now
     
     # Executive color palette - sophisticated and professional
     primary_color = HexColor('#1a1a2e')      # Deep navy
@@ -934,7 +1715,6 @@ def generate_pdf(address: str, images: List[Path], out_pdf: Path, vision_results
 
     # Executive Summary - Issues found
     if vision_results and ACTION_ITEMS_AVAILABLE:
-        issues = parse_issues_from_vision_results(vision_results)
         tenant_count = len(issues.get('tenant', []))
         owner_count = len(issues.get('owner', []))
         total_issues = tenant_count + owner_count
@@ -975,11 +1755,16 @@ def generate_pdf(address: str, images: List[Path], out_pdf: Path, vision_results
     c.drawString(card_margin, 40, "Confidential Property Inspection Report")
     c.drawRightString(width - card_margin, 40, datetime.now().strftime('%Y-%m-%d'))
     
+    page_done("cover page")
     c.showPage()
 
     # === GROUP IMAGES BY LOCATION (needed for page number calculation) ===
     grouped_images = group_images_by_location(images, vision_results)
     use_grouping = vision_results and len(grouped_images) > 1
+    # Photos whose analysis overflows onto continuation pages push later page numbers back
+    photo_pages = ({str(p): photo_page_count(lookup_analysis(vision_results, p), width, height) for p in images}
+                   if vision_results else {})
+    page_started[0] = time.perf_counter()
 
     # === ACTION ITEMS PAGE (2nd page, after cover) ===
     has_action_items_page = False
@@ -988,16 +1773,17 @@ def generate_pdf(address: str, images: List[Path], out_pdf: Path, vision_results
         print(f"[DEBUG] Inspector notes: {inspector_notes}")
     if ACTION_ITEMS_AVAILABLE:
         try:
-            # Parse issues from vision results (separates tenant vs owner)
-            issues = parse_issues_from_vision_results(vision_results) if vision_results else {'tenant': [], 'owner': []}
             tenant_count = len(issues.get('tenant', []))
             owner_count = len(issues.get('owner', []))
             notes_count = len(inspector_notes)
 
             if tenant_count > 0 or owner_count > 0 or notes_count > 0:
                 # Calculate image page map so action items can show page references
-                image_page_map = calculate_image_page_map(grouped_images, True)  # True = will have action items page
+                image_page_map = calculate_image_page_map(grouped_images, True,  # True = will have action items page
+                                                          vision_results or None, photo_pages,
+                                                          sections=bool(use_grouping))
                 generate_action_items_page(c, issues, width, height, inspector_notes, image_page_map)
+                page_done("action items page")
                 c.showPage()
                 has_action_items_page = True
                 print(f"Action items page added ({tenant_count} tenant, {owner_count} owner items, {notes_count} inspector notes)")
@@ -1009,8 +1795,9 @@ def generate_pdf(address: str, images: List[Path], out_pdf: Path, vision_results
             traceback.print_exc()
 
     if use_grouping:
-        toc_sections = calculate_page_layout(grouped_images, has_action_items_page)
+        toc_sections = calculate_page_layout(grouped_images, has_action_items_page, photo_pages)
         generate_table_of_contents(c, toc_sections, width, height, has_action_items_page)
+        page_done("table of contents")
         c.showPage()
         print(f"Table of contents added ({len(grouped_images)} sections)")
 
@@ -1030,404 +1817,108 @@ def generate_pdf(address: str, images: List[Path], out_pdf: Path, vision_results
     total_photos = len(ordered_images)
     current_section_name = ""
 
+    # Many rooms, mostly not pre-rendered: draw each section in its own process at its
+    # planned pages and merge them in order
+    prerendered_count = sum(1 for p in ordered_images if fragments is not None and fragments.has(p))
+    if (use_grouping and SECTIONS_AVAILABLE
+            and should_render_sections(len(grouped_images), total_photos, prerendered_count)):
+        # Pre-rendered pages go to the workers as spill file locations and in-memory PDF JPEGs
+        # as bytes. No prefetcher: the workers compress the remaining photos themselves.
+        jobs, first_photo, reused = [], 1, 0
+        for sec_idx, ((sec_name, section_images), (_, _, start_page)) in enumerate(
+                zip(grouped_images, toc_sections), 1):
+            photos, spilled, jpegs = [], {}, {}
+            for p in section_images:
+                analysis = lookup_analysis(vision_results, p)
+                photos.append((str(p), analysis))
+                fragment = fragments.take_spilled(p, analysis) if fragments is not None else None
+                if fragment is not None:
+                    spilled[str(p)] = fragment.location
+                elif pdf_in_memory(p):
+                    jpegs[str(p)] = pdf_jpeg(p)
+            reused += len(spilled)
+            jobs.append(SectionJob(sec_idx, len(grouped_images), sec_name, start_page, first_photo,
+                                   photos, spilled, jpegs))
+            first_photo += len(section_images)
+        with tracing.span("write pdf", pages=c.getPageNumber() - 1):
+            c.save()
+        sections_started = time.perf_counter()
+        appended = render_sections(out_pdf, jobs, total_photos, address, (width, height), on_page=page_done)
+        sections_s = time.perf_counter() - sections_started
+        if sections_s > 0:
+            print(f"Section pages: {appended / sections_s:.1f} pages/sec "
+                  f"({len(jobs)} sections in {min(PDF_SECTION_PROCESSES, len(jobs))} processes)")
+        if fragments is not None:
+            print(f"Photo pages: {reused} of {total_photos} pre-rendered during analysis")
+        print(f"PDF generated: {out_pdf}")
+        return
+
+    # Compress photos that are neither pre-rendered nor in memory a few pages ahead, in other processes
+    prefetch = None
+    if PREFETCH_AVAILABLE:
+        todo = [p for p in ordered_images
+                if not (fragments is not None and fragments.has(p)) and not pdf_in_memory(p)]
+        if should_prefetch(len(todo)):
+            prefetch = PdfPrefetcher(todo)
+
     # Add each image with analysis
-    for i, img_path in enumerate(ordered_images, 1):
-        # Insert section divider before first photo in each group
-        if (i - 1) in section_breaks:
-            sec_name, sec_count, sec_idx, sec_total = section_breaks[i - 1]
-            current_section_name = sec_name
-            generate_section_divider(c, sec_name, sec_count, width, height, sec_idx, sec_total)
-            c.showPage()
+    reused = 0
+    photos_started, pages_before = time.perf_counter(), c.getPageNumber()
+    try:
+        for i, img_path in enumerate(ordered_images, 1):
+            # Insert section divider before first photo in each group
+            if (i - 1) in section_breaks:
+                sec_name, sec_count, sec_idx, sec_total = section_breaks[i - 1]
+                current_section_name = sec_name
+                generate_section_divider(c, sec_name, sec_count, width, height, sec_idx, sec_total)
+                page_done("section divider", section=sec_name)
+                c.showPage()
 
-        try:
-            # Compress image for smaller PDF size
-            with PILImage.open(img_path) as pil_img:
-                # IMPORTANT: Auto-rotate image based on EXIF orientation
-                # This ensures the image appears upright in the PDF
-                try:
-                    # Use ImageOps.exif_transpose to automatically handle EXIF orientation
-                    pil_img = ImageOps.exif_transpose(pil_img)
-                except Exception:
-                    # If EXIF handling fails, try manual rotation based on orientation tag
-                    try:
-                        exif = pil_img._getexif()
-                        if exif:
-                            orientation = exif.get(0x0112)  # Orientation tag
-                            if orientation:
-                                rotations = {
-                                    3: PILImage.Transpose.ROTATE_180,
-                                    6: PILImage.Transpose.ROTATE_270,
-                                    8: PILImage.Transpose.ROTATE_90
-                                }
-                                if orientation in rotations:
-                                    pil_img = pil_img.transpose(rotations[orientation])
-                    except (AttributeError, KeyError):
-                        pass  # No EXIF data or orientation info
-                
-                # Convert to RGB if necessary (after rotation)
-                if pil_img.mode in ('RGBA', 'P'):
-                    pil_img = pil_img.convert('RGB')
-
-                # Compress images for email-friendly PDF size (max 720px, 50% quality)
-                # This keeps reports under 5MB for easy email delivery
-                max_dim = max(pil_img.size)
-                if max_dim > 720:
-                    scale = 720 / max_dim
-                    new_size = (int(pil_img.width * scale), int(pil_img.height * scale))
-                    pil_img = pil_img.resize(new_size, PILImage.Resampling.LANCZOS)
-
-                # Save to temporary JPEG with higher compression for smaller file size
-                import tempfile
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                    pil_img.save(tmp.name, 'JPEG', quality=50, optimize=True)
-                    compressed_path = tmp.name
-            
-            # EXECUTIVE PAGE HEADER - Minimal and sophisticated
-            # Thin top border
-            c.setStrokeColor(accent_color)
-            c.setLineWidth(2)
-            c.line(0, height - 30, width, height - 30)
-            
-            # Small logo mark (left side)
-            logo_size = 12
-            c.saveState()
-            c.translate(35, height - 18)
-            c.rotate(45)
-            c.setFillColor(primary_color)
-            c.rect(-logo_size/2, -logo_size/2, logo_size, logo_size, fill=1, stroke=0)
-            c.restoreState()
-            
-            # Mini window
-            c.setFillColor(HexColor('#ffffff'))
-            c.rect(32, height - 21, 3, 3, fill=1)
-            c.rect(36, height - 21, 3, 3, fill=1)
-            
-            # Check badge
-            c.setFillColor(accent_color)
-            c.circle(42, height - 22, 3, fill=1, stroke=0)
-            
-            # Page information - clean typography
-            c.setFont("Helvetica", 9)
-            c.setFillColor(text_secondary)
-            if use_grouping and current_section_name:
-                c.drawString(55, height - 22, f"Photo {i} of {total_photos} \u2014 {current_section_name}")
-            else:
-                c.drawString(55, height - 22, f"Photo {i} of {total_photos}")
-            
-            # Property address (right aligned)
-            c.setFont("Helvetica", 8)
-            c.drawRightString(width - 35, height - 22, address[:45])
-            
-            # Get image dimensions
-            img = ImageReader(compressed_path)
-            img_width, img_height = img.getSize()
-
-            # Layout constants
-            left_margin = 30
-            right_margin = 30
-            column_gap = 20
-            header_height = 50  # Space for top header
-            footer_height = 50  # Space for bottom footer
-
-            # Get analysis text FIRST to determine layout
-            analysis = None
-            if vision_results:
-                img_path_str = str(img_path)
-                if img_path_str in vision_results:
-                    analysis = vision_results[img_path_str]
+            fragment = None
+            try:
+                analysis = lookup_analysis(vision_results, img_path)
+                # Use the page pre-rendered while analysis was running, if it matches
+                if fragments is not None:
+                    fragment = fragments.take(img_path, analysis)
+                prerendered = fragment is not None
+                if prerendered:
+                    reused += 1
                 else:
-                    for key, value in vision_results.items():
-                        if Path(key).name == img_path.name:
-                            analysis = value
-                            break
-
-            # Check if there are no issues
-            no_issues_phrases = ['no repairs needed', 'no issues', 'no damage', 'good condition',
-                                 'no action needed', 'no repairs necessary', 'nothing to report']
-            has_issues = True
-            if analysis:
-                analysis_lower = analysis.lower()
-                if any(phrase in analysis_lower for phrase in no_issues_phrases):
-                    issue_lines = [l for l in analysis.split('\n') if l.strip().startswith('-')
-                                  and not any(phrase in l.lower() for phrase in no_issues_phrases)]
-                    if not issue_lines:
-                        has_issues = False
-
-            if not analysis or not has_issues:
-                # === NO ISSUES LAYOUT ===
-                # Photo at top (centered, full width available), "NO ISSUES" badge at bottom
-
-                # Calculate photo sizing for full-width layout
-                usable_width = width - left_margin - right_margin
-                photo_max_height = height - header_height - footer_height - 100  # Leave room for badge
-
-                scale = min(usable_width / img_width, photo_max_height / img_height, 1.0)
-                draw_width = img_width * scale
-                draw_height = img_height * scale
-
-                # Center photo horizontally, position at top
-                photo_x = (width - draw_width) / 2
-                photo_y = height - header_height - 20 - draw_height
-
-                # Image frame with shadow effect
-                c.setFillColor(HexColor('#e0e0e0'))
-                c.rect(photo_x - 2, photo_y - 2, draw_width + 4, draw_height + 4, fill=1, stroke=0)
-
-                # White border around image
-                c.setFillColor(HexColor('#ffffff'))
-                c.setStrokeColor(HexColor('#d0d0d0'))
-                c.setLineWidth(1)
-                c.rect(photo_x - 5, photo_y - 5, draw_width + 10, draw_height + 10, fill=1, stroke=1)
-
-                # Draw image
-                c.drawImage(img, photo_x, photo_y, draw_width, draw_height, preserveAspectRatio=True)
-
-                # Clean up temp file
-                os.unlink(compressed_path)
-
-                # "NO ISSUES" badge centered below the photo
-                badge_y = photo_y - 50
-                badge_width = 140
-                badge_x = (width - badge_width) / 2
-                c.setFillColor(HexColor('#10b981'))
-                c.roundRect(badge_x, badge_y, badge_width, 35, 14, fill=1, stroke=0)
-                c.setFillColor(HexColor('#ffffff'))
-                c.setFont("Helvetica-Bold", 14)
-                c.drawCentredString(width / 2, badge_y + 12, "NO ISSUES")
-
-            else:
-                # === SIDE-BY-SIDE LAYOUT (for photos WITH issues) ===
-                # Left side: Photo (55% of width)
-                # Right side: Analysis text (45% of width)
-
-                # Calculate column widths
-                usable_width = width - left_margin - right_margin - column_gap
-                photo_col_width = usable_width * 0.55
-                text_col_width = usable_width * 0.45
-
-                # Photo column boundaries
-                photo_x = left_margin
-                photo_max_height = height - header_height - footer_height - 20
-
-                # Calculate photo scaling to fit in left column
-                scale = min(photo_col_width / img_width, photo_max_height / img_height, 1.0)
-                draw_width = img_width * scale
-                draw_height = img_height * scale
-
-                # Align photo top with text start position
-                text_start_y = height - header_height - 20
-                photo_y = text_start_y - draw_height  # photo_y is bottom edge, so subtract height
-
-                # Image frame with shadow effect
-                c.setFillColor(HexColor('#e0e0e0'))
-                c.rect(photo_x - 2, photo_y - 2, draw_width + 4, draw_height + 4, fill=1, stroke=0)
-
-                # White border around image
-                c.setFillColor(HexColor('#ffffff'))
-                c.setStrokeColor(HexColor('#d0d0d0'))
-                c.setLineWidth(1)
-                c.rect(photo_x - 5, photo_y - 5, draw_width + 10, draw_height + 10, fill=1, stroke=1)
-
-                # Draw image
-                c.drawImage(img, photo_x, photo_y, draw_width, draw_height, preserveAspectRatio=True)
-
-                # Clean up temp file
-                os.unlink(compressed_path)
-
-                # === TEXT COLUMN (right side) ===
-                text_col_x = left_margin + photo_col_width + column_gap
-                text_col_right = text_col_x + text_col_width
-                text_y = height - header_height - 20  # Start below header
-                text_bottom = footer_height + 10  # Don't go below footer
-                # Draw subtle background for text area
-                c.setFillColor(HexColor('#f8f9fa'))
-                c.roundRect(text_col_x - 5, text_bottom, text_col_width + 10, text_y - text_bottom + 10, 6, fill=1, stroke=0)
-
-                # Left accent bar for text area
-                c.setFillColor(accent_color)
-                c.rect(text_col_x - 5, text_bottom, 3, text_y - text_bottom + 10, fill=1, stroke=0)
-
-                # Calculate max characters per line based on column width (approx 6pt per char at 10pt font)
-                max_chars_per_line = int(text_col_width / 6)
-
-                # Write analysis text
-                lines = analysis.split('\n')
-                for line in lines:
-                    if text_y < text_bottom:
-                        # Need continuation page - create new page with full-width text
-                        c.setFont("Helvetica", 8)
-                        c.setFillColor(text_light)
-                        c.drawString(card_margin, 30, datetime.now().strftime('%Y-%m-%d'))
-                        c.setFillColor(text_secondary)
-                        c.drawString(width - 100, 30, f"Page {c.getPageNumber()}")
-                        c.showPage()
-
-                        # Header on continued page
-                        c.setFillColor(primary_color)
-                        c.setFont("Helvetica-Bold", 14)
-                        c.drawString(45, height - 50, f"Photo {i} Analysis (continued)")
-                        c.setStrokeColor(accent_color)
-                        c.setLineWidth(2)
-                        c.line(45, height - 55, width - 45, height - 55)
-
-                        # On continuation page, use full width for text
-                        text_col_x = 45
-                        text_col_width = width - 90
-                        max_chars_per_line = int(text_col_width / 6)
-                        text_y = height - 80
-                        text_bottom = 50
-
-                    line_stripped = line.strip()
-
-                    # Skip certain sections
-                    if any(skip in line_stripped for skip in ['What I See:', 'Observations:']):
-                        continue
-
-                    # Section headers
-                    section_headers = ['Location:', 'Issues to Address:', 'Recommended Action:',
-                                     'Potential Issues:', 'Recommendations:', 'What To Do:']
-                    found_header = None
-                    header_content = None
-                    for header in section_headers:
-                        if header in line_stripped:
-                            found_header = header
-                            parts = line_stripped.split(header, 1)
-                            if len(parts) > 1 and parts[1].strip():
-                                header_content = parts[1].strip()
-                            break
-
-                    if found_header:
-                        if text_y < height - header_height - 30:
-                            text_y -= 6
-                        if 'Issues' in found_header:
-                            c.setFillColor(accent_color)
-                        else:
-                            c.setFillColor(primary_color)
-                        c.setFont("Helvetica-Bold", 10)
-                        c.drawString(text_col_x, text_y, found_header.upper())
-                        text_y -= 16
-
-                        if header_content:
-                            c.setFillColor(HexColor('#374151'))
-                            c.setFont("Helvetica", 9)
-                            # Wrap header content
-                            if len(header_content) > max_chars_per_line:
-                                words = header_content.split()
-                                current_line = ""
-                                for word in words:
-                                    test_line = current_line + " " + word if current_line else word
-                                    if len(test_line) > max_chars_per_line:
-                                        c.drawString(text_col_x + 10, text_y, current_line)
-                                        text_y -= 14
-                                        current_line = word
-                                    else:
-                                        current_line = test_line
-                                if current_line:
-                                    c.drawString(text_col_x + 10, text_y, current_line)
-                                    text_y -= 14
-                            else:
-                                c.drawString(text_col_x + 10, text_y, header_content)
-                                text_y -= 14
-
-                    elif line.strip().startswith('-'):
-                        text = line.strip()[1:].strip()
-
-                        # Check for priority/responsibility tags
-                        priority_color = accent_color
-                        priority_label = None
-
-                        # Handle new format tags
-                        for tag, color, label in [
-                            ('[FIX NOW]', HexColor('#dc2626'), 'FIX NOW'),
-                            ('[FIX SOON]', HexColor('#f59e0b'), 'FIX SOON'),
-                            ('[IMMEDIATE]', HexColor('#dc2626'), 'URGENT'),
-                            ('[SOON]', HexColor('#f59e0b'), 'SOON'),
-                            ('[OWNER]', HexColor('#10b981'), 'OWNER'),
-                            ('[TENANT]', HexColor('#3b82f6'), 'TENANT'),
-                        ]:
-                            if tag in text:
-                                if 'FIX' in tag or 'IMMEDIATE' in tag or 'SOON' == tag:
-                                    priority_color = color
-                                    priority_label = label
-                                text = text.replace(tag, '').strip()
-
-                        # Draw bullet
-                        c.setFillColor(priority_color)
-                        c.circle(text_col_x + 4, text_y + 2, 2.5, fill=1, stroke=0)
-
-                        text_start_x = text_col_x + 12
-                        if priority_label:
-                            c.setFont("Helvetica-Bold", 7)
-                            c.drawString(text_start_x, text_y, priority_label)
-                            label_w = c.stringWidth(priority_label, "Helvetica-Bold", 7)
-                            text_start_x += label_w + 4
-
-                        c.setFillColor(HexColor('#374151'))
-                        c.setFont("Helvetica", 9)
-
-                        # Wrap bullet text
-                        adjusted_max = max_chars_per_line - 5
-                        if len(text) > adjusted_max:
-                            words = text.split()
-                            current_line = ""
-                            first_line = True
-                            for word in words:
-                                test_line = current_line + " " + word if current_line else word
-                                if len(test_line) > adjusted_max:
-                                    c.drawString(text_start_x if first_line else text_col_x + 12, text_y, current_line)
-                                    text_y -= 14
-                                    current_line = word
-                                    first_line = False
-                                else:
-                                    current_line = test_line
-                            if current_line:
-                                c.drawString(text_start_x if first_line else text_col_x + 12, text_y, current_line)
-                                text_y -= 14
-                        else:
-                            c.drawString(text_start_x, text_y, text)
-                            text_y -= 14
-
-                    elif line.strip():
-                        c.setFillColor(HexColor('#374151'))
-                        c.setFont("Helvetica", 9)
-                        text = line.strip()
-
-                        if len(text) > max_chars_per_line:
-                            words = text.split()
-                            current_line = ""
-                            for word in words:
-                                test_line = current_line + " " + word if current_line else word
-                                if len(test_line) > max_chars_per_line:
-                                    c.drawString(text_col_x, text_y, current_line)
-                                    text_y -= 14
-                                    current_line = word
-                                else:
-                                    current_line = test_line
-                            if current_line:
-                                c.drawString(text_col_x, text_y, current_line)
-                                text_y -= 14
-                        else:
-                            c.drawString(text_col_x, text_y, text)
-                            text_y -= 14
+                    if prefetch is not None:
+                        prefetch.take(img_path)
+                    fragment = render_photo_fragment(img_path, analysis, width, height)
+                section_label = current_section_name if use_grouping else ""
+                first_page = c.getPageNumber()
+                place_photo_fragment(c, fragment, i, total_photos, section_label, address, width, height)
+                page_done("photo page", page=first_page, photo=img_path.name, pages=fragment.page_count,
+                          prerendered=prerendered)
             
-            # Page number and timestamp
-            c.setFont("Helvetica", 8)
-            c.setFillColor(text_light)
-            c.drawString(card_margin, 30, datetime.now().strftime('%Y-%m-%d'))
-            c.drawString(width / 2 - 20, 30, f"Page {c.getPageNumber()}")
-
-            c.showPage()
-            
-        except Exception as e:
-            print(f"ERROR adding {img_path.name} to PDF: {e}")
-            import traceback
-            traceback.print_exc()
-            continue
-
-    c.save()
+            except Exception as e:
+                print(f"ERROR adding {img_path.name} to PDF: {e}")
+                import traceback
+                traceback.print_exc()
+                continue
+            finally:
+                if fragment is not None:
+                    fragment.cleanup()
+    finally:
+        if prefetch is not None:
+            prefetch.close()
+
+    photos_s = time.perf_counter() - photos_started
+    if fragments is not None:
+        print(f"Photo pages: {reused} of {total_photos} pre-rendered during analysis")
+    if total_photos and photos_s > 0:
+        mode = (f"prefetch on, {prefetch.prefetched} compressed ahead, waited {prefetch.waited_s:.1f}s"
+                if prefetch is not None else "prefetch off")
+        print(f"Photo pages: {(c.getPageNumber() - pages_before) / photos_s:.1f} pages/sec ({mode})")
+
+    with tracing.span("write pdf", pages=c.getPageNumber() - 1):
+        c.save()
     print(f"PDF generated: {out_pdf}")
 
-def build_reports(source_path: Path, client_name: str, property_address: str, gallery_name: str = None, inspection_type: str = "Quarterly", inspector_notes: List[Dict] = None) -> Dict[str, Any]:
+@tracing.traced()
+def build_reports(source_path: Path, client_name: str, property_address: str, gallery_name: str = None, inspection_type: str = "Quarterly", inspector_notes: List[Dict] = None, engine: Optional[str] = None, job: Optional["JobJournal"] = None) -> Dict[str, Any]:
     """
     Main function to build inspection reports from source (ZIP or directory)
     Returns artifacts dictionary with path to generated PDF
@@ -1439,6 +1930,8 @@ def build_reports(source_path: Path, client_name: str, property_address: str, ga
         gallery_name: Optional gallery name
         inspection_type: Type of inspection (Quarterly, Move-In, Move-Out, Annual)
         inspector_notes: List of inspector notes (text, responsibility, priority)
+        engine: Analysis engine, "threads" or "async" (defaults to ANALYSIS_ENGINE)
+        job: Journal to record progress in; a replayed one (--resume) skips finished work
     """
     if inspector_notes is None:
         inspector_notes = []
@@ -1446,6 +1939,8 @@ def build_reports(source_path: Path, client_name: str, property_address: str, ga
     if inspector_notes:
         print(f"[DEBUG] Received {len(inspector_notes)} inspector notes")
 
+    engine = (engine or ANALYSIS_ENGINE).lower()
+
     try:
         print(f"\n{'='*60}")
         print(f"Building report for: {property_address}")
@@ -1456,24 +1951,84 @@ def build_reports(source_path: Path, client_name: str, property_address: str, ga
         print("Building report...")
         print("="*60 + "\n")
 
-    # Extract if ZIP, otherwise use as directory
-    if source_path.suffix.lower() == '.zip':
-        photos_dir = extract_zip(source_path)
-        cleanup_needed = True
-    else:
-        photos_dir = source_path
-        cleanup_needed = False
+    # Start the async engine first so its connections warm up while we extract and scan
+    async_engine = create_async_engine() if engine == 'async' else None
 
+    # Extract if ZIP, otherwise use as directory
+    cleanup_needed = False
+    succeeded = False
+    photos_dir = source_path
+    fragments = None
     try:
+        images = None
+        if source_path.suffix.lower() == '.zip':
+            reused_dir = job.extracted_dir() if job else None
+            if reused_dir is not None:
+                photos_dir = reused_dir
+                print(f"Reusing photos extracted before: {photos_dir}")
+            elif ZIP_STREAMING:
+                ingest_dir = Path(tempfile.mkdtemp(prefix="inspection_"))
+                try:
+                    photos_dir, images = ingest_zip(source_path, ingest_dir)
+                except BaseException:
+                    # Nothing journaled yet, and a partial ingest is no use to --resume
+                    shutil.rmtree(ingest_dir, ignore_errors=True)
+                    raise
+                if job:
+                    job.note_extracted(photos_dir)
+            else:
+                photos_dir = extract_zip(source_path)
+                if job:
+                    job.note_extracted(photos_dir)
+            cleanup_needed = True
+
         # Collect and analyze images
-        images = collect_images(photos_dir)
+        if images is None:
+            images = collect_images(photos_dir)
         if not images:
             raise ValueError(f"No images found in {photos_dir}")
 
         print(f"Found {len(images)} images to process")
 
+        # Collapse near-duplicate burst shots so each cluster costs one analysis
+        analysis_images, duplicates = images, {}
+        if DEDUPE_AVAILABLE:
+            with tracing.span("collapse_near_duplicates", photos=len(images)):
+                analysis_images, duplicates = collapse_near_duplicates(images)
+            skipped = len(images) - len(analysis_images)
+            if skipped:
+                print(f"Near-duplicates: {skipped} photos share analyses with {len(duplicates)} "
+                      f"representatives (saved {skipped}+ API calls; noted on their pages)")
+
+        # Render photo pages in the background as their analyses arrive
+        if INCREMENTAL_RENDER:
+            fragments = PhotoFragmentRenderer(duplicates)
+
+        # Photos a resumed job already has answers for skip the model
+        vision_results = job.completed_analyses(photos_dir, analysis_images) if job else {}
+        if vision_results:
+            print(f"Resuming job {job.job_id}: {len(vision_results)} of {len(analysis_images)} "
+                  f"analyses taken from the journal")
+            if fragments:
+                for path_str, analysis in vision_results.items():
+                    fragments.submit(path_str, analysis)
+        remaining = [p for p in analysis_images if str(p) not in vision_results]
+
+        def on_result(path_str: str, analysis: Analysis) -> None:
+            if job:
+                job.note_analysis(photos_dir, Path(path_str), analysis)
+            if fragments:
+                fragments.submit(path_str, analysis)
+
         # Analyze images with vision AI
-        vision_results = analyze_images(images)
+        if PIPELINE_AVAILABLE:
+            reset_pipeline_stats()
+        if remaining:
+            vision_results.update(analyze_images(remaining, engine=engine, async_engine=async_engine,
+                                                 on_result=on_result))
+        if duplicates:
+            vision_results = expand_duplicate_results(vision_results, duplicates)
+        print_quality_gate_summary(vision_results)
 
         # Generate report ID
         report_id = secrets.token_hex(16)
@@ -1488,14 +2043,19 @@ def build_reports(source_path: Path, client_name: str, property_address: str, ga
 
         # Generate PDF report directly in outputs folder
         try:
-            generate_pdf(property_address, images, pdf_path, vision_results, client_name, inspection_type, inspector_notes)
+            generate_pdf(property_address, images, pdf_path, vision_results, client_name, inspection_type, inspector_notes,
+                         fragments=fragments)
             print(f"\nPDF report saved: {pdf_path}")
+            print_pipeline_stats()
+            if job:
+                job.note_done(pdf_path, report_id)
         except Exception as e:
             print(f"ERROR generating PDF: {e}")
             import traceback
             traceback.print_exc()
             raise
 
+        succeeded = True
         return {
             'report_id': report_id,
             'pdf_path': str(pdf_path),
@@ -1504,8 +2064,16 @@ def build_reports(source_path: Path, client_name: str, property_address: str, ga
         }
 
     finally:
-        # Clean up temporary extraction directory
-        if cleanup_needed and photos_dir.exists():
+        if async_engine is not None:
+            async_engine.close()
+        if fragments is not None:
+            fragments.close()
+        if job:
+            job.flush()  # analyses still queued for the journal reach the disk
+        # Clean up temporary extraction directory (a failed job keeps it for --resume)
+        if cleanup_needed and job and not succeeded and photos_dir.exists():
+            print(f"Keeping extracted photos for --resume {job.job_id}: {photos_dir}")
+        elif cleanup_needed and photos_dir.exists():
             try:
                 shutil.rmtree(photos_dir)
             except Exception as e:
@@ -1526,8 +2094,26 @@ def main():
                         help='Inspection type (Quarterly, Move-In, Move-Out, Annual)')
     parser.add_argument('--notes', type=str, default='[]',
                         help='JSON array of inspector notes')
+    parser.add_argument('--engine', type=str, choices=ANALYSIS_ENGINES, default=ANALYSIS_ENGINE,
+                        help='Vision analysis engine (threads or async)')
+    parser.add_argument('--trace', type=str, nargs='?', const='trace.json', default=None, metavar='PATH',
+                        help='Record per-stage spans and write them as Chrome/Perfetto trace JSON '
+                             '(default trace.json)')
+    parser.add_argument('--resume', type=str, metavar='JOB',
+                        help='Continue a job that stopped part way (job id printed as JOB_ID=, or journal path); '
+                             'the source and report options come from the journal')
 
     args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+
+    if args.resume:
+        try:
+            resume_job(args.resume)
+        finally:
+            if args.trace:
+                export_trace(Path(args.trace))
+        return
 
     # Parse inspector notes
     print(f"[DEBUG run_report] Raw --notes arg: {args.notes}")
@@ -1563,10 +2149,17 @@ def main():
         property_address = ' '.join(property_address.split())
         print(f"Using filename as property address: {property_address}")
 
+    job = None
+    if JOURNAL_ENABLED and JobJournal is not None:
+        job = JobJournal.create({'source': str(source.resolve()), 'client': args.client,
+                                 'property': property_address, 'type': args.type,
+                                 'notes': inspector_notes, 'engine': args.engine})
+        print(f"JOB_ID={job.job_id}")
+
     try:
         # Generate PDF report only
         artifacts = build_reports(source, args.client, property_address, inspection_type=args.type,
-                                  inspector_notes=inspector_notes)
+                                  inspector_notes=inspector_notes, engine=args.engine, job=job)
         print("\nReport generation complete!")
         print(f"PDF saved to: {artifacts['pdf_path']}")
 
@@ -1574,6 +2167,53 @@ def main():
         print(f"\nError: {e}")
         import traceback
         traceback.print_exc()
+        if job:
+            print(f"Continue this job with: python run_report.py --resume {job.job_id}")
+        sys.exit(1)
+
+    finally:
+        if args.trace:
+            export_trace(Path(args.trace))
+
+def export_trace(path: Path) -> None:
+    """Write the spans recorded by --trace"""
+    count = tracing.export(path)
+    print(f"Trace written to {path} ({count} events; open in ui.perfetto.dev or chrome://tracing)")
+
+def resume_job(job_ref: str) -> None:
+    """Continue the journaled job job_ref (run_report.py --resume)"""
+    if JobJournal is None:
+        print("Error: journal.py not found, cannot resume")
+        sys.exit(1)
+    try:
+        job = JobJournal.load(job_ref)
+    except FileNotFoundError:
+        print(f"Error: No journal found for job {job_ref}")
+        sys.exit(1)
+    params = job.params
+    if job.done and Path(job.done.get('pdf_path', '')).exists():
+        print(f"Job {job.job_id} already finished: {job.done['pdf_path']}")
+        return
+
+    source = Path(params.get('source', ''))
+    if not source.exists() and job.extracted_dir() is None:
+        print(f"Error: Source no longer exists: {source}")
+        sys.exit(1)
+    print(f"JOB_ID={job.job_id}")
+    print(f"Resuming job {job.job_id}: {len(job.analyses)} photos analyzed before it stopped")
+    try:
+        artifacts = build_reports(source, params.get('client', 'Property Owner'),
+                                  params.get('property', 'Property Address'),
+                                  inspection_type=params.get('type', 'Quarterly'),
+                                  inspector_notes=params.get('notes') or [],
+                                  engine=params.get('engine'), job=job)
+        print("\nReport generation complete!")
+        print(f"PDF saved to: {artifacts['pdf_path']}")
+    except Exception as e:
+        print(f"\nError: {e}")
+        import traceback
+        traceback.print_exc()
+        print(f"Continue this job with: python run_report.py --resume {job.job_id}")
         sys.exit(1)
 
 if __name__ == "__main__":
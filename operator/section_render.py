@@ -0,0 +1,194 @@
+"""
+Section Render - Draw the report's location sections in parallel processes
+
+With grouping on, generate_pdf drew every section divider and photo page on
+one canvas, one page after another, on one core. Sections don't depend on each
+other once their page numbers are known, and calculate_page_layout already
+knows them (photo_page_count gives each photo's continuation pages), so:
+
+- generate_pdf writes the cover, action items and table of contents as usual
+- each section (divider plus its photo pages) is drawn by a spawn process into
+  its own PDF on a canvas whose page numbers start at the section's planned
+  page, so footers carry their final page numbers
+- the parts are appended to the front matter in section order with pypdf
+
+Work already done in generate_pdf's process goes with the job: photos
+pre-rendered during analysis are loaded from the renderer's spill file, and
+PDF JPEGs still in memory are passed along, so a worker only compresses the
+photos nobody has touched yet. When most photos are pre-rendered there is
+little left to draw and generate_pdf stays sequential (should_render_sections).
+
+Which process draws which section never changes the output: the merge order
+is the report order, and every page is drawn by the same functions as in the
+sequential loop. pypdf is optional; without it generate_pdf stays sequential.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from reportlab.pdfgen import canvas
+
+import tracing
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+# ---------------- Tunables (override via .env if desired) ----------------
+PDF_SECTIONS_PARALLEL = os.getenv("PDF_SECTIONS_PARALLEL", "true").lower() == "true"
+PDF_SECTION_PROCESSES = int(os.getenv("PDF_SECTION_PROCESSES",
+                                      str(max(1, min(8, (os.cpu_count() or 2) - 1)))))
+PDF_SECTION_MIN = int(os.getenv("PDF_SECTION_MIN", "10"))  # below this many rooms, process startup isn't worth it
+# Above this share of photos pre-rendered, placing fragments in one process is cheaper than the pool
+PDF_SECTION_MAX_PRERENDERED = float(os.getenv("PDF_SECTION_MAX_PRERENDERED", "0.5"))
+
+
+class SectionJob:
+    """One section to draw: its divider's page number and its photos in report order."""
+
+    __slots__ = ("index", "total", "name", "start_page", "first_photo", "photos", "spilled", "jpegs")
+
+    def __init__(self, index: int, total: int, name: str, start_page: int, first_photo: int,
+                 photos: List[Tuple[str, object]], spilled: Optional[Dict[str, Tuple[str, int, int]]] = None,
+                 jpegs: Optional[Dict[str, bytes]] = None):
+        self.index = index
+        self.total = total
+        self.name = name
+        self.start_page = start_page
+        self.first_photo = first_photo
+        self.photos = photos  # [(path string, Analysis or None), ...]
+        self.spilled = spilled or {}  # path string -> SpilledFragment.location of its pre-rendered pages
+        self.jpegs = jpegs or {}  # path string -> PDF JPEG bytes made in generate_pdf's process
+
+
+class _PartCanvas(canvas.Canvas):
+    """Canvas for one section's part; its page numbers count from where the part lands in the report."""
+
+    def __init__(self, filename: str, first_page: int, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._first_page = first_page
+
+    def getPageNumber(self) -> int:
+        return super().getPageNumber() + self._first_page - 1
+
+
+def _render_section_in_worker(part_path: str, job: SectionJob, total_photos: int, address: str,
+                              pagesize: Tuple[float, float]) -> tuple:
+    """
+    Runs in a pool process (or in generate_pdf's, as a retry). Draws job into
+    part_path. Returns ([(page kind, page number, photo name, pages)], busy s, pid).
+    """
+    import run_report
+    from image_prep import keep_pdf
+    from page_fragments import load_spilled
+
+    started = time.perf_counter()
+    width, height = pagesize
+    c = _PartCanvas(part_path, job.start_page, pagesize=pagesize)
+
+    run_report.generate_section_divider(c, job.name, len(job.photos), width, height, job.index, job.total)
+    c.showPage()
+    pages = [("section divider", job.start_page, "", 1)]
+
+    for number, (path_str, analysis) in enumerate(job.photos, job.first_photo):
+        img_path = Path(path_str)
+        fragment = None
+        try:
+            if path_str in job.spilled:
+                fragment = load_spilled(*job.spilled[path_str])
+            else:
+                if path_str in job.jpegs:
+                    keep_pdf(img_path, job.jpegs[path_str])
+                fragment = run_report.render_photo_fragment(img_path, analysis, width, height)
+            first_page = c.getPageNumber()
+            run_report.place_photo_fragment(c, fragment, number, total_photos, job.name, address, width, height)
+            pages.append(("photo page", first_page, img_path.name, fragment.page_count))
+        except Exception as e:
+            print(f"ERROR adding {img_path.name} to PDF: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            if fragment is not None:
+                fragment.cleanup()
+
+    c.save()
+    return pages, time.perf_counter() - started, os.getpid()
+
+
+def should_render_sections(section_count: int, photos: int = 0, prerendered: int = 0) -> bool:
+    """Whether to use the pool for a report with this many sections and photos, prerendered of them drawn."""
+    return (PYPDF_AVAILABLE and PDF_SECTIONS_PARALLEL and PDF_SECTION_PROCESSES > 1
+            and section_count >= PDF_SECTION_MIN and prerendered <= photos * PDF_SECTION_MAX_PRERENDERED)
+
+
+def render_sections(front_pdf: Path, jobs: List[SectionJob], total_photos: int, address: str,
+                    pagesize: Tuple[float, float],
+                    on_page: Optional[Callable[..., None]] = None) -> int:
+    """
+    Draw jobs in worker processes and append them to front_pdf (already saved,
+    ending right before the first section). on_page(kind, page, **args) is
+    called for every divider and photo in report order once all parts are in.
+    Returns the number of pages appended.
+    """
+    parts_dir = Path(tempfile.mkdtemp(prefix="report_sections_"))
+    try:
+        part_paths = [str(parts_dir / f"section_{job.index:03d}.pdf") for job in jobs]
+        results: Dict[int, tuple] = {}
+        ctx = multiprocessing.get_context("spawn")  # no forked SQLite state in children
+        processes = max(1, min(PDF_SECTION_PROCESSES, len(jobs)))
+        with ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as pool:
+            # Biggest sections first so one large room doesn't start last; the merge order is fixed below
+            order = sorted(range(len(jobs)), key=lambda i: -len(jobs[i].photos))
+            futures = {i: pool.submit(_render_section_in_worker, part_paths[i], jobs[i], total_photos,
+                                      address, pagesize) for i in order}
+            for i in order:
+                try:
+                    results[i] = futures[i].result()
+                except Exception as e:
+                    print(f"  Section {jobs[i].name} failed in its worker ({e!r}); drawing it here")
+                    results[i] = _render_section_in_worker(part_paths[i], jobs[i], total_photos, address, pagesize)
+                _, busy, pid = results[i]
+                tracing.complete("render section", time.perf_counter() - busy, busy, cat="pdf",
+                                 track=f"pdf process {pid}", section=jobs[i].name, photos=len(jobs[i].photos))
+
+        writer = PdfWriter()
+        front = PdfReader(str(front_pdf))
+        for page in front.pages:
+            writer.add_page(page)
+        if front.metadata:
+            writer.add_metadata(dict(front.metadata))
+        appended = 0
+        for i, job in enumerate(jobs):
+            pages = results[i][0]
+            part = PdfReader(part_paths[i])
+            lands_on = len(front.pages) + appended + 1
+            if lands_on != job.start_page:
+                # Only if a photo failed to draw; the sequential loop would have shifted the same way
+                print(f"  Warning: section {job.name} planned for page {job.start_page} lands on "
+                      f"page {lands_on}; its footers are off")
+            for page in part.pages:
+                writer.add_page(page)
+            appended += len(part.pages)
+            if on_page:
+                for kind, page_number, photo, count in pages:
+                    if kind == "photo page":
+                        on_page(kind, page_number, photo=photo, pages=count)
+                    else:
+                        on_page(kind, page_number, section=job.name)
+
+        merged = front_pdf.with_name(front_pdf.name + ".merging")  # same file system, so the replace is atomic
+        with tracing.span("merge pdf", sections=len(jobs), pages=len(writer.pages)):
+            with open(merged, "wb") as f:
+                writer.write(f)
+            os.replace(merged, front_pdf)
+        return appended
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
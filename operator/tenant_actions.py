@@ -1,116 +1,70 @@
 """
 Tenant Action Items Module - Parse vision results and generate action items page
 
-Extracts issues tagged with [TENANT] responsibility from vision analysis
+Collects issues with TENANT responsibility from the parsed vision analyses
 and creates a summary page for the property owner to share with their tenant.
 """
 
-import re
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 from reportlab.pdfgen import canvas
 from reportlab.lib.colors import HexColor
 
+from analysis_model import Analysis, parse_analysis
+
 
 # ============================================================================
 # ISSUE PARSING
 # ============================================================================
 
-def extract_location(analysis: str) -> str:
-    """Extract location from vision analysis text."""
-    match = re.search(r'Location:\s*(.+?)(?:\n|$)', analysis, re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    return "Other"
+def extract_location(analysis: Union[Analysis, str]) -> str:
+    """Location of a photo's analysis ("Other" if it has none)."""
+    analysis = parse_analysis(analysis)
+    return (analysis.location if analysis else "") or "Other"
 
 
-def parse_issues_from_vision_results(vision_results: Dict[str, str]) -> Dict[str, List[Dict]]:
+def parse_issues_from_vision_results(vision_results: Dict[str, Analysis]) -> Dict[str, List[Dict]]:
     """
-    Parse vision analysis results and extract categorized issues.
-    Separates issues by responsibility: TENANT vs OWNER.
+    Collect the issues of every analysis, separated by responsibility: TENANT vs OWNER.
 
     Returns dict with 'tenant' and 'owner' lists of issues.
     Each issue: {
         'description': str,
         'location': str,
-        'priority': str,  # IMMEDIATE or SOON
-        'action': str,    # Recommended action if found
+        'priority': str,  # FIX NOW or FIX SOON
+        'action': str,    # First recommended action, if any
     }
     """
     tenant_issues = []
     owner_issues = []
 
-    for image_path, analysis in vision_results.items():
-        if not analysis:
-            continue
+    # An InspectionResultStore already knows which results have issues
+    with_issues = getattr(vision_results, 'with_issues', None)
+    results = with_issues() if with_issues is not None else vision_results.items()
 
-        # Skip if no repairs needed
-        analysis_lower = analysis.lower()
-        if 'no repairs needed' in analysis_lower or 'no issues' in analysis_lower:
+    for image_path, analysis in results:
+        analysis = parse_analysis(analysis)
+        if not analysis or not analysis.issues:
             continue
 
-        # Extract location for this image
-        location = extract_location(analysis)
-
-        # Extract recommended action if present
-        action_match = re.search(r'Recommended Action:\s*\n?-?\s*(.+?)(?=\n\n|\Z)', analysis, re.IGNORECASE | re.DOTALL)
-        default_action = action_match.group(1).strip() if action_match else ""
-
-        # Pattern: "- [OWNER/TENANT] [FIX NOW/FIX SOON] description"
-        # Handle various formats the AI might use, including legacy IMMEDIATE/SOON
-        issue_patterns = [
-            # New format: [TENANT] [FIX NOW] or [FIX SOON] description
-            re.compile(r'-\s*\[(TENANT|OWNER)\]\s*\[(FIX NOW|FIX SOON)\]\s*(.+?)(?=\n|$)', re.IGNORECASE),
-            # Alternative: [FIX NOW] [TENANT] description
-            re.compile(r'-\s*\[(FIX NOW|FIX SOON)\]\s*\[(TENANT|OWNER)\]\s*(.+?)(?=\n|$)', re.IGNORECASE),
-            # Legacy format: [TENANT] [IMMEDIATE/SOON] description
-            re.compile(r'-\s*\[(TENANT|OWNER)\]\s*\[(IMMEDIATE|SOON)\]\s*(.+?)(?=\n|$)', re.IGNORECASE),
-            # Legacy alternative: [IMMEDIATE/SOON] [TENANT] description
-            re.compile(r'-\s*\[(IMMEDIATE|SOON)\]\s*\[(TENANT|OWNER)\]\s*(.+?)(?=\n|$)', re.IGNORECASE),
-            # Legacy format without responsibility (assume OWNER)
-            re.compile(r'-\s*\[(IMMEDIATE|SOON|FIX NOW|FIX SOON)\]\s*(.+?)(?=\n|$)', re.IGNORECASE),
-        ]
-
-        for pattern in issue_patterns:
-            for match in pattern.finditer(analysis):
-                groups = match.groups()
-
-                if len(groups) == 3:
-                    # Full format with both tags
-                    if groups[0].upper() in ('TENANT', 'OWNER'):
-                        responsibility = groups[0].upper()
-                        priority = groups[1].upper()
-                        description = groups[2].strip()
-                    else:
-                        priority = groups[0].upper()
-                        responsibility = groups[1].upper()
-                        description = groups[2].strip()
-                elif len(groups) == 2:
-                    # Legacy format - assume OWNER responsibility
-                    priority = groups[0].upper()
-                    description = groups[1].strip()
-                    responsibility = 'OWNER'
-                else:
-                    continue
-
-                # Normalize priority to new simpler format
-                if priority in ('IMMEDIATE', 'FIX NOW'):
-                    priority = 'FIX NOW'
-                else:
-                    priority = 'FIX SOON'
-
-                issue = {
-                    'description': description,
-                    'location': location,
-                    'priority': priority,
-                    'action': default_action,
-                    'image_path': image_path,  # Track which image this issue came from
-                }
-
-                if responsibility == 'TENANT':
-                    tenant_issues.append(issue)
-                else:
-                    owner_issues.append(issue)
+        location = analysis.location or "Other"
+        default_action = analysis.actions[0] if analysis.actions else ""
+
+        for item in analysis.issues:
+            if not item.priority:
+                continue  # untagged bullets from legacy text answers aren't action items
+            issue = {
+                'description': item.description,
+                'location': location,
+                'priority': item.priority,
+                'action': default_action,
+                'image_path': image_path,  # Track which image this issue came from
+            }
+
+            if item.responsibility == 'TENANT':
+                tenant_issues.append(issue)
+            else:
+                owner_issues.append(issue)
 
     return {
         'tenant': tenant_issues,
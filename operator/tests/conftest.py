@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+OPERATOR_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(OPERATOR_DIR))
+
+# Module-level stores (scan manifests, digest memo, workspace) must not land in the checkout
+_scratch = tempfile.mkdtemp(prefix="operator_tests_")
+os.environ.setdefault("ANALYSIS_CACHE_DIR", os.path.join(_scratch, "cache"))
+os.environ.setdefault("WORKSPACE_DIR", os.path.join(_scratch, "workspace"))
+# vision builds its API client at import; no test sends a request
+os.environ.setdefault("OPENAI_API_KEY", "test-key-not-used")
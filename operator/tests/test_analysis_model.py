@@ -0,0 +1,51 @@
+from analysis_model import Analysis, Issue, parse_analysis
+
+LEGACY = """Location: Kitchen
+What I See: a sink with cabinets below
+Issues to Address:
+- [TENANT] [IMMEDIATE] Leaking faucet under sink
+- [SOON] [OWNER] Cracked tile near the door
+- Loose cabinet hinge
+Recommended Action:
+- Call a plumber
+Tighten the hinge"""
+
+
+def test_legacy_text_is_converted():
+    analysis = parse_analysis(LEGACY)
+    assert analysis.location == "Kitchen"
+    assert analysis.issues == (Issue("Leaking faucet under sink", "TENANT", "FIX NOW"),
+                               Issue("Cracked tile near the door", "OWNER", "FIX SOON"),
+                               Issue("Loose cabinet hinge", "OWNER", ""))
+    assert analysis.actions == ("Call a plumber", "Tighten the hinge")
+    assert analysis.note == ""  # "What I See" is dropped
+
+
+def test_legacy_no_issue_phrases_are_dropped_and_free_text_kept():
+    analysis = parse_analysis("Location: Patio\nNo issues found.\nPhoto is slightly dark")
+    assert analysis == Analysis("Patio", note="Photo is slightly dark")
+    assert not analysis.has_issues
+
+
+def test_tagged_bullets_outside_the_issues_section_are_issues():
+    analysis = Analysis.from_text("Observations: hallway\n- [OWNER] [FIX NOW] Exposed wiring")
+    assert analysis.issues == (Issue("Exposed wiring", "OWNER", "FIX NOW"),)
+
+
+def test_json_round_trips_and_wins_over_text():
+    analysis = Analysis("Garage", [Issue("Oil stain", "TENANT", "FIX SOON")], ["Clean the floor"], note="dim")
+    assert parse_analysis(analysis.to_json()) == analysis
+    assert parse_analysis(analysis) is analysis
+    assert parse_analysis(None) is None
+
+
+def test_text_that_only_looks_like_json_falls_back_to_legacy():
+    assert parse_analysis("{not json").note == "{not json"
+    assert parse_analysis("[1, 2]").note == "[1, 2]"
+
+
+def test_from_dict_normalizes_bad_fields():
+    analysis = Analysis.from_dict({"location": " Attic ", "issues": [
+        {"description": "Mold on rafters", "responsibility": "landlord", "priority": "immediate"},
+        {"description": "  "}, "not an issue"], "actions": ["", "Call a roofer"]})
+    assert analysis == Analysis("Attic", [Issue("Mold on rafters", "OWNER", "FIX NOW")], ["Call a roofer"])
@@ -0,0 +1,121 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from PIL import Image, ImageDraw
+
+import dedupe
+from analysis_model import Analysis, Issue
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(dedupe, "DEDUPE_ENABLED", True)
+
+
+def _wall(seed=1, crack=False, shift=0):
+    rng = np.random.default_rng(seed)
+    a = np.full((300, 400, 3), (200, 198, 190), dtype=np.float32) + rng.normal(0, 3, size=(300, 400, 1))
+    a += np.linspace(-15, 15, 400)[None, :, None]
+    im = Image.fromarray(np.clip(a, 0, 255).astype(np.uint8))
+    if crack:
+        ImageDraw.Draw(im).line([(175, 50), (190, 110), (180, 175), (200, 250)], fill=(60, 55, 50), width=3)
+    return Image.fromarray(np.roll(np.asarray(im), shift, axis=1)) if shift else im
+
+
+def _room(shift=0):
+    """Blocky furnished-room texture; a burst shot is the same frame moved a few pixels."""
+    rng = np.random.default_rng(7)
+    blocks = rng.integers(40, 220, size=(300 // 32 + 1, 400 // 32 + 1, 3), dtype=np.uint8)
+    return Image.fromarray(np.roll(np.kron(blocks, np.ones((32, 32, 1), dtype=np.uint8))[:300, :400], shift, axis=1))
+
+
+def _save(im, path, taken=None, quality=90, original=True):
+    exif = Image.Exif()
+    if taken is not None:
+        if original:
+            exif.get_ifd(dedupe._EXIF_IFD)[dedupe._DATETIME_ORIGINAL] = taken
+        else:
+            exif[dedupe._DATETIME] = taken
+    path.parent.mkdir(parents=True, exist_ok=True)
+    im.save(path, quality=quality, exif=exif)
+    return path
+
+
+def test_capture_time_reads_original_then_datetime(tmp_path):
+    a = _save(_wall(), tmp_path / "a.jpg", "2024:05:01 10:00:00")
+    b = _save(_wall(), tmp_path / "b.jpg", "2024:05:01 10:00:03", original=False)
+    c = _save(_wall(), tmp_path / "c.jpg")
+    assert dedupe.capture_time(b) - dedupe.capture_time(a) == 3
+    assert dedupe.capture_time(c) is None
+
+
+def test_burst_collapses_to_the_largest_file(tmp_path):
+    a = _save(_room(), tmp_path / "IMG_1.jpg", "2024:05:01 10:00:00", quality=70)
+    b = _save(_room(shift=3), tmp_path / "IMG_2.jpg", "2024:05:01 10:00:01", quality=95)
+    reps, duplicates = dedupe.collapse_near_duplicates([a, b])
+    assert reps == [b] and duplicates == {str(b): [a]}
+
+
+def test_wall_and_cracked_wall_stay_apart(tmp_path):
+    a = _save(_wall(), tmp_path / "IMG_1.jpg", "2024:05:01 10:00:00")
+    b = _save(_wall(crack=True), tmp_path / "IMG_2.jpg", "2024:05:01 10:00:01")
+    assert dedupe.collapse_near_duplicates([a, b]) == ([a, b], {})
+
+
+def test_two_plain_walls_stay_apart(tmp_path):
+    a = _save(_wall(seed=1), tmp_path / "IMG_1.jpg", "2024:05:01 10:00:00")
+    b = _save(_wall(seed=5), tmp_path / "IMG_2.jpg", "2024:05:01 10:00:01")
+    assert dedupe.collapse_near_duplicates([a, b]) == ([a, b], {})
+
+
+@pytest.mark.parametrize("second", [None, "2024:05:01 10:01:00"])
+def test_identical_photos_need_adjacent_capture_times(tmp_path, second):
+    a = _save(_wall(crack=True), tmp_path / "IMG_1.jpg", "2024:05:01 10:00:00")
+    b = _save(_wall(crack=True), tmp_path / "IMG_2.jpg", second)
+    assert dedupe.collapse_near_duplicates([a, b]) == ([a, b], {})
+
+
+def test_folders_and_the_switch_keep_photos_apart(tmp_path, monkeypatch):
+    a = _save(_wall(crack=True), tmp_path / "kitchen" / "IMG_1.jpg", "2024:05:01 10:00:00")
+    b = _save(_wall(crack=True), tmp_path / "hall" / "IMG_1.jpg", "2024:05:01 10:00:01")
+    assert dedupe.collapse_near_duplicates([a, b]) == ([a, b], {})
+    c = _save(_wall(crack=True), tmp_path / "kitchen" / "IMG_2.jpg", "2024:05:01 10:00:01")
+    monkeypatch.setattr(dedupe, "DEDUPE_ENABLED", False)
+    assert dedupe.collapse_near_duplicates([a, c]) == ([a, c], {})
+
+
+def test_expansion_marks_inherited_analyses():
+    rep, dup, other = "photos/IMG_2.jpg", dedupe.Path("photos/IMG_1.jpg"), dedupe.Path("photos/IMG_9.jpg")
+    analysis = Analysis("Hallway", [Issue("Crack in the drywall", "OWNER", "FIX SOON")], ["Patch it"])
+    results = dedupe.expand_duplicate_results({rep: analysis}, {rep: [dup], "photos/missing.jpg": [other]})
+    assert results[rep] is analysis
+    shared = results[str(dup)]
+    assert (shared.location, shared.issues, shared.actions) == (analysis.location, analysis.issues, analysis.actions)
+    assert "Near-duplicate of IMG_2.jpg" in shared.note
+    assert str(other) not in results
+
+
+def test_inherited_note_keeps_the_original_note():
+    shared = dedupe.shared_analysis(Analysis("Patio", note="Photo is dark"), dedupe.Path("a/IMG_3.jpg"))
+    assert shared.note.startswith("Photo is dark\n") and "IMG_3.jpg" in shared.note
+
+
+def test_renderer_draws_duplicates_with_their_shared_analysis(tmp_path):
+    pytest.importorskip("reportlab")
+    pytest.importorskip("openai")
+    import run_report
+
+    rep = _save(_wall(crack=True), tmp_path / "IMG_2.jpg", "2024:05:01 10:00:01")
+    dup = _save(_wall(crack=True, shift=3), tmp_path / "IMG_1.jpg", "2024:05:01 10:00:00")
+    analysis = Analysis("Hallway", [Issue("Crack in the drywall", "OWNER", "FIX SOON")])
+    duplicates = {str(rep): [dup]}
+    results = dedupe.expand_duplicate_results({str(rep): analysis}, duplicates)
+    renderer = run_report.PhotoFragmentRenderer(duplicates)
+    try:
+        renderer.submit(str(rep), analysis)
+        assert renderer.take(dup, results[str(dup)]) is not None
+        assert renderer.take(rep, results[str(rep)]) is not None
+    finally:
+        renderer.close()
@@ -0,0 +1,44 @@
+import derivative_store
+from derivative_store import DerivativeStore
+
+
+def _put(store, digest, data=b"x" * 100):
+    store.put(digest, "pdf/720/jpeg/q50/exif", data, "image/jpeg")
+
+
+def test_evict_drops_least_recently_used_rows(tmp_path):
+    store = DerivativeStore(tmp_path / "derivatives.sqlite3")
+    for i in range(10):
+        _put(store, f"d{i}")
+    assert store.get("d0", "pdf/720/jpeg/q50/exif") is not None  # d0 becomes most recently used
+
+    assert store.evict(max_bytes=500) == 5
+    left = {row[0] for row in store._conn().execute("SELECT digest FROM derivatives")}
+    assert left == {"d0", "d6", "d7", "d8", "d9"}
+    assert store.stats()["bytes"] <= 500
+
+
+def test_evict_under_limit_removes_nothing(tmp_path):
+    store = DerivativeStore(tmp_path / "derivatives.sqlite3")
+    _put(store, "d0")
+    assert store.evict(max_bytes=1000) == 0
+    assert store.stats()["entries"] == 1
+
+
+def test_put_checks_size_every_evict_every_writes(tmp_path):
+    store = DerivativeStore(tmp_path / "derivatives.sqlite3", max_bytes=100)
+    for i in range(derivative_store.EVICT_EVERY - 1):
+        _put(store, f"d{i}")
+    assert store.stats()["entries"] == derivative_store.EVICT_EVERY - 1
+    _put(store, "last")
+    assert store.stats()["bytes"] <= 100
+
+
+def test_same_digest_keeps_one_row_per_transform(tmp_path):
+    store = DerivativeStore(tmp_path / "derivatives.sqlite3")
+    store.put("d0", "pdf/720", b"pdf", "image/jpeg")
+    store.put("d0", "analysis/1024", b"analysis", "image/jpeg")
+    store.put("d0", "pdf/720", b"pdf2", "image/jpeg")
+    assert store.get("d0", "pdf/720") == (b"pdf2", "image/jpeg")
+    assert store.get("d0", "analysis/1024") == (b"analysis", "image/jpeg")
+    assert store.stats()["entries"] == 2
@@ -0,0 +1,39 @@
+import pytest
+
+import image_scan
+
+HEADS = {
+    ".jpg": b"\xff\xd8\xff\xe0\x00\x10JFIF\x00",
+    ".png": b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR",
+    ".gif": b"GIF89a\x01\x00\x01\x00",
+    ".bmp": b"BM" + bytes(12),
+    ".webp": b"RIFF\x24\x00\x00\x00WEBPVP8 ",
+    ".heic": b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00",
+}
+
+
+@pytest.mark.parametrize("ext", sorted(HEADS))
+def test_sniff_recognizes_formats(ext):
+    assert image_scan.sniff_image(HEADS[ext]) == ext
+
+
+@pytest.mark.parametrize("head", [
+    b"",
+    b"%PDF-1.7\n",
+    b"PK\x03\x04",  # zip
+    b"BM",  # too short for a bitmap header
+    b"RIFF\x24\x00\x00\x00WAVEfmt ",
+    b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00",  # mp4 video
+])
+def test_sniff_rejects_other_files(head):
+    assert image_scan.sniff_image(head) is None
+
+
+def test_scan_goes_by_content_not_extension(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "b.JPG").write_bytes(HEADS[".jpg"])
+    (tmp_path / "sub" / "a_renamed.dat").write_bytes(HEADS[".png"])
+    (tmp_path / "c.jpg").write_bytes(b"not really a photo")
+    (tmp_path / "notes.txt").write_text("hello")
+    scanner = image_scan.ImageScanner(None)
+    assert [p.name for p in scanner.scan(tmp_path)] == ["a_renamed.dat", "b.JPG"]
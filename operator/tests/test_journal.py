@@ -0,0 +1,93 @@
+import json
+import time
+
+import pytest
+
+import journal
+from analysis_model import Analysis, Issue
+from journal import JobJournal, completed
+
+
+@pytest.fixture(autouse=True)
+def jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "JOBS_DIR", tmp_path)
+    monkeypatch.setattr(journal, "JOURNAL_FSYNC", False)
+    return tmp_path
+
+
+def test_load_replays_and_ignores_torn_last_line(tmp_path):
+    job = JobJournal.create({"source": "upload.zip"})
+    job.note_extracted(tmp_path / "photos")
+    job.note_analysis(tmp_path / "photos", tmp_path / "photos" / "a.jpg",
+                      Analysis("Kitchen", [Issue("Leaky faucet", "OWNER", "FIX SOON")]))
+    job.flush()
+    with open(job.path, "ab") as f:
+        f.write(b'{"event":"analysis","photo":"b.jpg","analy')  # the crash
+
+    resumed = JobJournal.load(job.job_id)
+    assert resumed.params == {"source": "upload.zip"}
+    assert resumed.extracted == str(tmp_path / "photos")
+    assert list(resumed.analyses) == ["a.jpg"]
+    assert resumed.done is None
+
+    # The next record starts on its own line and survives another replay
+    resumed.note_done(tmp_path / "report.pdf", "r1")
+    again = JobJournal.load(job.path)
+    assert again.done["report_id"] == "r1"
+    assert list(again.analyses) == ["a.jpg"]
+
+
+def test_completed_analyses_match_relative_paths(tmp_path):
+    job = JobJournal.create({})
+    job.note_analysis(tmp_path / "old", tmp_path / "old" / "sub" / "a.jpg", Analysis("Garage"))
+    job.note_analysis(tmp_path / "old", tmp_path / "old" / "b.jpg", Analysis.failed("timeout"))
+    job.flush()
+
+    new_dir = tmp_path / "new"
+    found = JobJournal.load(job.job_id).completed_analyses(new_dir, [new_dir / "sub" / "a.jpg", new_dir / "b.jpg"])
+    assert list(found) == [str(new_dir / "sub" / "a.jpg")]
+    assert found[str(new_dir / "sub" / "a.jpg")].location == "Garage"
+
+
+def test_old_render_records_are_ignored(tmp_path):
+    path = tmp_path / "old_job.jsonl"
+    path.write_text(json.dumps({"event": "start", "params": {}}) + "\n"
+                    + json.dumps({"event": "render", "page": 12, "photos": 9}) + "\n", encoding="utf-8")
+    assert JobJournal.load(path).params == {}
+
+
+def test_completed():
+    assert completed(Analysis(skipped="blurry"))
+    assert completed(Analysis("Kitchen"))
+    assert not completed(Analysis())
+    assert not completed(Analysis.failed("timeout"))
+    assert not completed(None)
+
+
+def test_note_analysis_queues_and_group_commits(tmp_path, monkeypatch):
+    syncs = []
+
+    def slow_fsync(fd):
+        time.sleep(0.2)
+        syncs.append(fd)
+
+    monkeypatch.setattr(journal, "JOURNAL_FSYNC", True)
+    monkeypatch.setattr(journal.os, "fsync", slow_fsync)
+    job = JobJournal.create({})
+    syncs.clear()
+
+    started = time.perf_counter()
+    for i in range(5):
+        job.note_analysis(tmp_path, tmp_path / f"{i}.jpg", Analysis("Kitchen"))
+    assert time.perf_counter() - started < 0.1  # nobody waited for the disk
+    job.flush()
+    assert 1 <= len(syncs) < 5
+    assert list(JobJournal.load(job.path).analyses) == [f"{i}.jpg" for i in range(5)]
+
+
+def test_done_is_written_after_queued_analyses(tmp_path):
+    job = JobJournal.create({})
+    job.note_analysis(tmp_path, tmp_path / "a.jpg", Analysis("Kitchen"))
+    job.note_done(tmp_path / "report.pdf", "r1")
+    events = [json.loads(line)["event"] for line in job.path.read_text(encoding="utf-8").splitlines()]
+    assert events == ["start", "analysis", "done"]
@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("reportlab")
+pytest.importorskip("openai")
+Image = pytest.importorskip("PIL.Image")
+
+from reportlab.lib.pagesizes import letter
+
+import run_report
+from analysis_model import Analysis, Issue
+from page_fragments import FragmentSpill, PhotoImage, RecordingCanvas
+
+WIDTH, HEIGHT = letter
+
+
+def _photo(tmp_path, name="IMG_0001.jpg"):
+    path = tmp_path / name
+    Image.new("RGB", (800, 600), (120, 90, 60)).save(path, quality=80)
+    return path
+
+
+def _long_analysis():
+    issues = tuple(Issue(f"Water stain near the vent, about {n} inches across; check the unit above", "OWNER", "FIX SOON")
+                   for n in range(25))
+    return Analysis("Kitchen", issues, ("Call a plumber",))
+
+
+def test_spilled_fragment_replays_the_same_pages(tmp_path):
+    fragment = run_report.render_photo_fragment(_photo(tmp_path), _long_analysis(), WIDTH, HEIGHT)
+    pages = [list(ops) for ops in fragment.pages]
+    spill = FragmentSpill()
+    try:
+        spilled = spill.put(fragment)
+        assert fragment.pages == [] and spill.bytes > 0
+        assert spilled.page_count == len(pages) > 1
+
+        loaded = spilled.load()
+        assert [[name for name, _, _ in ops] for ops in loaded.pages] == [[name for name, _, _ in ops] for ops in pages]
+        c = RecordingCanvas((WIDTH, HEIGHT))
+        loaded.replay_page(c, 0)
+        image = next(args[0] for name, args, _ in c.pages[0] if name == "drawImage")
+        assert not isinstance(image, PhotoImage) and image.getSize() == (720, 540)
+    finally:
+        spill.close()
+
+
+def test_page_count_reuses_the_rendered_layout(tmp_path):
+    analysis = _long_analysis()
+    run_report._analysis_column.cache_clear()
+    fragment = run_report.render_photo_fragment(_photo(tmp_path), analysis, WIDTH, HEIGHT)
+    assert run_report.photo_page_count(analysis, WIDTH, HEIGHT) == fragment.page_count
+    info = run_report._analysis_column.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+
+
+def test_renderer_hands_back_fragments_from_its_spill(tmp_path):
+    photo = _photo(tmp_path)
+    analysis = _long_analysis()
+    renderer = run_report.PhotoFragmentRenderer()
+    try:
+        renderer.submit(str(photo), analysis)
+        assert renderer.take(photo, Analysis("Kitchen")) is None  # rendered for a different analysis
+        renderer.submit(str(photo), analysis)
+        fragment = renderer.take(photo, analysis)
+        assert fragment.page_count == run_report.photo_page_count(analysis, WIDTH, HEIGHT)
+    finally:
+        renderer.close()
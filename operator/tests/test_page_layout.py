@@ -0,0 +1,83 @@
+import re
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("reportlab")
+pytest.importorskip("openai")
+
+import run_report
+from analysis_model import Analysis, Issue
+
+A, B, C = Path("photos/a.jpg"), Path("photos/b.jpg"), Path("photos/c.jpg")
+GROUPED = [("Kitchen", [A, B]), ("Garage", [C])]
+PAGES = {str(A): 1, str(B): 3, str(C): 1}  # b has two continuation pages
+
+
+def test_page_map_with_sections():
+    # cover 1, action items 2, TOC 3, Kitchen divider 4, a 5, b 6-8, Garage divider 9, c 10
+    page_map = run_report.calculate_image_page_map(GROUPED, True, photo_pages=PAGES)
+    assert page_map == {str(A): 5, str(B): 6, str(C): 10}
+    layout = run_report.calculate_page_layout(GROUPED, True, PAGES)
+    assert [start for _, _, start in layout] == [4, 9]  # each divider is the page before its first photo
+
+
+def test_page_map_without_sections():
+    # One room: no TOC and no dividers, so photos follow the action items page
+    page_map = run_report.calculate_image_page_map(GROUPED, True, photo_pages=PAGES, sections=False)
+    assert page_map == {str(A): 3, str(B): 4, str(C): 7}
+    page_map = run_report.calculate_image_page_map(GROUPED, False, photo_pages=PAGES, sections=False)
+    assert page_map == {str(A): 2, str(B): 3, str(C): 6}
+
+
+def test_page_map_defaults_to_one_page_per_photo():
+    page_map = run_report.calculate_image_page_map(GROUPED, False)
+    assert page_map == {str(A): 4, str(B): 5, str(C): 7}
+
+
+def _report(tmp_path, rooms):
+    """Photos over rooms, every third with enough issues for continuation pages."""
+    Image = pytest.importorskip("PIL.Image")
+    images, results = [], {}
+    for i in range(9):
+        path = tmp_path / f"IMG_{i:04d}.jpg"
+        Image.new("RGB", (800, 600), (40 * i % 256, 90, 120)).save(path, quality=80)
+        issues = [Issue(f"Water stain near the vent, about {n} inches across; check the unit above",
+                        "OWNER", "FIX SOON") for n in range(25 if i % 3 == 0 else 0)]
+        images.append(path)
+        results[str(path)] = Analysis(rooms[i % len(rooms)], issues, ("Call a plumber",) if issues else ())
+    return images, results
+
+
+def _photo_first_pages(pdf_path):
+    """{photo number: page its 'Photo k of N' header is on}, read back from the PDF."""
+    PdfReader = pytest.importorskip("pypdf").PdfReader
+    texts = [page.extract_text() or "" for page in PdfReader(str(pdf_path)).pages]
+    first = {}
+    for page, text in enumerate(texts, 1):
+        for number in re.findall(r"Photo (\d+) of \d+", text):
+            first.setdefault(int(number), page)
+    return first, texts
+
+
+@pytest.mark.parametrize("rooms", [("Kitchen",), ("Kitchen", "Garage", "Patio")])
+def test_page_map_matches_the_rendered_report(tmp_path, monkeypatch, rooms):
+    import section_render
+    monkeypatch.setattr(section_render, "PDF_SECTIONS_PARALLEL", False)
+    images, results = _report(tmp_path, rooms)
+    pdf_path = tmp_path / "report.pdf"
+    run_report.generate_pdf("1 Test St", images, pdf_path, results)
+
+    store = run_report.result_store(results)
+    grouped = run_report.group_images_by_location(images, store)
+    width, height = run_report.letter
+    pages = {str(p): run_report.photo_page_count(store.lookup(p), width, height) for p in images}
+    assert max(pages.values()) > 1
+    page_map = run_report.calculate_image_page_map(grouped, True, store, pages, sections=len(grouped) > 1)
+
+    first, texts = _photo_first_pages(pdf_path)
+    ordered = [p for _, group in grouped for p in group]
+    assert {number: page_map[str(p)] for number, p in enumerate(ordered, 1)} == first
+    # The action items page points at those same pages
+    refs = {int(page) for page in re.findall(r"p\.(\d+)", texts[1])}
+    assert refs and refs <= set(first.values())
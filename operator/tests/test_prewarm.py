@@ -0,0 +1,38 @@
+import subprocess
+import sys
+import time
+
+import prewarm
+
+STUBBORN_CHILD = ("import signal, sys, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); "
+                  "print('ready', flush=True); time.sleep(60)")
+
+
+def _running(prewarmer, code):
+    process = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+    assert process.stdout.readline().strip() == "ready"
+    prewarmer._process = process
+    return process
+
+
+def test_stop_terminates_the_child():
+    prewarmer = prewarm.BackgroundPrewarm(lambda *args: None)
+    process = _running(prewarmer, "import time; print('ready', flush=True); time.sleep(60)")
+    prewarmer.stop(timeout=5)
+    assert process.poll() is not None
+
+
+def test_stop_kills_a_child_that_ignores_terminate():
+    prewarmer = prewarm.BackgroundPrewarm(lambda *args: None)
+    process = _running(prewarmer, STUBBORN_CHILD)
+    started = time.monotonic()
+    prewarmer.stop(timeout=0.5)
+    assert process.poll() is not None
+    assert time.monotonic() - started < 5
+
+
+def test_stop_drops_queued_folders():
+    prewarmer = prewarm.BackgroundPrewarm(lambda *args: None)
+    prewarmer._pending = ["a", "b"]
+    prewarmer.stop()
+    assert prewarmer._pending == [] and prewarmer._stopped
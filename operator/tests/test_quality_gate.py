@@ -0,0 +1,79 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from PIL import Image, ImageDraw, ImageFilter
+
+import quality_gate
+
+SIZE = (1600, 1200)
+
+
+def _room(seed=7):
+    """Blocky texture with hard edges, like a furnished room."""
+    rng = np.random.default_rng(seed)
+    w, h = SIZE
+    blocks = rng.integers(40, 220, size=(h // 64 + 1, w // 64 + 1, 3), dtype=np.uint8)
+    return Image.fromarray(np.kron(blocks, np.ones((64, 64, 1), dtype=np.uint8))[:h, :w])
+
+
+def _stained_ceiling(seed=1):
+    """In-focus flat paint with sensor noise and one water stain."""
+    rng = np.random.default_rng(seed)
+    w, h = SIZE
+    paint = np.full((h, w, 3), (228, 226, 218), dtype=np.float32) + rng.normal(0, 2.5, size=(h, w, 1))
+    im = Image.fromarray(np.clip(paint, 0, 255).astype(np.uint8))
+    ImageDraw.Draw(im).ellipse((600, 400, 900, 620), fill=(205, 195, 170), outline=(170, 150, 115), width=5)
+    return im
+
+
+def _verdict(im):
+    return quality_gate.verdict(quality_gate.measure(im))
+
+
+def test_sharp_room_passes():
+    assert _verdict(_room()) is None
+
+
+def test_sharp_but_flat_photo_passes():
+    metrics = quality_gate.measure(_stained_ceiling())
+    assert metrics["frame_sharpness"] < quality_gate.QUALITY_MIN_SHARPNESS  # what the whole-frame score saw
+    assert quality_gate.verdict(metrics) is None
+
+
+def test_blurred_photo_is_rejected():
+    assert _verdict(_room().filter(ImageFilter.BoxBlur(20))) == "too blurry"
+
+
+def test_blurred_flat_photo_is_rejected():
+    assert _verdict(_stained_ceiling().filter(ImageFilter.GaussianBlur(8))) is not None
+
+
+def test_dark_photo_is_rejected():
+    dark = Image.fromarray((np.asarray(_room()) // 12).astype(np.uint8))
+    assert _verdict(dark) == "too dark"
+
+
+def test_overexposed_photo_is_rejected():
+    assert _verdict(Image.new("RGB", SIZE, (252, 252, 252))) == "overexposed"
+
+
+def test_blank_frame_is_rejected():
+    blank = Image.new("RGB", SIZE, (182, 120, 104)).filter(ImageFilter.GaussianBlur(8))
+    assert _verdict(blank) == "blank or lens covered"
+
+
+def test_tiny_image_still_measures():
+    metrics = quality_gate.measure(_room().resize((5, 4)))
+    assert metrics["sharpness"] >= 0
+
+
+def test_gate_is_opt_in(monkeypatch):
+    monkeypatch.setattr(quality_gate, "QUALITY_GATE_ENABLED", False)
+    quality_gate.check_image(Image.new("RGB", SIZE))  # black frame, but the gate is off
+    assert quality_gate.signature() == "off"
+    monkeypatch.setattr(quality_gate, "QUALITY_GATE_ENABLED", True)
+    with pytest.raises(quality_gate.PhotoRejected) as rejected:
+        quality_gate.check_image(Image.new("RGB", SIZE))
+    assert rejected.value.reason == "too dark"
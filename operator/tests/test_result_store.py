@@ -0,0 +1,77 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from analysis_model import Analysis, Issue
+from result_store import InspectionResultStore
+
+
+def _legacy_lookup(vision_results, img_path):
+    """The lookup generate_pdf used before InspectionResultStore: full path, else the first same-name result."""
+    img_path_str = str(img_path)
+    if img_path_str in vision_results:
+        return vision_results[img_path_str]
+    for key, value in vision_results.items():
+        if Path(key).name == img_path.name:
+            return value
+    return None
+
+
+def _content_digest(path):
+    return hashlib.blake2b(Path(path).read_bytes(), digest_size=20).hexdigest()
+
+
+def _results(root):
+    return {
+        str(root / "kitchen" / "IMG_0001.jpg"): Analysis("Kitchen", [Issue("Loose cabinet hinge")]),
+        str(root / "garage" / "IMG_0001.jpg"): Analysis("Garage"),
+        str(root / "bath" / "IMG_0002.jpg"): Analysis("Bathroom"),
+    }
+
+
+def test_duplicate_basenames_in_subfolders_resolve_like_before(tmp_path):
+    results = _results(tmp_path)
+    store = InspectionResultStore(results, digest_of=_content_digest)
+    images = [tmp_path / "kitchen" / "IMG_0001.jpg", tmp_path / "garage" / "IMG_0001.jpg",
+              tmp_path / "bath" / "IMG_0002.jpg", tmp_path / "other" / "IMG_0001.jpg",
+              tmp_path / "other" / "IMG_9999.jpg"]
+    for img in images:
+        assert store.lookup(img) is _legacy_lookup(results, img), img
+
+
+def test_moved_photos_fall_back_to_the_first_same_name_result(tmp_path):
+    results = _results(tmp_path / "previous-run")
+    store = InspectionResultStore(results, digest_of=_content_digest)  # no files: digests fail, names decide
+    for img in (tmp_path / "kitchen" / "IMG_0001.jpg", tmp_path / "bath" / "IMG_0002.jpg"):
+        assert store.lookup(img) is _legacy_lookup(results, img)
+
+
+def test_moved_photos_with_content_resolve_by_digest(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    for root in (old, new):
+        for sub, data in (("kitchen", b"kitchen photo"), ("garage", b"garage photo")):
+            (root / sub).mkdir(parents=True)
+            (root / sub / "IMG_0001.jpg").write_bytes(data)
+    store = InspectionResultStore(_results(old), digest_of=_content_digest)
+    # The name scan would have given the kitchen's answer to both
+    assert store.lookup(new / "garage" / "IMG_0001.jpg").location == "Garage"
+    assert store.lookup(new / "kitchen" / "IMG_0001.jpg").location == "Kitchen"
+
+
+def test_indexes_follow_replaced_results(tmp_path):
+    store = InspectionResultStore(_results(tmp_path), normalize=str.upper)
+    key = str(tmp_path / "garage" / "IMG_0001.jpg")
+    store.add(key, Analysis("Patio", [Issue("Cracked paver")]))
+    assert store.at_location("GARAGE") == []
+    assert store.at_location("PATIO") == [key]
+    assert [k for k, _ in store.with_issues()] == [str(tmp_path / "kitchen" / "IMG_0001.jpg"), key]
+    assert store.location_of(tmp_path / "nowhere.jpg") == "Other"
+
+
+def test_run_report_lookup_analysis_matches_legacy(tmp_path):
+    run_report = pytest.importorskip("run_report")
+    results = _results(tmp_path)
+    for img in (tmp_path / "kitchen" / "IMG_0001.jpg", tmp_path / "garage" / "IMG_0001.jpg",
+                tmp_path / "elsewhere" / "IMG_0002.jpg"):
+        assert run_report.lookup_analysis(results, img) is _legacy_lookup(results, img)
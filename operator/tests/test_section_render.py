@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("reportlab")
+pytest.importorskip("openai")
+pytest.importorskip("pypdf")
+Image = pytest.importorskip("PIL.Image")
+
+from pypdf import PdfReader
+
+import run_report
+import section_render
+from analysis_model import Analysis, Issue
+
+ROOMS = ("Kitchen", "Garage", "Patio")
+
+
+def test_part_canvas_numbers_pages_from_its_start(tmp_path):
+    c = section_render._PartCanvas(str(tmp_path / "part.pdf"), 7)
+    assert c.getPageNumber() == 7
+    c.showPage()
+    assert c.getPageNumber() == 8
+
+
+def test_mostly_prerendered_reports_stay_sequential(monkeypatch):
+    monkeypatch.setattr(section_render, "PDF_SECTIONS_PARALLEL", True)
+    monkeypatch.setattr(section_render, "PDF_SECTION_PROCESSES", 2)
+    monkeypatch.setattr(section_render, "PDF_SECTION_MIN", 2)
+    assert section_render.should_render_sections(3, photos=10, prerendered=5)
+    assert not section_render.should_render_sections(3, photos=10, prerendered=6)
+    assert not section_render.should_render_sections(1, photos=10)
+
+
+def _report(tmp_path):
+    images, results = [], {}
+    for i in range(12):
+        path = tmp_path / f"IMG_{i:04d}.jpg"
+        Image.new("RGB", (800, 600), (20 * i, 90, 120)).save(path, quality=80)
+        issues = [Issue(f"Water stain near the vent, about {n} inches across; check the unit above",
+                        "TENANT", "FIX NOW") for n in range(25 if i % 4 == 0 else i % 2)]
+        images.append(path)
+        results[str(path)] = Analysis(ROOMS[i % len(ROOMS)], issues, ("Call a plumber",) if issues else ())
+    return images, results
+
+
+def _render(tmp_path, name, images, results, parallel, monkeypatch):
+    monkeypatch.setattr(section_render, "PDF_SECTIONS_PARALLEL", parallel)
+    monkeypatch.setattr(section_render, "PDF_SECTION_PROCESSES", 2)
+    monkeypatch.setattr(section_render, "PDF_SECTION_MIN", 2)
+    # A third of the photos pre-rendered, as if their analyses came back first
+    fragments = run_report.PhotoFragmentRenderer()
+    try:
+        for path in images[::3]:
+            fragments.submit(str(path), results[str(path)])
+        pdf_path = tmp_path / name
+        run_report.generate_pdf("1 Test St", images, pdf_path, results, fragments=fragments)
+    finally:
+        fragments.close()
+    return [page.extract_text() or "" for page in PdfReader(str(pdf_path)).pages]
+
+
+def test_parallel_sections_match_the_sequential_report(tmp_path, monkeypatch, capsys):
+    images, results = _report(tmp_path)
+    sequential = _render(tmp_path, "sequential.pdf", images, results, False, monkeypatch)
+    assert "Section pages:" not in capsys.readouterr().out
+    parallel = _render(tmp_path, "parallel.pdf", images, results, True, monkeypatch)
+    out = capsys.readouterr().out
+    assert "Section pages:" in out and "4 of 12 pre-rendered" in out
+    assert len(parallel) > len(images) + len(ROOMS) + 3  # continuation pages included
+    assert parallel == sequential
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("PIL")
+
+import upload_policy
+from analysis_model import Analysis
+import vision
+
+
+@pytest.fixture
+def speculative(monkeypatch):
+    monkeypatch.setattr(vision, "SECOND_PASS_POLICY", "speculative")
+    monkeypatch.setattr(vision, "_predict_second_pass", lambda path: True)
+
+
+def test_speculation_is_limited_to_max_inflight(speculative):
+    photo = Path("photos/IMG_0001.jpg")
+    taken = [vision._should_speculate(photo) for _ in range(vision.SPECULATE_MAX_INFLIGHT + 2)]
+    assert taken.count(True) == vision.SPECULATE_MAX_INFLIGHT
+    for _ in range(vision.SPECULATE_MAX_INFLIGHT):
+        vision._end_speculation()
+    assert vision._should_speculate(photo)
+    vision._end_speculation()
+
+
+def test_no_speculation_below_predicted_rate(monkeypatch):
+    monkeypatch.setattr(vision, "SECOND_PASS_POLICY", "speculative")
+    monkeypatch.setattr(vision, "_second_pass_rate", lambda path: vision.SPECULATE_MIN_RATE - 0.05)
+    assert not vision._should_speculate(Path("photos/IMG_0001.jpg"))
+
+
+def test_wasted_nudges_show_in_upload_stats():
+    upload_policy.reset_stats()
+    before = vision.second_pass_stats()["speculation_wasted"]
+    upload_policy.note_upload("second pass", "standard", 1000, 765)
+    vision._note_speculation(False, wasted=True)
+    vision._note_speculation(False)
+    assert vision.second_pass_stats()["speculation_wasted"] == before + 1
+    assert upload_policy.upload_stats()["second pass"]["wasted"] == 1
+
+
+def _counts():
+    stats = vision.second_pass_stats()
+    return {k: stats[k] for k in ("speculation_failed", "speculation_wasted", "speculation_cancelled")}
+
+
+@pytest.fixture
+def quiet_bookkeeping(monkeypatch):
+    monkeypatch.setattr(vision, "_note_second_pass", lambda path, fired: None)
+    monkeypatch.setattr(vision, "_cache_put", lambda *args: pytest.fail("a failed second pass was cached"))
+
+
+def test_failed_nudge_counts_as_failed_not_wasted(speculative, quiet_bookkeeping, monkeypatch):
+    def nudge(path, img_bytes, mime):
+        raise RuntimeError("second pass timed out")
+
+    monkeypatch.setattr(vision, "_timed_second_pass", nudge)
+    monkeypatch.setattr(vision, "_request_text", lambda messages, label: None)  # empty first pass: nudge needed
+    before = _counts()
+    assert vision.describe_prepared(Path("photos/IMG_0001.jpg"), b"jpeg", "image/jpeg", ("d", None)) == Analysis()
+    after = _counts()
+    assert after["speculation_failed"] == before["speculation_failed"] + 1
+    assert (after["speculation_wasted"], after["speculation_cancelled"]) == (
+        before["speculation_wasted"], before["speculation_cancelled"])
+
+
+def test_async_failed_nudge_counts_as_failed_not_wasted(speculative, quiet_bookkeeping, monkeypatch):
+    vision_async = pytest.importorskip("vision_async")
+    engine = vision_async.AsyncVisionEngine(concurrency=1)
+    try:
+        async def complete(messages, label):
+            return None  # empty first pass: nudge needed
+
+        async def nudge(path, img_bytes, mime, sent):
+            sent.append(True)
+            raise RuntimeError("second pass timed out")
+
+        monkeypatch.setattr(engine, "_complete", complete)
+        monkeypatch.setattr(engine, "_timed_nudge", nudge)
+        before = _counts()
+        out = engine._run(engine.describe_prepared(Path("photos/IMG_0001.jpg"), b"jpeg", "image/jpeg", ("d", None)))
+        assert out == Analysis()
+        after = _counts()
+        assert after["speculation_failed"] == before["speculation_failed"] + 1
+        assert after["speculation_wasted"] == before["speculation_wasted"]
+    finally:
+        engine.close()
@@ -0,0 +1,69 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("PIL")
+
+import vision
+from analysis_model import Analysis
+from quality_gate import PhotoRejected
+
+A, B, C = Path("photos/a.jpg"), Path("photos/b.jpg"), Path("photos/c.jpg")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Count cache lookups and image preparation; record single-image requests."""
+    calls = {"key": [], "get": [], "prepare": [], "prepared": []}
+
+    def cache_key(path):
+        calls["key"].append(path)
+        return (f"digest-{path.name}", None)
+
+    def cache_get(path, key=None):
+        calls["get"].append(path)
+        return Analysis("Kitchen") if path == C else None
+
+    def prepare(path):
+        calls["prepare"].append(path)
+        if path.name.startswith("blurry"):
+            raise PhotoRejected("too blurry")
+        return (b"jpeg-" + path.name.encode(), "image/jpeg")
+
+    def describe_prepared(path, img_bytes, mime, key=None):
+        calls["prepared"].append((path, img_bytes, key))
+        return Analysis("Single")
+
+    monkeypatch.setattr(vision, "_cache_key", cache_key)
+    monkeypatch.setattr(vision, "_cache_get", cache_get)
+    monkeypatch.setattr(vision, "_analysis_image_bytes", prepare)
+    monkeypatch.setattr(vision, "describe_prepared", describe_prepared)
+    monkeypatch.setattr(vision, "describe_image", lambda path: pytest.fail("describe_image repeats the lookup"))
+    return calls
+
+
+def _failing_client(monkeypatch):
+    def create(**kwargs):
+        raise RuntimeError("batch endpoint down")
+    monkeypatch.setattr(vision, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+
+
+def test_single_uncached_photo_reuses_key_and_bytes(calls):
+    results = vision.describe_images_batch([A, C, Path("photos/blurry.jpg")])
+    assert results[str(C)].location == "Kitchen"
+    assert results["photos/blurry.jpg"].skipped == "too blurry"
+    assert calls["prepared"] == [(A, b"jpeg-a.jpg", ("digest-a.jpg", None))]
+    assert calls["key"] == calls["get"] == [A, C, Path("photos/blurry.jpg")]
+    assert calls["prepare"] == [A, Path("photos/blurry.jpg")]
+
+
+def test_failed_batch_falls_back_without_preparing_again(calls, monkeypatch):
+    _failing_client(monkeypatch)
+    results = vision.describe_images_batch([A, B])
+    assert [results[str(p)].location for p in (A, B)] == ["Single", "Single"]
+    assert calls["prepared"] == [(A, b"jpeg-a.jpg", ("digest-a.jpg", None)),
+                                 (B, b"jpeg-b.jpg", ("digest-b.jpg", None))]
+    assert calls["prepare"] == [A, B]
+    assert calls["key"] == [A, B]
@@ -0,0 +1,45 @@
+import vision_cache
+from vision_cache import VisionCache
+
+
+def _put(cache, digest, text="x" * 100):
+    cache.put(digest, "prompt", "model", 1024, text)
+
+
+def test_evict_drops_least_recently_used_rows(tmp_path):
+    cache = VisionCache(tmp_path / "vision.sqlite3")
+    for i in range(10):
+        _put(cache, f"d{i}")
+    assert cache.get("d0", "prompt", "model", 1024) is not None  # d0 becomes most recently used
+
+    assert cache.evict(max_bytes=500) == 5
+    left = {row[0] for row in cache._conn().execute("SELECT digest FROM analyses")}
+    assert left == {"d0", "d6", "d7", "d8", "d9"}
+    assert cache.stats()["bytes"] <= 500
+
+
+def test_evict_under_limit_removes_nothing(tmp_path):
+    cache = VisionCache(tmp_path / "vision.sqlite3")
+    _put(cache, "d0")
+    assert cache.evict(max_bytes=1000) == 0
+    assert cache.stats()["entries"] == 1
+
+
+def test_put_checks_size_every_evict_every_writes(tmp_path):
+    cache = VisionCache(tmp_path / "vision.sqlite3", max_bytes=100)
+    for i in range(vision_cache.EVICT_EVERY - 1):
+        _put(cache, f"d{i}")
+    assert cache.stats()["entries"] == vision_cache.EVICT_EVERY - 1
+    _put(cache, "last")
+    assert cache.stats()["bytes"] <= 100
+
+
+def test_legacy_pending_clears_once_promoted(tmp_path):
+    (tmp_path / "abc.txt").write_text("Location: Kitchen", encoding="utf-8")
+    cache = VisionCache(tmp_path / "vision.sqlite3")
+    assert cache.import_legacy_dir(tmp_path) == 1
+    assert cache.legacy_pending
+
+    assert cache.get("d0", "prompt", "model", 1024, legacy_key="abc") == "Location: Kitchen"
+    assert not cache.legacy_pending
+    assert cache.get("d0", "prompt", "model", 1024) == "Location: Kitchen"
@@ -0,0 +1,99 @@
+import io
+import zipfile
+from pathlib import Path, PurePosixPath
+
+import pytest
+
+import zip_source
+from zip_source import ZipBombError, _check_archive, _read_member, _safe_name
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("photos/IMG_0001.jpg", "photos/IMG_0001.jpg"),
+    ("./photos//kitchen.jpg", "photos/kitchen.jpg"),
+    ("photos\\win\\a.jpg", "photos/win/a.jpg"),
+])
+def test_safe_name_keeps_relative_paths(name, expected):
+    assert _safe_name(name) == PurePosixPath(expected)
+
+
+@pytest.mark.parametrize("name", [
+    "../etc/passwd",
+    "photos/../../escape.jpg",
+    "/abs/photo.jpg",
+    "C:/photo.jpg",
+    "__MACOSX/photos/._IMG_0001.jpg",
+    "photos/._IMG_0001.jpg",
+    "",
+])
+def test_safe_name_rejects_traversal_and_os_junk(name):
+    assert _safe_name(name) is None
+
+
+def _info(name, file_size, compress_size):
+    info = zipfile.ZipInfo(name)
+    info.file_size = file_size
+    info.compress_size = compress_size
+    return info
+
+
+def test_check_archive_limits(monkeypatch):
+    monkeypatch.setattr(zip_source, "ZIP_MAX_MEMBERS", 2)
+    with pytest.raises(ZipBombError):
+        _check_archive([_info(f"{i}.jpg", 10, 10) for i in range(3)])
+
+    with pytest.raises(ZipBombError):
+        _check_archive([_info("bomb.jpg", 50 * 1024 * 1024, 1024)])  # 51200:1
+
+    _check_archive([_info("tiny.txt", 100_000, 10)])  # small members may compress well
+    _check_archive([_info("a.jpg", 4_000_000, 3_900_000), _info("b.jpg", 10, 10)])
+
+
+def _zip_with(tmp_path, name, data):
+    path = tmp_path / "in.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr(name, data)
+    return zipfile.ZipFile(path)
+
+
+def test_read_member_enforces_bytes_actually_produced(tmp_path, monkeypatch):
+    monkeypatch.setattr(zip_source, "ZIP_MAX_MEMBER_MB", 1)
+    jpeg_like = b"\xff\xd8\xff\xe0" + b"\0" * (3 * 1024 * 1024)
+    with _zip_with(tmp_path, "big.jpg", jpeg_like) as z:
+        with pytest.raises(ZipBombError):
+            _read_member(z, z.getinfo("big.jpg"), 1 << 40, None, tmp_path)
+    assert list(tmp_path.glob("tmp*")) == []  # no spill file left behind
+
+
+def test_read_member_skips_non_images_and_spills_large_members(tmp_path, monkeypatch):
+    with _zip_with(tmp_path, "notes.txt", b"hello") as z:
+        assert _read_member(z, z.getinfo("notes.txt"), 1 << 40, None, tmp_path) is None
+
+    monkeypatch.setattr(zip_source, "ZIP_SPOOL_MB", 1)
+    jpeg_like = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 8192  # 2 MB
+    with _zip_with(tmp_path, "big.jpg", jpeg_like) as z:
+        data, size, ext, digest, legacy = _read_member(z, z.getinfo("big.jpg"), 1 << 40, None, tmp_path)
+    assert isinstance(data, str) and Path(data).read_bytes() == jpeg_like
+    assert (size, ext, legacy) == (len(jpeg_like), ".jpg", None)
+
+
+def test_ingest_zip_writes_proxies(tmp_path, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    import image_prep
+
+    monkeypatch.setattr(zip_source, "_vision_hooks", lambda: (None, lambda p: False, None, image_prep.digests))
+    monkeypatch.setattr(zip_source, "INGEST_PROCESSES", 1)
+    monkeypatch.setattr(zip_source, "ZIP_SPOOL_MB", 0)  # every member goes through a spill file
+    src = tmp_path / "upload.zip"
+    with zipfile.ZipFile(src, "w") as z:
+        for i in range(3):
+            buf = io.BytesIO()
+            Image.new("RGB", (64, 48), (i * 80, 10, 10)).save(buf, format="JPEG")
+            z.writestr(f"photos/IMG_{i}.jpg", buf.getvalue())
+        z.writestr("photos/readme.txt", b"not a photo")
+        z.writestr("../escape.jpg", b"\xff\xd8\xff")
+
+    photos_dir, images = zip_source.ingest_zip(src, tmp_path / "out")
+    assert photos_dir == tmp_path / "out" / "photos"
+    assert [p.name for p in images] == ["IMG_0.jpg", "IMG_1.jpg", "IMG_2.jpg"]
+    assert zip_source.ingest_stats()["skipped"] == 2
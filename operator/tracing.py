@@ -0,0 +1,174 @@
+"""
+Tracing - Lightweight spans exported as Chrome / Perfetto trace JSON
+
+Wrap a stage in a span and it shows up as a bar on its thread's track:
+
+    with tracing.span("extract_zip", zip=zip_path.name):
+        ...
+
+    with tracing.span("cache lookup", photo=name) as sp:
+        sp.set(result="hit")
+
+    @tracing.traced()
+    def collect_images(...): ...
+
+Code running on an event loop passes track=<photo name> so overlapping
+requests get one async track each instead of piling onto the loop thread.
+
+Tracing is off unless enable() is called (run_report --trace). While off,
+span() returns a shared no-op object, so instrumented code costs one function
+call and a flag check per span.
+
+export(path) writes {"traceEvents": [...]} that chrome://tracing and
+ui.perfetto.dev open directly.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+ENABLED = False
+_events: list = []                 # list.append is atomic, so no lock on the hot path
+_thread_names: dict = {}
+_track_ids: dict = {}              # named tracks (e.g. pool processes) -> synthetic tid
+_origin_ns = time.perf_counter_ns()
+_pid = os.getpid()
+
+
+class _NullSpan:
+    """What span() returns while tracing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed region. Use span() rather than constructing this directly."""
+
+    __slots__ = ("name", "cat", "args", "track", "start_ns")
+
+    def __init__(self, name: str, cat: str, track: Optional[str], args: dict):
+        self.name = name
+        self.cat = cat
+        self.track = track
+        self.args = args
+        self.start_ns = 0
+
+    def set(self, **args) -> None:
+        """Attach more args (e.g. an outcome known only at the end of the span)."""
+        self.args.update(args)
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        ts = (self.start_ns - _origin_ns) / 1000.0
+        if self.track is None:
+            tid = _current_tid()
+            _events.append({"name": self.name, "cat": self.cat, "ph": "X", "ts": ts,
+                            "dur": (end_ns - self.start_ns) / 1000.0, "pid": _pid, "tid": tid,
+                            "args": self.args})
+        else:
+            # Nestable async events: Chrome groups them into one track per (cat, id)
+            _events.append({"name": self.name, "cat": self.cat, "ph": "b", "ts": ts, "pid": _pid,
+                            "tid": _current_tid(), "id": self.track, "args": self.args})
+            _events.append({"name": self.name, "cat": self.cat, "ph": "e", "ts": (end_ns - _origin_ns) / 1000.0,
+                            "pid": _pid, "tid": _current_tid(), "id": self.track})
+        return False
+
+
+def _current_tid() -> int:
+    tid = threading.get_ident()
+    if tid not in _thread_names:
+        _thread_names[tid] = threading.current_thread().name
+    return tid
+
+
+def _track_id(track: str) -> int:
+    tid = _track_ids.get(track)
+    if tid is None:
+        tid = _track_ids.setdefault(track, 1_000_000_000 + len(_track_ids))
+    return tid
+
+
+def span(name: str, cat: str = "report", track: Optional[str] = None, **args):
+    """Context manager timing the enclosed block; a no-op while tracing is off."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return Span(name, cat, track, args)
+
+
+def traced(name: Optional[str] = None, cat: str = "report"):
+    """Decorator: run every call of the function in a span named after it."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with Span(label, cat, None, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def complete(name: str, start: float, duration: float, cat: str = "report",
+             track: Optional[str] = None, **args) -> None:
+    """
+    Record a span measured elsewhere: start is a time.perf_counter() value in this
+    process, duration in seconds. Used for work timed inside pool processes.
+    """
+    if not ENABLED:
+        return
+    event = {"name": name, "cat": cat, "ph": "X", "ts": (start * 1e9 - _origin_ns) / 1000.0,
+             "dur": duration * 1e6, "pid": _pid, "args": args}
+    event["tid"] = _current_tid() if track is None else _track_id(track)
+    _events.append(event)
+
+
+def enable() -> None:
+    """Start recording spans (clears anything recorded before)."""
+    global ENABLED
+    _events.clear()
+    ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def export(path: Path) -> int:
+    """Write recorded spans as Chrome trace JSON and return the number of events."""
+    events = list(_events)
+    meta = [{"name": "process_name", "ph": "M", "pid": _pid, "tid": 0, "args": {"name": "run_report"}}]
+    for tid, name in list(_thread_names.items()):
+        meta.append({"name": "thread_name", "ph": "M", "pid": _pid, "tid": tid, "args": {"name": name}})
+    for track, tid in list(_track_ids.items()):
+        meta.append({"name": "thread_name", "ph": "M", "pid": _pid, "tid": tid, "args": {"name": track}})
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
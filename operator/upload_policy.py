@@ -0,0 +1,215 @@
+"""
+Upload Policy - Pick the resolution, encoder and detail level per photo
+
+ANALYSIS_MAX_PX used to apply to every photo. With UPLOAD_POLICY=adaptive the
+first pass instead gets one of three plans, chosen from two cheap statistics
+of the decoded photo and from how sure earlier first passes in the folder were:
+
+- low:      512 px, detail "low". Little is lost by halving a 1024 px copy,
+            so the model's 512 px low-detail view sees what matters.
+- standard: ANALYSIS_MAX_PX, detail "auto" (the previous behaviour).
+- fine:     FINE_UPLOAD_PX, detail "auto". Much of the photo's detail lives
+            at the finest scale (close-ups of outlets, labels, hairline
+            cracks), or the folder's first passes often came back empty.
+
+The second pass, which only runs when a first pass looks empty, always gets a
+SECOND_PASS_UPLOAD_PX copy at detail "high". Low and standard copies of JPEG
+sources are re-encoded as WebP when Pillow can write it: on smooth, plain
+photos it is a third of the JPEG's size. Fine and second-pass copies stay
+JPEG, where WebP saves little on dense texture and encodes several times
+slower. PNG screenshots stay PNG.
+
+UPLOAD_POLICY=fixed (the default) keeps the single ANALYSIS_MAX_PX JPEG/PNG
+copy and sends no detail field, i.e. the requests are exactly what they were
+before. Adaptive changes what the model sees and the vision cache keys, so it
+is opt-in until it has been compared against the real model.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+from PIL import Image, ImageChops, ImageFilter, features
+
+try:
+    import numpy as np
+except ImportError:  # falls back to Pillow histograms
+    np = None
+
+# ---------------- Tunables (override via .env if desired) ----------------
+UPLOAD_POLICY = os.getenv("UPLOAD_POLICY", "fixed").lower()             # fixed or adaptive (opt-in)
+UPLOAD_FORMAT = os.getenv("UPLOAD_FORMAT", "auto").lower()              # auto (WebP where it pays), webp or jpeg
+WEBP_QUALITY = int(os.getenv("UPLOAD_WEBP_QUALITY", "80"))
+WEBP_METHOD = int(os.getenv("UPLOAD_WEBP_METHOD", "2"))                 # 0-6: encoder effort (4+ costs 2-3x for ~10%)
+LOW_DETAIL_PX = 512                                                     # what the API looks at for detail=low
+FINE_UPLOAD_PX = int(os.getenv("FINE_UPLOAD_PX", "1280"))
+SECOND_PASS_UPLOAD_PX = int(os.getenv("SECOND_PASS_UPLOAD_PX", "1536"))
+LOW_FINE_DETAIL = float(os.getenv("UPLOAD_LOW_FINE_DETAIL", "0.02"))    # below this (and plain) -> low
+HIGH_FINE_DETAIL = float(os.getenv("UPLOAD_HIGH_FINE_DETAIL", "0.20"))  # above this -> fine
+LOW_EDGE_DENSITY = float(os.getenv("UPLOAD_LOW_EDGE_DENSITY", "0.08"))
+UNSURE_RATE = float(os.getenv("UPLOAD_UNSURE_RATE", "0.5"))             # folder second-pass rate -> fine
+
+SIGNAL_PX = 1024          # signals are measured at most this size (the standard decode, usually)
+RESIDUAL_THRESHOLD = 12   # gray levels a pixel must lose at half size to count as fine detail
+EDGE_THRESHOLD = 24       # gradient magnitude (0-255 scale) counted as an edge
+SIGNALS_VERSION = 1
+
+
+def adaptive() -> bool:
+    return UPLOAD_POLICY == "adaptive"
+
+
+class UploadPlan:
+    """How one photo is sent to the model for one pass."""
+
+    __slots__ = ("max_px", "fmt", "quality", "detail", "tier")
+
+    def __init__(self, max_px: int, fmt: str, quality: int, detail: Optional[str], tier: str):
+        self.max_px = max_px
+        self.fmt = fmt            # jpeg, webp or png
+        self.quality = quality
+        self.detail = detail      # None = don't send a detail field
+        self.tier = tier
+
+    def key(self) -> str:
+        """Part of the derivative store transform naming this encoding."""
+        return f"{self.max_px}/{self.fmt}/q{self.quality}"
+
+    def __repr__(self) -> str:
+        return f"UploadPlan({self.tier}: {self.max_px}px {self.fmt} q{self.quality} detail={self.detail})"
+
+
+def _encoder(source_fmt: str, jpeg_quality: int, dense: bool = False):
+    """(format, quality) for a source whose fixed-policy format is source_fmt."""
+    if source_fmt == "png":
+        return "png", 0
+    if UPLOAD_FORMAT == "webp" or (UPLOAD_FORMAT == "auto" and not dense and features.check("webp")):
+        return "webp", WEBP_QUALITY
+    return "jpeg", jpeg_quality
+
+
+def fixed_plan(max_px: int, source_fmt: str, jpeg_quality: int) -> UploadPlan:
+    return UploadPlan(max_px, source_fmt, jpeg_quality, None, "fixed")
+
+
+def first_pass_plan(signals: Dict[str, float], source_fmt: str, max_px: int, jpeg_quality: int,
+                    unsure: bool = False) -> UploadPlan:
+    """Plan for the first pass from the photo's signals and the folder's history."""
+    fine = signals.get("fine_detail", 0.5)
+    if unsure or fine >= HIGH_FINE_DETAIL:
+        fmt, quality = _encoder(source_fmt, jpeg_quality, dense=True)
+        return UploadPlan(max(max_px, FINE_UPLOAD_PX), fmt, quality, "auto", "fine")
+    fmt, quality = _encoder(source_fmt, jpeg_quality)
+    if fine <= LOW_FINE_DETAIL and signals.get("edge_density", 1.0) <= LOW_EDGE_DENSITY:
+        return UploadPlan(LOW_DETAIL_PX, fmt, quality, "low", "low")
+    return UploadPlan(max_px, fmt, quality, "auto", "standard")
+
+
+def second_pass_plan(source_fmt: str, jpeg_quality: int) -> UploadPlan:
+    fmt, quality = _encoder(source_fmt, jpeg_quality, dense=True)
+    return UploadPlan(SECOND_PASS_UPLOAD_PX, fmt, quality, "high", "high")
+
+
+def first_pass_detail(width: int, height: int) -> Optional[str]:
+    """Detail field for a first-pass copy of this size (only a low plan is that small)."""
+    if not adaptive():
+        return None
+    return "low" if max(width, height) <= LOW_DETAIL_PX else "auto"
+
+
+def tier_for(width: int, height: int, max_px: int) -> str:
+    """Plan tier of a first-pass copy, recovered from its size for the counters."""
+    if not adaptive():
+        return "fixed"
+    long_edge = max(width, height)
+    if long_edge <= LOW_DETAIL_PX:
+        return "low"
+    return "standard" if long_edge <= max_px else "fine"
+
+
+# ---------------- Signals ----------------
+def _residual_share(gray: Image.Image, blurred: Image.Image) -> float:
+    if np is not None:
+        diff = np.abs(np.asarray(gray, dtype=np.int16) - np.asarray(blurred, dtype=np.int16))
+        return float((diff > RESIDUAL_THRESHOLD).mean())
+    hist = ImageChops.difference(gray, blurred).histogram()
+    return sum(hist[RESIDUAL_THRESHOLD + 1:]) / float(sum(hist) or 1)
+
+
+def _edge_density(gray: Image.Image) -> float:
+    if np is not None:
+        a = np.asarray(gray, dtype=np.int16)
+        gx = np.abs(a[:, 1:] - a[:, :-1])[:-1, :]
+        gy = np.abs(a[1:, :] - a[:-1, :])[:, :-1]
+        return float(((gx + gy) > EDGE_THRESHOLD).mean()) if gx.size else 0.0
+    hist = gray.filter(ImageFilter.FIND_EDGES).histogram()
+    return sum(hist[EDGE_THRESHOLD:]) / float(sum(hist) or 1)
+
+
+def measure(im: Image.Image) -> Dict[str, float]:
+    """
+    Cheap signals for an upright decoded photo:
+    fine_detail  - share of pixels (at up to SIGNAL_PX) that a half-size copy blurs
+                   away (high = small features only visible up close; a single
+                   sharp edge such as a door frame barely counts)
+    edge_density - share of edge pixels in the half-size copy (high = busy scene)
+    """
+    gray = im.convert("L")
+    scale = SIGNAL_PX / float(max(gray.size))
+    if scale < 1:
+        gray = gray.resize((max(1, int(gray.width * scale)), max(1, int(gray.height * scale))),
+                           Image.Resampling.BILINEAR)
+    half = gray.resize((max(1, gray.width // 2), max(1, gray.height // 2)), Image.Resampling.BOX)
+    fine = _residual_share(gray, half.resize(gray.size, Image.Resampling.BILINEAR))
+    return {"fine_detail": round(fine, 4), "edge_density": round(_edge_density(half), 4)}
+
+
+# ---------------- Tokens and counters ----------------
+def estimate_tokens(width: int, height: int, detail: Optional[str]) -> int:
+    """
+    Image input tokens by the published tile formula: 85 for detail=low;
+    otherwise fit in 2048x2048, scale the short side to 768, then 85 + 170 per
+    512 px tile. "auto" (or no detail) is counted as high, its upper bound.
+    """
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048.0 / max(width, height))
+    w, h = width * scale, height * scale
+    scale = min(1.0, 768.0 / min(w, h))
+    w, h = w * scale, h * scale
+    tiles = -(-int(w) // 512) * -(-int(h) // 512)
+    return 85 + 170 * tiles
+
+
+_lock = threading.Lock()
+_counts: Dict[str, Dict[str, int]] = {}
+
+
+def _entry(pass_name: str) -> Dict:
+    return _counts.setdefault(pass_name, {"images": 0, "bytes": 0, "tokens": 0, "wasted": 0, "tiers": {}})
+
+
+def note_upload(pass_name: str, tier: str, size: int, tokens: int) -> None:
+    with _lock:
+        entry = _entry(pass_name)
+        entry["images"] += 1
+        entry["bytes"] += size
+        entry["tokens"] += tokens
+        entry["tiers"][tier] = entry["tiers"].get(tier, 0) + 1
+
+
+def note_wasted(pass_name: str) -> None:
+    """Count a request that was sent but whose answer was dropped (a speculative nudge that lost)."""
+    with _lock:
+        _entry(pass_name)["wasted"] += 1
+
+
+def upload_stats() -> Dict[str, dict]:
+    """Per pass: images sent, total upload bytes, estimated image tokens, plan tiers and wasted requests."""
+    with _lock:
+        return {name: dict(entry, tiers=dict(entry["tiers"])) for name, entry in _counts.items()}
+
+
+def reset_stats() -> None:
+    with _lock:
+        _counts.clear()
@@ -1,22 +1,34 @@
 # C:\inspection-agent\vision.py
-import os, io, base64, mimetypes, hashlib, re, traceback
+import os, io, json, base64, mimetypes, hashlib, re, time, threading, traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
-from PIL import Image, ImageOps
+from PIL import Image
+
+from vision_cache import VisionCache, DigestMemo, CACHE_DB_NAME
+from quality_gate import PhotoRejected, skipped_analysis
+from analysis_model import Analysis, ANALYSIS_SCHEMA, BATCH_SCHEMA, NO_ISSUES_PHRASES, parse_analysis, response_format
+from image_prep import prepare_image, second_pass_copy
+import tracing
+import upload_policy
 
 # Load .env and sanitize the key for safety
 load_dotenv(override=True)
 if os.getenv("OPENAI_API_KEY"):
     os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY").strip()
 
-client = OpenAI()
+# VISION_BASE_URL points analysis at another OpenAI-compatible endpoint (e.g. the
+# offline stand-in in benchmarks/standin_server.py) without touching OPENAI_BASE_URL
+VISION_BASE_URL = os.getenv("VISION_BASE_URL", "").strip() or None
+
+client = OpenAI(base_url=VISION_BASE_URL)
 
 # ---------------- Tunables (override via .env if desired) ----------------
 # Human-focused inspection instructions - only report what needs fixing
 # Focus on property/structural issues only - ignore tenant belongings
 # Tags issues with responsibility: OWNER (needs repair) or TENANT (needs action from tenant)
-SYSTEM = (
+_GUIDANCE = (
     "You are a property inspector creating a simple report for a PROPERTY OWNER (landlord). "
     "Use very simple, everyday words. Many owners are older or speak English as a second language. "
     "Your job is to find problems with the PROPERTY ITSELF that could COST THE OWNER MONEY - not tenant belongings.\n\n"
@@ -67,7 +79,10 @@ SYSTEM = (
     "- Windows: Dirty = ignore, cracked or broken = [OWNER]\n"
     "- Walls: Small marks = ignore, holes or water damage = [OWNER]\n"
     "- Use simple words everyone can understand\n\n"
+)
 
+# Answer format for VISION_OUTPUT=text (the original free-text report format)
+_TEXT_FORMAT = (
     "IF THERE ARE PROBLEMS, use this format:\n\n"
     "Location: (IMPORTANT: Use ONLY one of these room names: Kitchen, Living Room, Dining Room, "
     "Main Bedroom, Bedroom 2, Bedroom 3, Bedrooms, Main Bathroom, Bathroom, Half Bathroom,"
@@ -86,17 +101,71 @@ SYSTEM = (
     "just say 'Location: [room name]' then 'No repairs needed'. Do NOT comment on tenant's stuff."
 )
 
+# Answer format for VISION_OUTPUT=json; the response schema (analysis_model) enforces the shape
+_JSON_FORMAT = (
+    "ANSWER FORMAT: Fill in the JSON fields.\n"
+    "- location: the room, using ONLY one of the allowed room names\n"
+    "- issues: one entry per problem, with a simple description, responsibility "
+    "(OWNER or TENANT, as explained above) and priority (FIX NOW or FIX SOON)\n"
+    "- actions: simple explanations of how to fix the problems\n\n"
+    "IF THERE ARE NO PROBLEMS: give the location and leave issues and actions empty.\n\n"
+    "IMPORTANT: If the photo only shows tenant belongings, normal rooms, or small marks - "
+    "there are no problems. Do NOT comment on tenant's stuff."
+)
+
+# "json" asks for schema-constrained output; "text" is for models without structured outputs
+VISION_OUTPUT = os.getenv("VISION_OUTPUT", "json").lower()
+TEXT_SYSTEM = _GUIDANCE + _TEXT_FORMAT
+SYSTEM = TEXT_SYSTEM if VISION_OUTPUT == "text" else _GUIDANCE + _JSON_FORMAT
+
 # A focused follow‑up used only when the first pass seems to miss defects.
 SECOND_PASS_NUDGE = (
     "Look again at this photo. Is there any problem with the property that needs fixing? "
     "Report problems that need [OWNER] to hire someone OR [TENANT] can fix themselves (like dirty air filter, slow drain). "
     "Do NOT report tenant belongings, furniture, curtains, bedding, or decorations. "
-    "Tag each problem: [OWNER] or [TENANT], then [FIX NOW] or [FIX SOON]. Otherwise say 'No repairs needed'."
+    + ("Tag each problem: [OWNER] or [TENANT], then [FIX NOW] or [FIX SOON]. Otherwise say 'No repairs needed'."
+       if VISION_OUTPUT == "text" else
+       "Give each problem its responsibility and priority. Otherwise leave issues empty.")
+)
+
+# "sequential" runs the nudge only after a first pass looks empty; "speculative" starts
+# it alongside the first pass for photos whose folder usually needs it, and drops it
+# if the first pass turns out fine.
+SECOND_PASS_POLICY = os.getenv("SECOND_PASS_POLICY", "sequential").lower()
+# A nudge that loses has usually been sent already and is paid for, so speculation is kept to
+# folders where nearly every first pass fires, and to a few requests at a time.
+SPECULATE_MIN_RATE = float(os.getenv("SECOND_PASS_SPECULATE_RATE", "0.8"))  # predicted fire rate to speculate
+SPECULATE_MIN_RUNS = int(os.getenv("SECOND_PASS_MIN_HISTORY", "5"))        # folder history needed before trusting it
+SPECULATE_MAX_INFLIGHT = int(os.getenv("SECOND_PASS_SPECULATE_MAX", "2"))  # speculative nudges at once
+SPECULATE_WORKERS = SPECULATE_MAX_INFLIGHT
+
+# User prompt for the first pass
+FIRST_PASS_PROMPT = "Analyze this property photo and produce concise inspection notes."
+
+# Batch mode: several photos share one request (and one copy of SYSTEM)
+BATCH_PROMPT = (
+    "You will receive {n} property photos. Each one is introduced by a line 'PHOTO k'. "
+    "Analyze every photo separately, in order, using the format above. "
+    + ("Start each photo's notes with its own delimiter line exactly like '=== PHOTO k ===' "
+       if VISION_OUTPUT == "text" else
+       "Return exactly {n} entries in photos, one per photo in the same order, ")
+    + "and do not mix findings between photos."
 )
+VISION_BATCH_SIZE = int(os.getenv("VISION_BATCH_SIZE", "1"))  # >1 enables batch mode in analyze_images
+_BATCH_DELIM_RE = re.compile(r"^[ \t]*=+[ \t]*PHOTO[ \t]+(\d+)[ \t]*=+[ \t]*$", re.I | re.M)
+
+# Streaming reads single-photo answers as they are generated and hangs up as soon as
+# a complete one has arrived, instead of waiting for the model to stop on its own
+VISION_STREAM = os.getenv("VISION_STREAM", "false").lower() == "true"
 
 ANALYSIS_MAX_PX = int(os.getenv("ANALYSIS_MAX_PX", "1000"))  # downscale for faster API response
 CACHE_DIR = Path(os.getenv("ANALYSIS_CACHE_DIR", ".cache"))
 CACHE_DIR.mkdir(exist_ok=True)
+CACHE_MAX_MB = float(os.getenv("VISION_CACHE_MAX_MB", "512"))  # LRU eviction above this size (0 = unbounded)
+
+cache = VisionCache(CACHE_DIR / CACHE_DB_NAME, int(CACHE_MAX_MB * 1024 * 1024))
+digests = DigestMemo(CACHE_DIR / CACHE_DB_NAME)
+cache.import_legacy_dir(CACHE_DIR)  # one-time pickup of the old <sha1>.txt files
 
 
 # ---------------- Image helpers ----------------
@@ -115,57 +184,371 @@ def _data_url_from_bytes(b: bytes, mime: str) -> str:
     return f"data:{mime};base64,{_b64_bytes(b)}"
 
 
+def _image_part(img_bytes: bytes, mime: str, pass_name: str) -> dict:
+    """
+    image_url content part for one upload. With the adaptive upload policy it
+    carries a detail level (low for the 512 px tier, high for the second pass);
+    either way the upload's bytes and estimated tokens are counted.
+    """
+    try:
+        with Image.open(io.BytesIO(img_bytes)) as im:
+            width, height = im.size
+    except Exception:
+        width = height = 0
+    if pass_name == "second pass":
+        detail = "high" if upload_policy.adaptive() else None
+        tier = "high" if detail else "fixed"
+    else:
+        detail = upload_policy.first_pass_detail(width, height)
+        tier = upload_policy.tier_for(width, height, ANALYSIS_MAX_PX)
+    tokens = upload_policy.estimate_tokens(width, height, detail) if width else 0
+    upload_policy.note_upload(pass_name, tier, len(img_bytes), tokens)
+    image_url = {"url": _data_url_from_bytes(img_bytes, mime)}
+    if detail:
+        image_url["detail"] = detail
+    return {"type": "image_url", "image_url": image_url}
+
+
+def _chat_messages(prompt: str, img_bytes: bytes, mime: str, pass_name: str = "first pass") -> list[dict]:
+    """Build the chat messages for one pass over one image."""
+    return [
+        {"role": "system", "content": SYSTEM},
+        {"role": "user", "content": [
+            {"type": "text", "text": prompt},
+            _image_part(img_bytes, mime, pass_name),
+        ]},
+    ]
+
+
+def _second_pass_messages(image_path: Path, img_bytes: bytes, mime: str) -> list[dict]:
+    """
+    Chat messages for the nudge. The adaptive policy escalates to a larger copy
+    here, since the first pass just came back empty; fixed re-sends the same one.
+    """
+    if upload_policy.adaptive():
+        try:
+            with tracing.span("second pass copy", cat="vision", photo=image_path.name):
+                img_bytes, mime = second_pass_copy(image_path)
+        except Exception as e:
+            print(f"[vision] Could not make second-pass copy of {image_path.name}: {e!r}", flush=True)
+    return _chat_messages(SECOND_PASS_NUDGE, img_bytes, mime, "second pass")
+
+
+def _batch_messages(prepared: list[tuple[bytes, str]]) -> list[dict]:
+    """Build one request carrying several images, each preceded by a PHOTO k label."""
+    content = [{"type": "text", "text": BATCH_PROMPT.format(n=len(prepared))}]
+    for k, (img_bytes, mime) in enumerate(prepared, 1):
+        content.append({"type": "text", "text": f"PHOTO {k}"})
+        content.append(_image_part(img_bytes, mime, "first pass"))
+    return [
+        {"role": "system", "content": SYSTEM},
+        {"role": "user", "content": content},
+    ]
+
+
+def _response_kwargs(batch: bool = False) -> dict:
+    """Extra chat.completions arguments asking for schema-constrained JSON (none in text mode)."""
+    if VISION_OUTPUT == "text":
+        return {}
+    if batch:
+        return {"response_format": response_format(BATCH_SCHEMA, "inspection_batch")}
+    return {"response_format": response_format(ANALYSIS_SCHEMA, "inspection_analysis")}
+
+
+def _parse_output(text: str | None) -> Analysis | None:
+    """Parse one model answer (JSON, or free text in text mode); None if it is empty."""
+    if not text or not text.strip():
+        return None
+    return parse_analysis(text)
+
+
+def _split_batch_response(text: str, n: int) -> list[Analysis] | None:
+    """
+    Split a batch answer into one Analysis per photo: the photos array in JSON
+    mode, the '=== PHOTO k ===' delimiters in text mode.
+    Returns None unless every photo 1..n has its own non-empty answer with a location.
+    """
+    if VISION_OUTPUT != "text":
+        try:
+            photos = json.loads(text or "").get("photos")
+            out = [Analysis.from_dict(p) for p in photos if isinstance(p, dict)]
+        except (ValueError, AttributeError, TypeError):
+            return None
+        if len(out) != n or any(not a.location for a in out):
+            return None
+        return out
+
+    parts = _BATCH_DELIM_RE.split(text or "")
+    sections: dict[int, str] = {}
+    for i in range(1, len(parts) - 1, 2):
+        sections[int(parts[i])] = parts[i + 1].strip()
+    out = [sections.get(k, "") for k in range(1, n + 1)]
+    if any(not s or "location" not in s.lower() for s in out):
+        return None
+    return [parse_analysis(s) for s in out]
+
+
+def _vision_model() -> str:
+    return os.getenv("VISION_MODEL", "gpt-5")
+
+
+def _max_completion_tokens() -> int:
+    return int(os.getenv("OPENAI_MAX_TOKENS", "8000"))
+
+
 def _analysis_image_bytes(src: Path) -> tuple[bytes, str]:
     """
     Return (bytes, mime) for a downscaled copy used ONLY for model analysis.
-    The PDF still embeds the original file at full quality elsewhere.
+    The same decode also produces the PDF JPEG (see image_prep), so the
+    original is not decoded again when the report is built.
+    Raises PhotoRejected if the downscaled copy fails the quality gate.
     """
-    mime = _mime_type(src)
-    with Image.open(src) as im:
-        im = ImageOps.exif_transpose(im)
-        w, h = im.size
-        scale = 1.0
-        if max(w, h) > ANALYSIS_MAX_PX:
-            scale = ANALYSIS_MAX_PX / float(max(w, h))
-        if scale < 1.0:
-            im = im.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
-        buf = io.BytesIO()
-        if mime == "image/png":
-            im.save(buf, format="PNG", optimize=True)
-        else:
-            im = im.convert("RGB")
-            im.save(buf, format="JPEG", quality=88, optimize=True)
-            mime = "image/jpeg"
-        return buf.getvalue(), mime
+    with tracing.span("preprocess", cat="vision", photo=src.name):
+        prepared = prepare_image(src, ANALYSIS_MAX_PX, _first_pass_unsure(src))
+    if prepared.rejection is not None:
+        raise prepared.rejection
+    return prepared.analysis, prepared.analysis_mime
 
 
 # ---------------- Disk cache (speed up re-runs) ----------------
-def _cache_key(image_path: Path) -> str:
-    h = hashlib.sha1()
+def _legacy_key_suffix() -> bytes:
+    # The .txt files predate JSON output, so they were keyed by the free-text prompt
+    return (TEXT_SYSTEM + _vision_model() + str(ANALYSIS_MAX_PX)).encode("utf-8")
+
+
+def _cache_key(image_path: Path) -> tuple[str, str | None]:
+    """
+    Return (content digest, legacy key) for an image.
+
+    The content digest comes from the stat-keyed memo, so unchanged photos are
+    not re-read. The legacy key is the old .txt file name,
+    sha1(image + TEXT_SYSTEM + model + max_px), and is only computed while imported
+    .txt entries are still waiting to be promoted.
+    """
+    suffix = _legacy_key_suffix() if cache.legacy_pending else None
     try:
-        h.update(image_path.read_bytes())
-    except Exception:
-        h.update(str(image_path).encode("utf-8"))
-    h.update(SYSTEM.encode("utf-8"))
-    h.update(os.getenv("VISION_MODEL", "gpt-5").encode("utf-8"))
-    h.update(str(ANALYSIS_MAX_PX).encode("utf-8"))
-    return h.hexdigest()
+        with tracing.span("hash", cat="vision", photo=image_path.name):
+            return digests.digest(image_path, suffix)
+    except OSError:
+        return hashlib.blake2b(str(image_path).encode("utf-8"), digest_size=20).hexdigest(), None
 
 
-def _cache_get(image_path: Path) -> str | None:
-    f = CACHE_DIR / f"{_cache_key(image_path)}.txt"
-    if f.exists():
+def _cache_get(image_path: Path, key: tuple[str, str | None] | None = None) -> Analysis | None:
+    """
+    Cached Analysis for an image, or None. Free-text rows written before JSON
+    output (including ones cached under the free-text prompt) are converted
+    here and rewritten as JSON under the current prompt.
+    """
+    digest, legacy_key = key or _cache_key(image_path)
+    try:
+        with tracing.span("cache lookup", cat="vision", photo=image_path.name) as sp:
+            text = cache.get(digest, SYSTEM, _vision_model(), ANALYSIS_MAX_PX, legacy_key=legacy_key,
+                             fallback_prompt=TEXT_SYSTEM if SYSTEM != TEXT_SYSTEM else None)
+            sp.set(result="hit" if text else "miss")
+    except Exception as e:
+        print(f"[vision] Cache read failed for {image_path.name}: {e!r}", flush=True)
+        return None
+    if not text:
+        return None
+    print(f"[vision] CACHE HIT for {image_path.name}", flush=True)
+    analysis = parse_analysis(text)
+    if not text.lstrip().startswith("{"):
         try:
-            text = f.read_text(encoding="utf-8").strip()
-            print(f"[vision] CACHE HIT for {image_path.name}", flush=True)
-            return text
-        except Exception:
-            return None
-    return None
+            _cache_put(image_path, analysis, (digest, legacy_key))
+        except Exception as e:
+            print(f"[vision] Could not convert cached text for {image_path.name}: {e!r}", flush=True)
+    return analysis
+
+
+def _cache_put(image_path: Path, analysis: Analysis, key: tuple[str, str | None] | None = None) -> None:
+    digest, _ = key or _cache_key(image_path)
+    with tracing.span("cache write", cat="vision", photo=image_path.name):
+        cache.put(digest, SYSTEM, _vision_model(), ANALYSIS_MAX_PX, analysis.to_json())
+
+
+def prehash_images(paths) -> int:
+    """Hash many images in parallel ahead of analysis so cache lookups are stat-only."""
+    return digests.prehash(paths, _legacy_key_suffix() if cache.legacy_pending else None)
 
 
-def _cache_put(image_path: Path, text: str) -> None:
-    (CACHE_DIR / f"{_cache_key(image_path)}.txt").write_text(text.strip(), encoding="utf-8")
+def cache_stats() -> dict:
+    """Hit/miss counters for this process plus the size of the store."""
+    return cache.stats()
+
+
+# ---------------- Streaming ----------------
+class AnswerWatcher:
+    """
+    Fed a streamed answer chunk by chunk; feed() returns True once a complete
+    answer has arrived and the rest of the stream can be dropped.
+
+    JSON answers are complete when the top-level object closes. Free-text
+    answers are complete after a "Location:" line followed by a whole
+    "No repairs needed" line, or once "What To Do:" bullets (after at least one
+    issue) are followed by a blank line.
+    """
+
+    def __init__(self, json_mode: bool = True):
+        self.json_mode = json_mode
+        self.complete = False
+        self._buf = []
+        self._size = 0
+        self._end = None          # length of the complete answer, once known
+        # JSON scanner state
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        # Text scanner state
+        self._pending = ""        # text after the last newline
+        self._location = False
+        self._section = None
+        self._issues = 0
+        self._actions = 0
+        self._blank_after_action = False
+
+    @property
+    def text(self) -> str:
+        joined = "".join(self._buf)
+        return joined[:self._end] if self._end is not None else joined
+
+    def feed(self, delta: str) -> bool:
+        if self.complete or not delta:
+            return self.complete
+        offset = self._size
+        self._buf.append(delta)
+        self._size += len(delta)
+        if self.json_mode:
+            self._scan_json(delta, offset)
+        else:
+            self._scan_text(delta, offset)
+        return self.complete
+
+    def _scan_json(self, delta: str, offset: int) -> None:
+        for i, ch in enumerate(delta):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end = offset + i + 1
+                    self.complete = True
+                    return
+
+    def _scan_text(self, delta: str, offset: int) -> None:
+        lines = (self._pending + delta).split("\n")
+        self._pending = lines.pop()
+        end = offset + len(delta) - len(self._pending)
+        for raw in lines:
+            line = raw.strip()
+            lower = line.lower()
+            if not line:
+                if self._section == "actions" and self._actions and self._issues:
+                    self._blank_after_action = True
+                continue
+            if lower.startswith("location:"):
+                self._location = True
+            elif "issues to address" in lower or "potential issues" in lower:
+                self._section = "issues"
+            elif "what to do" in lower or "recommend" in lower:
+                self._section = "actions"
+            elif line.startswith("-"):
+                if self._section == "issues":
+                    self._issues += 1
+                elif self._section == "actions":
+                    self._actions += 1
+            elif (self._location and not self._issues
+                  and lower.rstrip(".!") in NO_ISSUES_PHRASES):
+                self._end, self.complete = end, True
+                return
+        if self._blank_after_action:
+            self._end, self.complete = end, True
+
+
+_stream_lock = threading.Lock()
+_stream_samples = {"ttft": [], "total": []}
+_stream_counts = {"streamed": 0, "stopped_early": 0}
+
+
+def _note_stream(label: str, ttft: float | None, total: float, early: bool) -> None:
+    with _stream_lock:
+        _stream_counts["streamed"] += 1
+        _stream_counts["stopped_early"] += int(early)
+        if ttft is not None:
+            _stream_samples["ttft"].append(ttft)
+        _stream_samples["total"].append(total)
+    first = f"{ttft:.2f}s" if ttft is not None else "none"
+    print(f"[vision] Streamed {label}: first token {first}, total {total:.2f}s"
+          f"{' (stopped early)' if early else ''}", flush=True)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def stream_stats() -> dict:
+    """Time-to-first-token and total latency of streamed requests this process."""
+    with _stream_lock:
+        ttft, total = list(_stream_samples["ttft"]), list(_stream_samples["total"])
+        stats = dict(_stream_counts)
+    stats.update({
+        "ttft_p50_s": _percentile(ttft, 0.50), "ttft_p95_s": _percentile(ttft, 0.95),
+        "total_p50_s": _percentile(total, 0.50), "total_p95_s": _percentile(total, 0.95),
+    })
+    return stats
+
+
+def _stream_text(messages: list[dict], label: str) -> str | None:
+    """Stream one single-photo request, stopping once the answer is complete."""
+    watcher = AnswerWatcher(json_mode=VISION_OUTPUT != "text")
+    started = time.perf_counter()
+    ttft = None
+    early = False
+    stream = client.chat.completions.create(
+        model=_vision_model(),
+        messages=messages,
+        max_completion_tokens=_max_completion_tokens(),
+        stream=True,
+        **_response_kwargs(),
+    )
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            if watcher.feed(delta):
+                early = True
+                break
+    finally:
+        stream.close()  # hangs up on the rest of the generation
+    _note_stream(label, ttft, time.perf_counter() - started, early)
+    return watcher.text
+
+
+def _request_text(messages: list[dict], label: str) -> str | None:
+    """Answer text for one single-photo request (streamed if VISION_STREAM)."""
+    if VISION_STREAM:
+        return _stream_text(messages, label)
+    resp = client.chat.completions.create(
+        model=_vision_model(),
+        messages=messages,
+        max_completion_tokens=_max_completion_tokens(),
+        **_response_kwargs(),
+    )
+    return resp.choices[0].message.content
 
 
 # ---------------- Heuristics to detect a weak first pass ----------------
@@ -176,85 +559,310 @@ _DEFECT_WORDS_RE = re.compile(
     re.I,
 )
 
-def _looks_empty_or_safe(text: str) -> bool:
+def _looks_empty_or_safe(analysis: Analysis | None) -> bool:
     """Return True if the model output likely missed all problems."""
-    if not text or not text.strip():
-        return True
-    s = text.lower()
-    # Check for both old and new section names
-    # No issues section AND no classic defect words anywhere
-    if ("issues to address" not in s and "potential issues" not in s) and not _DEFECT_WORDS_RE.search(s):
+    if analysis is None:
         return True
-    # If it says "no repairs needed" or similar, that's fine
-    if "no repairs needed" in s or "no issues" in s:
-        return False  # This is a valid response, not empty
-    return False
+    # No issues AND no classic defect words in free text (text-mode answers)
+    return not analysis.issues and not _DEFECT_WORDS_RE.search(analysis.note)
 
 
-# ---------------- Public API ----------------
-def describe_image(image_path: Path) -> str:
+# ---------------- Second-pass prediction and counters ----------------
+_second_pass_lock = threading.Lock()
+_second_pass_counts = {"first_passes": 0, "fired": 0, "speculated": 0,
+                       "speculation_used": 0, "speculation_cancelled": 0, "speculation_wasted": 0,
+                       "speculation_failed": 0, "saved_s": 0.0}
+_speculation_pool = None
+_speculation_slots = threading.BoundedSemaphore(max(1, SPECULATE_MAX_INFLIGHT))
+
+
+def _history_scope(image_path: Path) -> str:
+    return image_path.parent.name.lower() or "*"
+
+
+def _second_pass_rate(image_path: Path) -> float | None:
     """
-    Analyze one image with the model and return notes as text.
-    Uses downscaled copy for speed but leaves PDF quality untouched.
-    Caches results on disk for instant re-runs.
+    Smoothed share of first passes that looked empty for photos in the same folder
+    (all photos until the folder has SPECULATE_MIN_RUNS of history); None without
+    enough history.
+    """
+    try:
+        runs, fired = cache.second_pass_history(_history_scope(image_path))
+        if runs < SPECULATE_MIN_RUNS:
+            runs, fired = cache.second_pass_history("*")
+    except Exception:
+        return None
+    if runs < SPECULATE_MIN_RUNS:
+        return None
+    return (fired + 1) / (runs + 2)
 
-    Diagnostics: prints whether API or cache was used, and any API errors.
+
+def _predict_second_pass(image_path: Path) -> bool:
+    """Cheap guess at whether this photo's first pass will look empty."""
+    rate = _second_pass_rate(image_path)
+    return rate is not None and rate >= SPECULATE_MIN_RATE
+
+
+def _first_pass_unsure(image_path: Path) -> bool:
+    """Adaptive uploads: whether first passes in this folder are unsure enough to send more pixels."""
+    if not upload_policy.adaptive():
+        return False
+    rate = _second_pass_rate(image_path)
+    return rate is not None and rate >= upload_policy.UNSURE_RATE
+
+
+def _should_speculate(image_path: Path) -> bool:
+    """
+    Whether to start this photo's nudge now. True takes one of the
+    SPECULATE_MAX_INFLIGHT slots; call _end_speculation once the nudge is done
+    or cancelled.
+    """
+    if SECOND_PASS_POLICY != "speculative" or SPECULATE_MAX_INFLIGHT <= 0:
+        return False
+    if not _predict_second_pass(image_path):
+        return False
+    return _speculation_slots.acquire(blocking=False)
+
+
+def _end_speculation(*_) -> None:
+    _speculation_slots.release()
+
+
+def _note_second_pass(image_path: Path, fired: bool) -> None:
+    """Count one first pass (and whether it fired) and feed the predictor's history."""
+    with _second_pass_lock:
+        _second_pass_counts["first_passes"] += 1
+        _second_pass_counts["fired"] += int(fired)
+    try:
+        cache.record_second_pass(_history_scope(image_path), fired)
+    except Exception as e:
+        print(f"[vision] Could not record second-pass history: {e!r}", flush=True)
+
+
+def _note_speculation(used: bool, saved_s: float = 0.0, wasted: bool = False, failed: bool = False) -> None:
     """
+    Count one speculative nudge: used, cancelled before it was sent, sent and
+    dropped (wasted), or needed but errored (failed, a failed second pass).
+    """
+    with _second_pass_lock:
+        _second_pass_counts["speculated"] += 1
+        if failed:
+            _second_pass_counts["speculation_failed"] += 1
+        elif used:
+            _second_pass_counts["speculation_used"] += 1
+            _second_pass_counts["saved_s"] += max(0.0, saved_s)
+        elif wasted:
+            _second_pass_counts["speculation_wasted"] += 1
+        else:
+            _second_pass_counts["speculation_cancelled"] += 1
+    if wasted:
+        upload_policy.note_wasted("second pass")
+
+
+def second_pass_stats() -> dict:
+    """How often the nudge fired this process and what speculation saved."""
+    with _second_pass_lock:
+        return dict(_second_pass_counts)
+
+
+def _speculation_executor() -> ThreadPoolExecutor:
+    global _speculation_pool
+    if _speculation_pool is None:
+        with _second_pass_lock:
+            if _speculation_pool is None:
+                _speculation_pool = ThreadPoolExecutor(max_workers=SPECULATE_WORKERS,
+                                                       thread_name_prefix="vision-nudge")
+    return _speculation_pool
+
+
+def _timed_second_pass(image_path: Path, img_bytes: bytes, mime: str) -> tuple[Analysis | None, float]:
+    started = time.perf_counter()
+    out = _second_pass(image_path, img_bytes, mime)
+    return out, time.perf_counter() - started
+
+
+# ---------------- Public API ----------------
+def _second_pass(image_path: Path, img_bytes: bytes, mime: str) -> Analysis | None:
+    """Run the defect-focused nudge for one image and return its answer (None if empty)."""
+    print(f"[vision] Second pass nudge for {image_path.name}", flush=True)
+    with tracing.span("second pass", cat="vision", photo=image_path.name):
+        return _parse_output(_request_text(_second_pass_messages(image_path, img_bytes, mime), image_path.name))
+
+
+def _combine_passes(first: Analysis | None, second: Analysis | None) -> Analysis | None:
+    """Take the nudge's answer if it found something, keeping the first pass's location."""
+    if second is None or (first is not None and not second.issues and not second.note):
+        return first
+    if first is not None and not second.location:
+        second.location = first.location
+    return second
+
+
+def _require_api_key() -> None:
     # Sanity: key present?
     key = os.getenv("OPENAI_API_KEY", "").strip()
     if not key:
         raise RuntimeError("OPENAI_API_KEY is missing or empty in .env")
 
-    cached = _cache_get(image_path)
-    if cached:
-        return cached
 
-    model = os.getenv("VISION_MODEL", "gpt-5")
-    img_bytes, mime = _analysis_image_bytes(image_path)
+def describe_image(image_path: Path) -> Analysis:
+    """
+    Analyze one image with the model and return its parsed Analysis.
+    Uses downscaled copy for speed but leaves PDF quality untouched.
+    Caches results on disk for instant re-runs.
+
+    Diagnostics: prints whether API or cache was used, and any API errors.
+    """
+    _require_api_key()
+
+    with tracing.span("describe_image", cat="vision", photo=image_path.name):
+        key = _cache_key(image_path)
+        cached = _cache_get(image_path, key)
+        if cached:
+            return cached
+
+        try:
+            img_bytes, mime = _analysis_image_bytes(image_path)
+        except PhotoRejected as e:
+            print(f"[vision] Quality gate: skipping {image_path.name} ({e.reason})", flush=True)
+            return skipped_analysis(e.reason)
+
+        return describe_prepared(image_path, img_bytes, mime, key)
+
+
+def describe_prepared(image_path: Path, img_bytes: bytes, mime: str,
+                      key: tuple[str, str | None] | None = None) -> Analysis:
+    """
+    The API half of describe_image, for callers that already made the analysis
+    copy (e.g. the preprocessing pipeline). Runs both passes and caches the result.
+    """
+    model = _vision_model()
+
+    # Speculative policy: start the nudge now for photos likely to need it
+    nudge = None
+    if _should_speculate(image_path):
+        try:
+            nudge = _speculation_executor().submit(_timed_second_pass, image_path, img_bytes, mime)
+        except Exception:
+            _end_speculation()
+            raise
+        nudge.add_done_callback(_end_speculation)  # also runs when cancelled
 
     try:
         # ---------- First pass ----------
         print(f"[vision] Calling model={model} for {image_path.name}", flush=True)
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM},
-                {"role": "user", "content": [
-                    {"type": "text", "text": "Analyze this property photo and produce concise inspection notes."},
-                    {"type": "image_url", "image_url": {"url": _data_url_from_bytes(img_bytes, mime)}},
-                ]},
-            ],
-            max_completion_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "8000")),
-        )
-        out = (resp.choices[0].message.content or "").strip()
+        started = time.perf_counter()
+        with tracing.span("first pass", cat="vision", photo=image_path.name):
+            out = _parse_output(_request_text(_chat_messages(FIRST_PASS_PROMPT, img_bytes, mime), image_path.name))
+        first_s = time.perf_counter() - started
 
         # ---------- Second pass (defect-focused) if needed ----------
-        if _looks_empty_or_safe(out):
-            print(f"[vision] Second pass nudge for {image_path.name}", flush=True)
-            resp2 = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": SYSTEM},
-                    {"role": "user", "content": [
-                        {"type": "text", "text": SECOND_PASS_NUDGE},
-                        {"type": "image_url", "image_url": {"url": _data_url_from_bytes(img_bytes, mime)}},
-                    ]},
-                ],
-                max_completion_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "8000")),
-            )
-            out2 = (resp2.choices[0].message.content or "").strip()
-            if out2:
-                out = out2
-
-        if not out:
+        fired = _looks_empty_or_safe(out)
+        _note_second_pass(image_path, fired)
+        if fired and nudge is not None:
+            speculative, nudge = nudge, None  # awaited from here on, so never counted as wasted
+            try:
+                out2, nudge_s = speculative.result()
+            except Exception:
+                _note_speculation(False, failed=True)
+                raise
+            # Sequential would have cost first_s + nudge_s
+            _note_speculation(True, first_s + nudge_s - (time.perf_counter() - started))
+            out = _combine_passes(out, out2)
+        elif fired:
+            out = _combine_passes(out, _second_pass(image_path, img_bytes, mime))
+
+        if out is None:
             print("[vision] WARNING: Model returned no output_text; not caching.", flush=True)
-            return "No visible issues."
+            return Analysis()
 
-        _cache_put(image_path, out)
+        _cache_put(image_path, out, key)
         return out
 
     except Exception as e:
         print("[vision] API ERROR:", repr(e), flush=True)
         traceback.print_exc()
         # Do not cache fallback; allow future retries
-        return "No visible issues."
+        return Analysis()
+
+    finally:
+        if nudge is not None:
+            # First pass was fine (or failed): the speculative nudge lost. One that
+            # already started can't be aborted here; it is paid for and its answer dropped.
+            _note_speculation(False, wasted=not nudge.cancel())
+
+
+def describe_images_batch(image_paths: list[Path]) -> dict[str, Analysis]:
+    """
+    Analyze several images (typically consecutive shots of one room) in a single
+    request. Returns {str(path): analysis}. Each answer is cached under its own
+    image's key, cached images are never re-sent, and if the combined answer
+    can't be split back into one section per photo every image falls back to
+    a single-image request (describe_prepared, with the key and analysis copy
+    already made here, so nothing is looked up or decoded twice).
+    """
+    _require_api_key()
+
+    results: dict[str, Analysis] = {}
+    pending = []  # (image_path, key, img_bytes, mime)
+    for image_path in image_paths:
+        key = _cache_key(image_path)
+        cached = _cache_get(image_path, key)
+        if cached:
+            results[str(image_path)] = cached
+            continue
+        try:
+            img_bytes, mime = _analysis_image_bytes(image_path)
+        except PhotoRejected as e:
+            print(f"[vision] Quality gate: skipping {image_path.name} ({e.reason})", flush=True)
+            results[str(image_path)] = skipped_analysis(e.reason)
+            continue
+        pending.append((image_path, key, img_bytes, mime))
+
+    if len(pending) <= 1:
+        for image_path, key, img_bytes, mime in pending:
+            results[str(image_path)] = describe_prepared(image_path, img_bytes, mime, key)
+        return results
+
+    sections = None
+    batch_error = None
+    try:
+        names = ", ".join(p.name for p, _, _, _ in pending)
+        print(f"[vision] Calling model={_vision_model()} for batch of {len(pending)}: {names}", flush=True)
+        with tracing.span("batch pass", cat="vision", photos=len(pending)):
+            resp = client.chat.completions.create(
+                model=_vision_model(),
+                messages=_batch_messages([(img_bytes, mime) for _, _, img_bytes, mime in pending]),
+                max_completion_tokens=_max_completion_tokens() * len(pending),
+                **_response_kwargs(batch=True),
+            )
+            sections = _split_batch_response(resp.choices[0].message.content or "", len(pending))
+    except Exception as e:
+        batch_error = e
+        print("[vision] API ERROR (batch):", repr(e), flush=True)
+
+    if sections is None:
+        if batch_error is not None:
+            print(f"[vision] Batch of {len(pending)} failed ({batch_error!r}); falling back to single-image calls",
+                  flush=True)
+        else:
+            print(f"[vision] Batch of {len(pending)} could not be split per photo; "
+                  f"falling back to single-image calls", flush=True)
+        for image_path, key, img_bytes, mime in pending:
+            results[str(image_path)] = describe_prepared(image_path, img_bytes, mime, key)
+        return results
+
+    for (image_path, key, img_bytes, mime), out in zip(pending, sections):
+        try:
+            fired = _looks_empty_or_safe(out)
+            _note_second_pass(image_path, fired)
+            if fired:
+                out = _combine_passes(out, _second_pass(image_path, img_bytes, mime))
+            _cache_put(image_path, out, key)
+            results[str(image_path)] = out
+        except Exception as e:
+            print("[vision] API ERROR:", repr(e), flush=True)
+            traceback.print_exc()
+            # Unverified first-pass answer: use it for this report, but don't cache it; allow future retries
+            results[str(image_path)] = out
+    return results
@@ -0,0 +1,340 @@
+# vision_async.py - asyncio engine for analyze_images
+# Same prompts, cache and second-pass heuristics as vision.describe_image,
+# but driven by AsyncOpenAI with an adaptive rate limiter and pooled connections.
+import os, re, time, asyncio, random, threading, traceback, concurrent.futures
+from pathlib import Path
+from typing import Callable, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError, APIStatusError, APIConnectionError, APITimeoutError
+
+import tracing
+import vision
+from analysis_model import Analysis
+
+# ---------------- Tunables (override via .env if desired) ----------------
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_ANALYSIS_CONCURRENCY", "16"))
+VISION_RPM = float(os.getenv("VISION_RPM", "300"))  # starting guess until rate-limit headers arrive
+VISION_MAX_RETRIES = int(os.getenv("VISION_MAX_RETRIES", "6"))
+WARMUP_CONNECTIONS = int(os.getenv("VISION_WARMUP_CONNECTIONS", "4"))
+REQUEST_TIMEOUT = float(os.getenv("VISION_REQUEST_TIMEOUT", "120"))
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse reset/retry values such as '20ms', '1.5s', '6m0s' or '2' into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+
+
+def _header_int(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------- Adaptive rate limiter ----------------
+class TokenBucket:
+    """
+    Request token bucket shared by all in-flight analyses.
+
+    The refill rate starts at VISION_RPM and follows the server: it is capped by
+    x-ratelimit-limit-requests, pauses until x-ratelimit-reset-requests when the
+    remaining budget hits zero, halves on every 429 and creeps back up on success.
+    """
+
+    def __init__(self, requests_per_minute: float = VISION_RPM, burst: int = ASYNC_CONCURRENCY):
+        self.rate = max(requests_per_minute / 60.0, 0.1)  # tokens per second
+        self.max_rate = self.rate
+        self.min_rate = 0.1
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0  # number of 429s seen
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def observe(self, headers) -> None:
+        """Adjust to x-ratelimit-* headers from a successful response."""
+        now = time.monotonic()
+        limit = _header_int(headers, "x-ratelimit-limit-requests")
+        remaining = _header_int(headers, "x-ratelimit-remaining-requests")
+        reset = _parse_duration(headers.get("x-ratelimit-reset-requests"))
+        if limit:
+            self.max_rate = limit / 60.0
+            if remaining and reset:
+                # Spending the remaining budget before the window resets is fine
+                self.max_rate = max(self.max_rate, remaining / max(reset, 0.001))
+        # Additive increase after a clean response
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+        if remaining is not None:
+            self._refill(now)
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining == 0 and reset:
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+    def throttle(self, headers=None) -> float:
+        """Back off after a 429 and return the pause in seconds."""
+        now = time.monotonic()
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        self.updated = now
+        pause = None
+        if headers is not None:
+            pause = (_parse_duration(headers.get("retry-after-ms")) or 0) / 1000.0 or None
+            pause = pause or _parse_duration(headers.get("retry-after"))
+            pause = pause or _parse_duration(headers.get("x-ratelimit-reset-requests"))
+        if not pause:
+            pause = min(30.0, 1.0 * 2 ** min(self.throttled, 5))
+        pause += random.uniform(0, 0.25)
+        self.blocked_until = max(self.blocked_until, now + pause)
+        return pause
+
+
+# ---------------- Engine ----------------
+class AsyncVisionEngine:
+    """
+    Owns an event loop on a background thread so it can be used from the
+    synchronous report pipeline. Call warm_up() early (before scanning the
+    photos) so pooled keep-alive connections are open when analysis starts.
+    """
+
+    def __init__(self, concurrency: int = ASYNC_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="vision-async", daemon=True)
+        self._thread.start()
+        self.client = AsyncOpenAI(
+            base_url=vision.VISION_BASE_URL,
+            max_retries=0,  # retries are handled here so the limiter sees every 429
+            timeout=REQUEST_TIMEOUT,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=self.concurrency,
+                                    max_keepalive_connections=self.concurrency),
+            ),
+        )
+        self.limiter = TokenBucket(burst=self.concurrency)
+        self._warmup = None
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    # ----- connection warm-up -----
+    def warm_up(self, connections: int = WARMUP_CONNECTIONS) -> None:
+        """Open keep-alive connections in the background; returns immediately."""
+        if self._warmup is None and connections > 0:
+            self._warmup = asyncio.run_coroutine_threadsafe(self._warm_up(connections), self.loop)
+
+    async def _warm_up(self, connections: int) -> None:
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[self.client.models.with_raw_response.list() for _ in range(min(connections, self.concurrency))],
+            return_exceptions=True,
+        )
+        ok = sum(1 for r in results if not isinstance(r, Exception))
+        print(f"[vision] Warmed {ok}/{len(results)} connections in {time.perf_counter() - started:.2f}s", flush=True)
+
+    # ----- requests -----
+    async def _complete(self, messages: list[dict], label: str) -> Optional[Analysis]:
+        last_error = None
+        for attempt in range(VISION_MAX_RETRIES + 1):
+            await self.limiter.acquire()
+            try:
+                started = time.perf_counter()
+                raw = await self.client.chat.completions.with_raw_response.create(
+                    model=vision._vision_model(),
+                    messages=messages,
+                    max_completion_tokens=vision._max_completion_tokens(),
+                    stream=vision.VISION_STREAM,
+                    **vision._response_kwargs(),
+                )
+                self.limiter.observe(raw.headers)
+                if vision.VISION_STREAM:
+                    return vision._parse_output(await self._read_stream(raw.parse(), label, started))
+                resp = raw.parse()
+                return vision._parse_output(resp.choices[0].message.content)
+            except RateLimitError as e:
+                pause = self.limiter.throttle(e.response.headers)
+                print(f"[vision] 429 for {label}; backing off {pause:.1f}s", flush=True)
+                last_error = e
+            except (APIConnectionError, APITimeoutError) as e:
+                last_error = e
+                await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt))
+            except APIStatusError as e:
+                if e.status_code < 500:
+                    raise
+                last_error = e
+                await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt))
+        raise last_error
+
+    async def _read_stream(self, stream, label: str, started: float) -> Optional[str]:
+        """Async equivalent of vision._stream_text's read loop."""
+        watcher = vision.AnswerWatcher(json_mode=vision.VISION_OUTPUT != "text")
+        ttft = None
+        early = False
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                if watcher.feed(delta):
+                    early = True
+                    break
+        finally:
+            await stream.close()
+        vision._note_stream(label, ttft, time.perf_counter() - started, early)
+        return watcher.text
+
+    async def describe_image(self, image_path: Path) -> Analysis:
+        """Async equivalent of vision.describe_image."""
+        with tracing.span("describe_image", cat="vision", track=image_path.name):
+            key = await asyncio.to_thread(vision._cache_key, image_path)
+            cached = await asyncio.to_thread(vision._cache_get, image_path, key)
+            if cached:
+                return cached
+
+            try:
+                img_bytes, mime = await asyncio.to_thread(vision._analysis_image_bytes, image_path)
+            except vision.PhotoRejected as e:
+                print(f"[vision] Quality gate: skipping {image_path.name} ({e.reason})", flush=True)
+                return vision.skipped_analysis(e.reason)
+            return await self.describe_prepared(image_path, img_bytes, mime, key)
+
+    async def describe_prepared(self, image_path: Path, img_bytes: bytes, mime: str, key) -> Analysis:
+        """Async equivalent of vision.describe_prepared."""
+        nudge = None
+        sent = []  # filled once the speculative request goes out
+        if await asyncio.to_thread(vision._should_speculate, image_path):
+            nudge = asyncio.create_task(self._timed_nudge(image_path, img_bytes, mime, sent))
+            nudge.add_done_callback(vision._end_speculation)  # also runs when cancelled
+        try:
+            print(f"[vision] Calling model={vision._vision_model()} for {image_path.name}", flush=True)
+            started = time.perf_counter()
+            with tracing.span("first pass", cat="vision", track=image_path.name):
+                out = await self._complete(vision._chat_messages(vision.FIRST_PASS_PROMPT, img_bytes, mime), image_path.name)
+            first_s = time.perf_counter() - started
+
+            fired = vision._looks_empty_or_safe(out)
+            await asyncio.to_thread(vision._note_second_pass, image_path, fired)
+            if fired:
+                if nudge is not None:
+                    speculative, nudge = nudge, None  # awaited from here on, so never counted as wasted
+                    try:
+                        out2, nudge_s = await speculative
+                    except Exception:
+                        vision._note_speculation(False, failed=True)
+                        raise
+                    vision._note_speculation(True, first_s + nudge_s - (time.perf_counter() - started))
+                else:
+                    print(f"[vision] Second pass nudge for {image_path.name}", flush=True)
+                    with tracing.span("second pass", cat="vision", track=image_path.name):
+                        messages = await asyncio.to_thread(vision._second_pass_messages, image_path, img_bytes, mime)
+                        out2 = await self._complete(messages, image_path.name)
+                out = vision._combine_passes(out, out2)
+
+            if out is None:
+                print("[vision] WARNING: Model returned no output_text; not caching.", flush=True)
+                return Analysis()
+
+            await asyncio.to_thread(vision._cache_put, image_path, out, key)
+            return out
+
+        except Exception as e:
+            print("[vision] API ERROR:", repr(e), flush=True)
+            traceback.print_exc()
+            # Do not cache fallback; allow future retries
+            return Analysis()
+
+        finally:
+            if nudge is not None:
+                # The first pass was good enough: abort the speculative request
+                # (its upload is still paid for once it was sent)
+                nudge.cancel()
+                vision._note_speculation(False, wasted=bool(sent))
+
+    async def _timed_nudge(self, image_path: Path, img_bytes: bytes, mime: str,
+                           sent: list) -> tuple[Optional[Analysis], float]:
+        started = time.perf_counter()
+        print(f"[vision] Speculative second pass for {image_path.name}", flush=True)
+        with tracing.span("second pass", cat="vision", track=image_path.name, speculative=True):
+            messages = await asyncio.to_thread(vision._second_pass_messages, image_path, img_bytes, mime)
+            sent.append(True)
+            out = await self._complete(messages, image_path.name)
+        return out, time.perf_counter() - started
+
+    async def _analyze_all(self, images: list[Path], on_start: Optional[Callable[[Path], None]],
+                           on_result: Optional[Callable[[str, Analysis], None]] = None) -> dict[str, Analysis]:
+        if self._warmup is not None:
+            await asyncio.wrap_future(self._warmup)
+        slots = asyncio.Semaphore(self.concurrency)
+        results: dict[str, Analysis] = {}
+
+        async def one(img_path: Path) -> None:
+            async with slots:
+                if on_start:
+                    on_start(img_path)
+                try:
+                    results[str(img_path)] = await self.describe_image(img_path)
+                except Exception as e:
+                    print(f"  Error analyzing {img_path.name}: {e}")
+                    results[str(img_path)] = Analysis.failed(str(e))
+                if on_result:
+                    on_result(str(img_path), results[str(img_path)])
+
+        await asyncio.gather(*[one(p) for p in images])
+        return results
+
+    def submit_prepared(self, image_path: Path, img_bytes: bytes, mime: str, key) -> "concurrent.futures.Future":
+        """Schedule describe_prepared from another thread; returns a concurrent future."""
+        return asyncio.run_coroutine_threadsafe(self._describe_prepared_when_warm(image_path, img_bytes, mime, key), self.loop)
+
+    async def _describe_prepared_when_warm(self, image_path: Path, img_bytes: bytes, mime: str, key) -> Analysis:
+        if self._warmup is not None:
+            await asyncio.wrap_future(self._warmup)
+        return await self.describe_prepared(image_path, img_bytes, mime, key)
+
+    def analyze(self, images: list[Path], on_start: Optional[Callable[[Path], None]] = None,
+                on_result: Optional[Callable[[str, Analysis], None]] = None) -> dict[str, Analysis]:
+        """Analyze all images; blocks the calling thread until done. on_result runs on the loop thread."""
+        vision._require_api_key()
+        return self._run(self._analyze_all(images, on_start, on_result))
+
+    def close(self) -> None:
+        try:
+            self._run(self.client.close())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
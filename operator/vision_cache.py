@@ -0,0 +1,393 @@
+# vision_cache.py - single-file SQLite store for vision analyses
+# Replaces the flat .cache/<sha1>.txt files. One row per (image digest, prompt,
+# model, ANALYSIS_MAX_PX) so a prompt or model change never touches old rows.
+# Also holds the (device, inode, size, mtime) -> content digest memo.
+import os, time, sqlite3, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+CACHE_DB_NAME = "vision.sqlite3"
+EVICT_EVERY = 32  # puts between size checks
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    digest     TEXT    NOT NULL,
+    prompt     TEXT    NOT NULL,   -- sha1 of the SYSTEM prompt (full text in prompts)
+    model      TEXT    NOT NULL,
+    max_px     INTEGER NOT NULL,
+    text       TEXT    NOT NULL,
+    size       INTEGER NOT NULL,
+    created_at REAL    NOT NULL,
+    last_used  REAL    NOT NULL,
+    PRIMARY KEY (digest, prompt, model, max_px)
+);
+CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used);
+CREATE TABLE IF NOT EXISTS prompts (
+    hash TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS legacy (
+    key  TEXT PRIMARY KEY,             -- old sha1(image + SYSTEM + model + max_px) file name
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_digests (
+    path     TEXT    PRIMARY KEY,
+    dev      INTEGER NOT NULL,
+    ino      INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest   TEXT    NOT NULL,      -- blake2b-160 of the file content
+    legacy   TEXT                   -- old .txt cache key, only filled while legacy entries await promotion
+);
+CREATE TABLE IF NOT EXISTS second_pass_history (
+    scope TEXT    PRIMARY KEY,      -- lowercased photo folder name, or '*' for all photos
+    runs  INTEGER NOT NULL,
+    fired INTEGER NOT NULL          -- first passes that looked empty and needed the nudge
+);
+"""
+
+HASH_CHUNK = 1024 * 1024
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(8, (os.cpu_count() or 4)))))
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+
+class _SQLiteStore:
+    """Per-thread WAL connections onto one database file."""
+
+    SCHEMA = _SCHEMA
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _write(self):
+        return _Transaction(self._conn())
+
+    def _count(self, sql: str, args: tuple = ()) -> int:
+        return self._conn().execute(sql, args).fetchone()[0] or 0
+
+
+class VisionCache(_SQLiteStore):
+    """
+    SQLite (WAL) cache of analysis text, safe to share between threads and
+    between processes (CLI runs and the operator UI).
+
+    Writes happen in BEGIN IMMEDIATE transactions, reads refresh last_used so
+    eviction drops the least recently used rows once the store exceeds max_bytes
+    (checked every EVICT_EVERY writes).
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 0):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._stats_lock = threading.Lock()
+        self._legacy_pending = self._count("SELECT COUNT(*) FROM legacy") > 0
+
+    # ----- lookups -----
+    def get(self, digest: str, prompt_text: str, model: str, max_px: int,
+            legacy_key: Optional[str] = None, fallback_prompt: Optional[str] = None) -> Optional[str]:
+        """
+        Look up one analysis. If it is missing, a row cached under fallback_prompt
+        (a previous prompt whose answers are still usable) is returned instead.
+        Failing that, if legacy_key names an imported .txt entry, that entry is
+        promoted into the analyses table and returned.
+        """
+        conn = self._conn()
+        p_hash = prompt_hash(prompt_text)
+        query = "SELECT text FROM analyses WHERE digest=? AND prompt=? AND model=? AND max_px=?"
+        row = conn.execute(query, (digest, p_hash, model, max_px)).fetchone()
+        if row is None and fallback_prompt:
+            p_hash = prompt_hash(fallback_prompt)
+            row = conn.execute(query, (digest, p_hash, model, max_px)).fetchone()
+        text = row[0] if row else None
+        if text is None and legacy_key and self._legacy_pending:
+            text = self._take_legacy(legacy_key)
+            if text is not None:
+                self.put(digest, prompt_text, model, max_px, text)
+        with self._stats_lock:
+            if text is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if row:
+            try:
+                conn.execute(
+                    "UPDATE analyses SET last_used=? WHERE digest=? AND prompt=? AND model=? AND max_px=?",
+                    (time.time(), digest, p_hash, model, max_px),
+                )
+            except sqlite3.OperationalError:
+                pass  # LRU bookkeeping only; never fail a hit over it
+        return text
+
+    def put(self, digest: str, prompt_text: str, model: str, max_px: int, text: str) -> None:
+        now = time.time()
+        p_hash = prompt_hash(prompt_text)
+        with self._write() as conn:
+            conn.execute("INSERT OR IGNORE INTO prompts (hash, text) VALUES (?, ?)", (p_hash, prompt_text))
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (digest, prompt, model, max_px, text, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, p_hash, model, max_px, text, len(text.encode("utf-8")), now, now),
+            )
+        with self._stats_lock:
+            self._puts += 1
+            check = self._puts % EVICT_EVERY == 0
+        if check and self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least recently used rows until the store fits in max_bytes. Returns rows removed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        if not limit:
+            return 0
+        with self._write() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+            if total <= limit:
+                return 0
+            # Walk the last_used index only as far as needed, then drop those rows in one statement
+            doomed = []
+            for rowid, size in conn.execute("SELECT rowid, size FROM analyses ORDER BY last_used"):
+                if total <= limit:
+                    break
+                doomed.append(rowid)
+                total -= size
+            conn.executemany("DELETE FROM analyses WHERE rowid=?", ((r,) for r in doomed))
+            return len(doomed)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analyses").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+            "legacy_entries": self._count("SELECT COUNT(*) FROM legacy"),
+        }
+
+    # ----- second-pass history (feeds the speculative nudge predictor) -----
+    def record_second_pass(self, scope: str, fired: bool) -> None:
+        with self._write() as conn:
+            for key in (scope, "*"):
+                conn.execute(
+                    "INSERT INTO second_pass_history (scope, runs, fired) VALUES (?, 1, ?) "
+                    "ON CONFLICT(scope) DO UPDATE SET runs = runs + 1, fired = fired + excluded.fired",
+                    (key, int(fired)),
+                )
+
+    def second_pass_history(self, scope: str) -> tuple[int, int]:
+        """Return (runs, fired) recorded for a scope."""
+        row = self._conn().execute(
+            "SELECT runs, fired FROM second_pass_history WHERE scope=?", (scope,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+
+    # ----- legacy .txt cache -----
+    @property
+    def legacy_pending(self) -> bool:
+        """True while imported .txt entries still wait for their image to be seen."""
+        return self._legacy_pending
+
+    def _take_legacy(self, key: str) -> Optional[str]:
+        """Pop an imported .txt entry by its old file name key."""
+        with self._write() as conn:
+            row = conn.execute("SELECT text FROM legacy WHERE key=?", (key,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM legacy WHERE key=?", (key,))
+            if conn.execute("SELECT 1 FROM legacy LIMIT 1").fetchone() is None:
+                self._legacy_pending = False  # all promoted; later misses skip the legacy table
+        return row[0] if row else None
+
+    def import_legacy_dir(self, cache_dir: Path) -> int:
+        """
+        One-time import of <sha1>.txt files from the old flat cache directory.
+
+        The old keys hashed the prompt/model/max_px together with the image, so
+        they cannot be split into columns up front; rows are parked in the legacy
+        table and promoted the first time the matching image is looked up.
+        """
+        cache_dir = Path(cache_dir)
+        conn = self._conn()
+        if conn.execute("SELECT value FROM meta WHERE key='legacy_imported'").fetchone():
+            return 0
+        rows = []
+        for f in cache_dir.glob("*.txt") if cache_dir.is_dir() else []:
+            try:
+                rows.append((f.stem, f.read_text(encoding="utf-8").strip()))
+            except Exception:
+                continue
+        with self._write() as conn:
+            conn.executemany("INSERT OR IGNORE INTO legacy (key, text) VALUES (?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(time.time()),))
+            count = len(rows)
+        self._legacy_pending = self._legacy_pending or count > 0
+        if count:
+            print(f"[vision] Imported {count} legacy cache files from {cache_dir}", flush=True)
+        return count
+
+
+class DigestMemo(_SQLiteStore):
+    """
+    Persistent (device, inode, size, mtime) -> content digest memo.
+
+    A re-run over unchanged photos costs one stat() and one indexed lookup per
+    file instead of reading and hashing every byte again. Misses are hashed in
+    1 MB chunks (hashlib releases the GIL, so prehash() scales across threads).
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._mem: dict[str, tuple] = {}
+        self._mem_lock = threading.Lock()
+
+    @staticmethod
+    def _stat_key(st: os.stat_result) -> tuple:
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def digest(self, path: Path, legacy_suffix: Optional[bytes] = None) -> tuple[str, Optional[str]]:
+        """
+        Return (blake2b digest, legacy key or None) for a file's content.
+
+        With legacy_suffix the same read also computes sha1(content + suffix),
+        the key format of the old .txt cache, and remembers it.
+        """
+        path_str = str(Path(path).resolve())
+        st = os.stat(path_str)
+        key = self._stat_key(st)
+        want_legacy = legacy_suffix is not None
+
+        with self._mem_lock:
+            hit = self._mem.get(path_str)
+        if hit and hit[0] == key and (hit[2] or not want_legacy):
+            return hit[1], hit[2]
+
+        row = self._conn().execute(
+            "SELECT dev, ino, size, mtime_ns, digest, legacy FROM file_digests WHERE path=?", (path_str,)
+        ).fetchone()
+        if row and tuple(row[:4]) == key and (row[5] or not want_legacy):
+            digest, legacy = row[4], row[5]
+        else:
+            digest, legacy = _hash_file(path_str, legacy_suffix)
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO file_digests (path, dev, ino, size, mtime_ns, digest, legacy) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path_str, *key, digest, legacy),
+                )
+        with self._mem_lock:
+            self._mem[path_str] = (key, digest, legacy)
+        return digest, legacy
+
+    def remember(self, path: Path, digest: str, legacy: Optional[str] = None) -> None:
+        """
+        Record digest as path's content digest at its current stat.
+
+        For files that stand in for content hashed elsewhere (e.g. the downscaled
+        proxies ZIP ingestion writes), so caches keyed by the original still hit.
+        """
+        path_str = str(Path(path).resolve())
+        key = self._stat_key(os.stat(path_str))
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_digests (path, dev, ino, size, mtime_ns, digest, legacy) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path_str, *key, digest, legacy),
+            )
+        with self._mem_lock:
+            self._mem[path_str] = (key, digest, legacy)
+
+    def prehash(self, paths: Iterable[Path], legacy_suffix: Optional[bytes] = None,
+                workers: int = HASH_WORKERS) -> int:
+        """Fill the memo for many files in parallel. Returns how many were hashed OK."""
+        def one(p):
+            try:
+                self.digest(p, legacy_suffix)
+                return True
+            except OSError:
+                return False
+
+        paths = list(paths)
+        if len(paths) <= 1 or workers <= 1:
+            return sum(one(p) for p in paths)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash") as pool:
+            return sum(pool.map(one, paths))
+
+
+def _hash_file(path: str, legacy_suffix: Optional[bytes] = None) -> tuple[str, Optional[str]]:
+    h = hashlib.blake2b(digest_size=20)
+    h1 = hashlib.sha1() if legacy_suffix is not None else None
+    buf = bytearray(HASH_CHUNK)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+            if h1 is not None:
+                h1.update(view[:n])
+    if h1 is None:
+        return h.hexdigest(), None
+    h1.update(legacy_suffix)
+    return h.hexdigest(), h1.hexdigest()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent writers queue on the busy timeout."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+if __name__ == "__main__":
+    import argparse, json
+
+    parser = argparse.ArgumentParser(description="Inspect or maintain the vision analysis cache")
+    parser.add_argument("command", choices=["stats", "import", "evict"])
+    parser.add_argument("--cache-dir", default=os.getenv("ANALYSIS_CACHE_DIR", ".cache"))
+    parser.add_argument("--max-mb", type=float, default=float(os.getenv("VISION_CACHE_MAX_MB", "512")))
+    parser.add_argument("--purge", action="store_true", help="Delete the .txt files after importing them")
+    args = parser.parse_args()
+
+    cache_dir = Path(args.cache_dir)
+    store = VisionCache(cache_dir / CACHE_DB_NAME, int(args.max_mb * 1024 * 1024))
+    if args.command == "import":
+        imported = store.import_legacy_dir(cache_dir)
+        if args.purge:
+            for f in cache_dir.glob("*.txt"):
+                f.unlink()
+        print(f"Imported {imported} entries")
+    elif args.command == "evict":
+        print(f"Evicted {store.evict()} entries")
+    print(json.dumps(store.stats(), indent=2))
@@ -0,0 +1,302 @@
+"""
+ZIP Source - Ingest inspection ZIPs without extracting the originals
+
+extract_zip used to extractall() every member into a temp directory, which
+collect_images then walked and every later stage read back: a 3 GB upload
+cost 3 GB of writes plus several full reads. ingest_zip() instead streams
+each member out of the archive once:
+
+1. The first chunk is sniffed for image magic bytes; anything else (sidecar
+   files, __MACOSX resource forks, documents) is skipped without being
+   decompressed further.
+2. The rest is decompressed in HASH_CHUNK pieces and hashed on the way
+   (the same blake2b digest the vision cache and derivative store use).
+3. A pool process decodes the member once, prepares its analysis copy and
+   PDF JPEG into the derivative store, and writes a small upright proxy
+   (PROXY_MAX_PX) where extraction would have put the original. Members are
+   handed over in memory up to ZIP_SPOOL_MB; larger ones go through a spill
+   file that is deleted once decoded. At most INGEST_INFLIGHT_MB of member
+   data waits for the pool at any time.
+4. The proxy's stat is recorded against the original's digest, so every
+   path-based stage downstream (vision cache, derivative store, dedupe,
+   generate_pdf) works on the proxy but is keyed by the original content.
+
+Apart from those spill files, full-size originals never touch the disk. Archive-wide and per-member limits
+guard against zip bombs; sizes are enforced on the bytes actually produced,
+not on what the headers claim.
+"""
+
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+import tracing
+from image_scan import SNIFF_BYTES, sniff_image
+from vision_cache import HASH_CHUNK
+
+# ---------------- Tunables (override via .env if desired) ----------------
+ZIP_STREAMING = os.getenv("ZIP_STREAMING", "true").lower() == "true"
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "20000"))
+ZIP_MAX_MEMBER_MB = float(os.getenv("ZIP_MAX_MEMBER_MB", "256"))     # one photo, uncompressed
+ZIP_MAX_TOTAL_MB = float(os.getenv("ZIP_MAX_TOTAL_MB", "16384"))     # whole archive, uncompressed
+ZIP_MAX_RATIO = float(os.getenv("ZIP_MAX_RATIO", "100"))             # photos barely compress; bombs do
+ZIP_RATIO_MIN_MB = 1.0                                               # tiny members may compress well
+ZIP_SPOOL_MB = float(os.getenv("ZIP_SPOOL_MB", "32"))                # larger members spill to a temp file
+INGEST_INFLIGHT_MB = float(os.getenv("INGEST_INFLIGHT_MB", "256"))   # member data queued for the pool
+PROXY_MAX_PX = int(os.getenv("ZIP_PROXY_MAX_PX", "1536"))            # >= every size a later stage asks for
+PROXY_JPEG_QUALITY = int(os.getenv("ZIP_PROXY_QUALITY", "92"))
+INGEST_PROCESSES = int(os.getenv("INGEST_PROCESSES", os.getenv("PREP_PROCESSES",
+                                                                str(max(1, min(8, (os.cpu_count() or 2) - 1))))))
+
+PHOTO_SUBDIRS = ("photos", "images", "Pictures")  # same preference as extract_zip
+
+last_stats: Optional[dict] = None
+
+
+class ZipBombError(ValueError):
+    """The archive exceeds the ingestion limits (or lies about its sizes)."""
+
+
+def _safe_name(name: str) -> Optional[PurePosixPath]:
+    """Archive member name as a relative path, or None for traversal attempts and OS junk."""
+    parts = [p for p in PurePosixPath(name.replace("\\", "/")).parts if p not in ("", ".")]
+    if not parts or name.startswith("/") or ":" in parts[0] or ".." in parts:
+        return None
+    if parts[0] == "__MACOSX" or parts[-1].startswith("._"):
+        return None
+    return PurePosixPath(*parts)
+
+
+def _check_archive(infos: List[zipfile.ZipInfo]) -> None:
+    if len(infos) > ZIP_MAX_MEMBERS:
+        raise ZipBombError(f"ZIP has {len(infos)} members (limit {ZIP_MAX_MEMBERS})")
+    declared = sum(i.file_size for i in infos)
+    if declared > ZIP_MAX_TOTAL_MB * 1024 * 1024:
+        raise ZipBombError(f"ZIP expands to {declared / 1e6:.0f} MB (limit {ZIP_MAX_TOTAL_MB:.0f} MB)")
+    for info in infos:
+        if (info.file_size > ZIP_RATIO_MIN_MB * 1024 * 1024
+                and info.file_size > ZIP_MAX_RATIO * max(1, info.compress_size)):
+            raise ZipBombError(f"{info.filename} compresses {info.file_size // max(1, info.compress_size)}:1 "
+                               f"(limit {ZIP_MAX_RATIO:.0f}:1)")
+
+
+def _read_member(z: zipfile.ZipFile, info: zipfile.ZipInfo, budget: int, legacy_suffix: Optional[bytes],
+                 spill_dir: Path) -> Optional[Tuple[object, int, str, str, Optional[str]]]:
+    """
+    Decompress one member, hashing as it streams. Returns (data, size,
+    extension, digest, legacy key), or None when the first chunk is not an
+    image. data is the member's bytes, or the path (str) of a spill file in
+    spill_dir once it is larger than ZIP_SPOOL_MB.
+    """
+    limit = min(int(ZIP_MAX_MEMBER_MB * 1024 * 1024), budget)
+    spool = int(ZIP_SPOOL_MB * 1024 * 1024)
+    h = hashlib.blake2b(digest_size=20)
+    h1 = hashlib.sha1() if legacy_suffix is not None else None
+    buf = bytearray()
+    spill = None
+    size = 0
+    ext = None
+    try:
+        with z.open(info) as member:
+            while True:
+                chunk = member.read(HASH_CHUNK)
+                if not chunk:
+                    break
+                if ext is None:
+                    ext = sniff_image(chunk[:SNIFF_BYTES])
+                    if ext is None:
+                        return None
+                size += len(chunk)
+                if size > info.file_size or size > limit:
+                    raise ZipBombError(f"{info.filename} expands past {min(info.file_size, limit)} bytes")
+                h.update(chunk)
+                if h1 is not None:
+                    h1.update(chunk)
+                if spill is None and size > spool:
+                    spill = tempfile.NamedTemporaryFile(dir=spill_dir, suffix=ext, delete=False)
+                    spill.write(buf)
+                    buf = bytearray()
+                if spill is not None:
+                    spill.write(chunk)
+                else:
+                    buf += chunk
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.unlink(spill.name)
+        raise
+    if spill is not None:
+        spill.close()
+    if ext is None:
+        return None
+    legacy = None
+    if h1 is not None:
+        h1.update(legacy_suffix)
+        legacy = h1.hexdigest()
+    return (spill.name if spill is not None else bytes(buf)), size, ext, h.hexdigest(), legacy
+
+
+def _ingest_in_worker(data, dest_str: str, digest: str, analysis_max_px: Optional[int],
+                      unsure: bool) -> tuple:
+    """
+    Runs in a pool process. Decodes once, prepares derivatives, writes the proxy.
+    data is the member's bytes or a spill file path (removed here). Returns (dest, busy s, pid).
+    """
+    import image_prep
+    started = time.perf_counter()
+    dest = Path(dest_str)
+    if isinstance(data, str):
+        try:
+            im = image_prep._decode(Path(data), PROXY_MAX_PX)
+        finally:
+            os.unlink(data)
+    else:
+        im = image_prep._decode(io.BytesIO(data), PROXY_MAX_PX)
+    if analysis_max_px is not None:
+        image_prep.prepare_image(dest, analysis_max_px, unsure, decoded=im, digest=digest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.suffix.lower() == ".png":
+        im.save(dest, format="PNG")
+    else:
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        im.save(dest, format="JPEG", quality=PROXY_JPEG_QUALITY)
+    return dest_str, time.perf_counter() - started, os.getpid()
+
+
+def _vision_hooks():
+    """(analysis max px, unsure(path), legacy suffix, memo) from vision, or Nones without it."""
+    try:
+        import vision
+    except ImportError:
+        import image_prep
+        return None, (lambda p: False), None, image_prep.digests
+    suffix = vision._legacy_key_suffix() if vision.cache.legacy_pending else None
+    return vision.ANALYSIS_MAX_PX, vision._first_pass_unsure, suffix, vision.digests
+
+
+@tracing.traced()
+def ingest_zip(zip_path: Path, dest_dir: Path) -> Tuple[Path, List[Path]]:
+    """
+    Stream the photos in zip_path into proxies under dest_dir and return
+    (photos dir, proxy paths sorted like collect_images). The photos dir is the
+    archive's photos/images/Pictures folder when it has one, as with extract_zip.
+    Raises ZipBombError when the archive is over the limits.
+    """
+    global last_stats
+    started = time.perf_counter()
+    analysis_max_px, unsure, legacy_suffix, memo = _vision_hooks()
+    budget = int(ZIP_MAX_TOTAL_MB * 1024 * 1024)
+    stats = {"members": 0, "images": 0, "skipped": 0, "read_mb": 0.0, "written_mb": 0.0}
+    digests: Dict[str, Tuple[str, Optional[str]]] = {}
+    written: List[Path] = []
+    taken = set()
+    inflight_limit = int(INGEST_INFLIGHT_MB * 1024 * 1024)
+    spill_dir = Path(tempfile.mkdtemp(prefix="ingest_spill_"))
+
+    ctx = multiprocessing.get_context("spawn")  # no forked SQLite state in children
+    with zipfile.ZipFile(zip_path, "r") as z, \
+            ProcessPoolExecutor(max_workers=max(1, INGEST_PROCESSES), mp_context=ctx) as pool:
+        infos = [i for i in z.infolist() if not i.is_dir()]
+        _check_archive(infos)
+        inflight = set()
+        owners = {}
+        held = {}  # future -> bytes of member data it keeps in this process
+
+        def settle(done) -> None:
+            for fut in done:
+                held.pop(fut, None)
+                try:
+                    dest_str, busy, pid = fut.result()
+                except Exception as e:
+                    # Undecodable despite its magic bytes (truncated upload, unsupported HEIC)
+                    print(f"  Skipping {owners.pop(fut)}: {e}")
+                    stats["images"] -= 1
+                    stats["skipped"] += 1
+                    continue
+                owners.pop(fut, None)
+                dest = Path(dest_str)
+                tracing.complete("ingest member", time.perf_counter() - busy, busy, cat="zip",
+                                 track=f"ingest process {pid}", photo=dest.name)
+                digest, legacy = digests[dest_str]
+                memo.remember(dest, digest, legacy)
+                stats["written_mb"] += dest.stat().st_size / 1e6
+                written.append(dest)
+
+        try:
+            for info in infos:
+                stats["members"] += 1
+                rel = _safe_name(info.filename)
+                if rel is None:
+                    stats["skipped"] += 1
+                    continue
+                try:
+                    member = _read_member(z, info, budget, legacy_suffix, spill_dir)
+                except (RuntimeError, NotImplementedError, zipfile.BadZipFile) as e:
+                    # Encrypted members, unsupported compression or a corrupt entry
+                    print(f"  Skipping {info.filename}: {e}")
+                    stats["skipped"] += 1
+                    continue
+                if member is None:
+                    stats["skipped"] += 1
+                    continue
+                data, size, ext, digest, legacy = member
+                budget -= size
+                stats["read_mb"] += size / 1e6
+                if rel.suffix.lower() not in (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".heic", ".heif"):
+                    rel = rel.with_name(rel.name + ext)
+                dest = dest_dir.joinpath(*rel.parts)
+                if str(dest).lower() in taken:
+                    if isinstance(data, str):
+                        os.unlink(data)
+                    continue  # same name twice (case-insensitive file systems keep one too)
+                taken.add(str(dest).lower())
+                digests[str(dest)] = (digest, legacy)
+                stats["images"] += 1
+                in_memory = 0 if isinstance(data, str) else size
+                # Wait for the pool while it has enough queued, by count or by bytes held here
+                while inflight and (len(inflight) >= 2 * max(1, INGEST_PROCESSES)
+                                    or sum(held.values()) + in_memory > inflight_limit):
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    settle(done)
+                fut = pool.submit(_ingest_in_worker, data, str(dest), digest, analysis_max_px, unsure(dest))
+                owners[fut] = info.filename
+                held[fut] = in_memory
+                inflight.add(fut)
+                del data, member
+            settle(inflight)
+        finally:
+            for fut in inflight:
+                fut.cancel()
+            pool.shutdown(wait=True)
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    photos_dir = dest_dir
+    for subdir_name in PHOTO_SUBDIRS:
+        if (dest_dir / subdir_name).is_dir():
+            photos_dir = dest_dir / subdir_name
+            break
+    images = [p for p in written if photos_dir == dest_dir or photos_dir in p.parents]
+    images.sort(key=lambda p: p.name.lower())
+
+    stats["read_mb"] = round(stats["read_mb"], 1)
+    stats["written_mb"] = round(stats["written_mb"], 1)
+    stats["wall_s"] = round(time.perf_counter() - started, 2)
+    last_stats = stats
+    print(f"ZIP ingest: {stats['images']} photos from {stats['members']} members "
+          f"({stats['skipped']} skipped), {stats['read_mb']} MB decompressed, "
+          f"{stats['written_mb']} MB of proxies written in {stats['wall_s']}s")
+    return photos_dir, images
+
+
+def ingest_stats() -> Optional[dict]:
+    """Counters of the last ingest_zip call in this process."""
+    return last_stats